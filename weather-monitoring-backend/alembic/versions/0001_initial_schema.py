@@ -0,0 +1,82 @@
+"""initial schema
+
+Matches the tables previously created by Base.metadata.create_all, so databases
+that were bootstrapped that way can be upgraded in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "weather_data" not in existing:
+        op.create_table(
+            "weather_data",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("city", sa.String()),
+            sa.Column("temperature", sa.Float()),
+            sa.Column("feels_like", sa.Float()),
+            sa.Column("temp_min", sa.Float()),
+            sa.Column("temp_max", sa.Float()),
+            sa.Column("humidity", sa.Integer()),
+            sa.Column("pressure", sa.Integer()),
+            sa.Column("weather_main", sa.String()),
+            sa.Column("weather_description", sa.String()),
+            sa.Column("wind_speed", sa.Float()),
+            sa.Column("clouds", sa.Integer()),
+            sa.Column("recorded_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("is_deleted", sa.Boolean()),
+        )
+        op.create_index("ix_weather_data_id", "weather_data", ["id"])
+        op.create_index("ix_weather_data_city", "weather_data", ["city"])
+
+    if "dashboard_summary" not in existing:
+        op.create_table(
+            "dashboard_summary",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("city", sa.String()),
+            sa.Column("avg_temperature", sa.Float()),
+            sa.Column("max_temperature", sa.Float()),
+            sa.Column("min_temperature", sa.Float()),
+            sa.Column("avg_humidity", sa.Float()),
+            sa.Column("trend_data", sa.JSON()),
+            sa.Column("computed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_dashboard_summary_id", "dashboard_summary", ["id"])
+        op.create_index("ix_dashboard_summary_city", "dashboard_summary", ["city"])
+
+    if "weather_alerts" not in existing:
+        op.create_table(
+            "weather_alerts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("city", sa.String()),
+            sa.Column("alert_type", sa.String()),
+            sa.Column("message", sa.String()),
+            sa.Column("threshold_value", sa.Float(), nullable=True),
+            sa.Column("actual_value", sa.Float()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("is_sent", sa.Boolean()),
+        )
+        op.create_index("ix_weather_alerts_id", "weather_alerts", ["id"])
+        op.create_index("ix_weather_alerts_city", "weather_alerts", ["city"])
+
+
+def downgrade() -> None:
+    op.drop_table("weather_alerts")
+    op.drop_table("dashboard_summary")
+    op.drop_table("weather_data")
@@ -0,0 +1,65 @@
+"""composite and partial indexes for the hot query shapes
+
+- weather_data (city, recorded_at DESC) WHERE is_deleted = false serves
+  get_latest_weather, the alert check and per-city dashboard summaries
+- weather_data (recorded_at) WHERE is_deleted = false serves the all-city
+  dashboard summary and the soft-delete cleanup
+- weather_alerts (city, created_at DESC) serves get_recent_alerts
+- dashboard_summary (city, computed_at DESC) serves get_dashboard_summary
+
+The single-column city indexes are prefixes of the new composites and are dropped.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_weather_data_city_recorded_at_live",
+        "weather_data",
+        ["city", sa.text("recorded_at DESC")],
+        postgresql_where=sa.text("is_deleted = false"),
+    )
+    op.create_index(
+        "ix_weather_data_recorded_at_live",
+        "weather_data",
+        ["recorded_at"],
+        postgresql_where=sa.text("is_deleted = false"),
+    )
+    op.create_index(
+        "ix_weather_alerts_city_created_at",
+        "weather_alerts",
+        ["city", sa.text("created_at DESC")],
+    )
+    op.create_index(
+        "ix_dashboard_summary_city_computed_at",
+        "dashboard_summary",
+        ["city", sa.text("computed_at DESC")],
+    )
+    op.drop_index("ix_weather_data_city", table_name="weather_data")
+    op.drop_index("ix_weather_alerts_city", table_name="weather_alerts")
+    op.drop_index("ix_dashboard_summary_city", table_name="dashboard_summary")
+
+
+def downgrade() -> None:
+    op.create_index("ix_dashboard_summary_city", "dashboard_summary", ["city"])
+    op.create_index("ix_weather_alerts_city", "weather_alerts", ["city"])
+    op.create_index("ix_weather_data_city", "weather_data", ["city"])
+    op.drop_index("ix_dashboard_summary_city_computed_at", table_name="dashboard_summary")
+    op.drop_index("ix_weather_alerts_city_created_at", table_name="weather_alerts")
+    op.drop_index("ix_weather_data_recorded_at_live", table_name="weather_data")
+    op.drop_index("ix_weather_data_city_recorded_at_live", table_name="weather_data")
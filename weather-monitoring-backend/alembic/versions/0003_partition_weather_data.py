@@ -0,0 +1,130 @@
+"""range-partition weather_data by recorded_at
+
+Rebuilds weather_data as a table partitioned by RANGE (recorded_at) with daily
+partitions covering the existing rows, a DEFAULT partition as a safety net, and
+copies the data across. The primary key becomes (id, recorded_at) because a
+partitioned table's unique constraints must include the partition key. Further
+partitions are created ahead of time by PartitionService.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, city, temperature, feels_like, temp_min, temp_max, humidity, pressure, "
+    "weather_main, weather_description, wind_speed, clouds, recorded_at, is_deleted"
+)
+
+COLUMN_DDL = """
+    city VARCHAR,
+    temperature FLOAT,
+    feels_like FLOAT,
+    temp_min FLOAT,
+    temp_max FLOAT,
+    humidity INTEGER,
+    pressure INTEGER,
+    weather_main VARCHAR,
+    weather_description VARCHAR,
+    wind_speed FLOAT,
+    clouds INTEGER,
+"""
+
+
+def _create_indexes() -> None:
+    op.execute("CREATE INDEX ix_weather_data_id ON weather_data (id)")
+    op.execute(
+        "CREATE INDEX ix_weather_data_city_recorded_at_live ON weather_data (city, recorded_at DESC) "
+        "WHERE is_deleted = false"
+    )
+    op.execute(
+        "CREATE INDEX ix_weather_data_recorded_at_live ON weather_data (recorded_at) "
+        "WHERE is_deleted = false"
+    )
+
+
+def _move_aside() -> None:
+    op.execute("ALTER TABLE weather_data RENAME TO weather_data_old")
+    op.execute("ALTER TABLE weather_data_old RENAME CONSTRAINT weather_data_pkey TO weather_data_old_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_weather_data_id")
+    op.execute("DROP INDEX IF EXISTS ix_weather_data_city_recorded_at_live")
+    op.execute("DROP INDEX IF EXISTS ix_weather_data_recorded_at_live")
+    op.execute("ALTER SEQUENCE weather_data_id_seq OWNED BY NONE")
+
+
+def upgrade() -> None:
+    _move_aside()
+
+    op.execute(f"""
+        CREATE TABLE weather_data (
+            id INTEGER NOT NULL DEFAULT nextval('weather_data_id_seq'),
+            {COLUMN_DDL}
+            recorded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            is_deleted BOOLEAN,
+            CONSTRAINT weather_data_pkey PRIMARY KEY (id, recorded_at)
+        ) PARTITION BY RANGE (recorded_at)
+    """)
+    op.execute("ALTER SEQUENCE weather_data_id_seq OWNED BY weather_data.id")
+    op.execute("CREATE TABLE weather_data_default PARTITION OF weather_data DEFAULT")
+
+    # One partition per UTC day from the oldest row until a week from now
+    op.execute("""
+        DO $$
+        DECLARE
+            day DATE := COALESCE(
+                (SELECT min(recorded_at AT TIME ZONE 'UTC')::date FROM weather_data_old),
+                (now() AT TIME ZONE 'UTC')::date
+            );
+            last_day DATE := (now() AT TIME ZONE 'UTC')::date + 7;
+        BEGIN
+            WHILE day <= last_day LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF weather_data FOR VALUES FROM (%L) TO (%L)',
+                    'weather_data_p' || to_char(day, 'YYYYMMDD'),
+                    day::timestamp AT TIME ZONE 'UTC',
+                    (day + 1)::timestamp AT TIME ZONE 'UTC'
+                );
+                day := day + 1;
+            END LOOP;
+        END $$
+    """)
+
+    _create_indexes()
+    op.execute(f"""
+        INSERT INTO weather_data ({COLUMNS})
+        SELECT id, city, temperature, feels_like, temp_min, temp_max, humidity, pressure,
+               weather_main, weather_description, wind_speed, clouds,
+               COALESCE(recorded_at, now()), is_deleted
+        FROM weather_data_old
+    """)
+    op.execute("DROP TABLE weather_data_old")
+
+
+def downgrade() -> None:
+    _move_aside()
+
+    op.execute(f"""
+        CREATE TABLE weather_data (
+            id INTEGER NOT NULL DEFAULT nextval('weather_data_id_seq'),
+            {COLUMN_DDL}
+            recorded_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            is_deleted BOOLEAN,
+            CONSTRAINT weather_data_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE weather_data_id_seq OWNED BY weather_data.id")
+    _create_indexes()
+    op.execute(f"INSERT INTO weather_data ({COLUMNS}) SELECT {COLUMNS} FROM weather_data_old")
+    # Drops the parent together with all of its partitions
+    op.execute("DROP TABLE weather_data_old")
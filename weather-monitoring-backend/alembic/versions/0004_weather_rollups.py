@@ -0,0 +1,73 @@
+"""hourly and daily rollup tables
+
+weather_hourly and weather_daily hold per-city count, sum, min, max and sum of
+squares of temperature, humidity, pressure and wind speed per bucket. From here
+on they are maintained by upserts as observations are saved (RollupService);
+this migration backfills them from the live rows already in weather_data.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+METRICS = ("temperature", "humidity", "pressure", "wind_speed")
+ROLLUPS = {"weather_hourly": "hour", "weather_daily": "day"}
+
+
+def metric_columns(metric: str):
+    return [
+        sa.Column(f"{metric}_count", sa.Integer(), nullable=False),
+        sa.Column(f"{metric}_sum", sa.Float(), nullable=False),
+        sa.Column(f"{metric}_min", sa.Float(), nullable=True),
+        sa.Column(f"{metric}_max", sa.Float(), nullable=True),
+        sa.Column(f"{metric}_sumsq", sa.Float(), nullable=False),
+    ]
+
+
+def backfill_select(unit: str) -> str:
+    aggregates = ", ".join(
+        f"count({m}), coalesce(sum({m}), 0), min({m}), max({m}), coalesce(sum({m}::float * {m}), 0)"
+        for m in METRICS
+    )
+    return (
+        f"SELECT city, date_trunc('{unit}', recorded_at, 'UTC'), count(*), {aggregates} "
+        f"FROM weather_data WHERE is_deleted = false AND city IS NOT NULL "
+        f"GROUP BY 1, 2"
+    )
+
+
+def upgrade() -> None:
+    for table, unit in ROLLUPS.items():
+        op.create_table(
+            table,
+            sa.Column("city", sa.String(), nullable=False),
+            sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("observations", sa.Integer(), nullable=False),
+            *[column for metric in METRICS for column in metric_columns(metric)],
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+            sa.PrimaryKeyConstraint("city", "bucket"),
+        )
+        columns = ", ".join(
+            ["city", "bucket", "observations"]
+            + [f"{m}_{agg}" for m in METRICS for agg in ("count", "sum", "min", "max", "sumsq")]
+        )
+        op.execute(f"INSERT INTO {table} ({columns}) {backfill_select(unit)}")
+    op.create_index("ix_weather_hourly_bucket", "weather_hourly", ["bucket"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_weather_hourly_bucket", table_name="weather_hourly")
+    for table in reversed(list(ROLLUPS)):
+        op.drop_table(table)
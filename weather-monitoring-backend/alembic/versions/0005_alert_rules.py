@@ -0,0 +1,73 @@
+"""alert_rules table
+
+Alert conditions move out of code (AlertThreshold and the thresholds hardcoded
+in the cron job) into rows evaluated by src/services/rule_engine.py. The three
+rules that used to be hardcoded are seeded as global rules.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_RULES = [
+    {
+        "alert_type": "high_temperature",
+        "condition": {"metric": "temperature", "op": ">", "value": 35.0},
+        "message": "High temperature alert! Current: {temperature}°C, Threshold: {threshold}°C",
+    },
+    {
+        "alert_type": "high_humidity",
+        "condition": {"metric": "humidity", "op": ">", "value": 80},
+        "message": "High humidity alert! Current: {humidity}%, Threshold: {threshold:g}%",
+    },
+    {
+        "alert_type": "extreme_weather",
+        "condition": {
+            "metric": "weather_main",
+            "op": "in",
+            "value": ["Thunderstorm", "Heavy Rain", "Storm", "Tornado", "Hurricane"],
+        },
+        "message": "Extreme weather alert! Current condition: {weather_main} - {weather_description}",
+    },
+]
+
+
+def upgrade() -> None:
+    alert_rules = op.create_table(
+        "alert_rules",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("alert_type", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=True),
+        sa.Column("condition", sa.JSON(), nullable=False),
+        sa.Column("message", sa.String(), nullable=True),
+        sa.Column("enabled", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "uq_alert_rules_type_city", "alert_rules", ["alert_type", "city"],
+        unique=True, postgresql_where=sa.text("city IS NOT NULL")
+    )
+    op.create_index(
+        "uq_alert_rules_type_global", "alert_rules", ["alert_type"],
+        unique=True, postgresql_where=sa.text("city IS NULL")
+    )
+    op.bulk_insert(alert_rules, [{**rule, "city": None, "enabled": True} for rule in DEFAULT_RULES])
+
+
+def downgrade() -> None:
+    op.drop_index("uq_alert_rules_type_global", table_name="alert_rules")
+    op.drop_index("uq_alert_rules_type_city", table_name="alert_rules")
+    op.drop_table("alert_rules")
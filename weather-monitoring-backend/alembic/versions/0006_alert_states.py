@@ -0,0 +1,65 @@
+"""alert state, hysteresis and cooldown
+
+alert_states keeps whether each (city, alert_type) is currently active and when
+it last alerted, so a condition that persists across alert checks produces one
+alert instead of one per check. alert_rules gains an optional clear condition
+(hysteresis) and a per-rule cooldown. The seeded temperature and humidity rules
+clear a little below their trigger. Existing alerts seed last_alerted_at so the
+cooldown holds across the upgrade.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_CLEAR_CONDITIONS = {
+    "high_temperature": {"metric": "temperature", "op": "<=", "value": 33.0},
+    "high_humidity": {"metric": "humidity", "op": "<=", "value": 75},
+}
+
+
+def upgrade() -> None:
+    op.add_column("alert_rules", sa.Column("clear_condition", sa.JSON(), nullable=True))
+    op.add_column("alert_rules", sa.Column("cooldown_minutes", sa.Integer(), nullable=True))
+    for alert_type, condition in DEFAULT_CLEAR_CONDITIONS.items():
+        op.execute(
+            sa.text(
+                "UPDATE alert_rules SET clear_condition = CAST(:condition AS json) "
+                "WHERE alert_type = :alert_type AND city IS NULL AND clear_condition IS NULL"
+            ).bindparams(condition=json.dumps(condition), alert_type=alert_type)
+        )
+
+    op.create_table(
+        "alert_states",
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("alert_type", sa.String(), nullable=False),
+        sa.Column("active", sa.Boolean(), nullable=False),
+        sa.Column("last_observation_id", sa.Integer(), nullable=True),
+        sa.Column("last_alerted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("city", "alert_type"),
+    )
+    op.execute(
+        "INSERT INTO alert_states (city, alert_type, active, last_alerted_at) "
+        "SELECT city, alert_type, false, max(created_at) FROM weather_alerts "
+        "WHERE city IS NOT NULL AND alert_type IS NOT NULL GROUP BY city, alert_type"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("alert_states")
+    op.drop_column("alert_rules", "cooldown_minutes")
+    op.drop_column("alert_rules", "clear_condition")
@@ -0,0 +1,44 @@
+"""alert delivery bookkeeping
+
+Delivery attempts, the next retry time (also used as the claim lease of a
+delivery worker), the last error and when the alert was sent. The partial
+index keeps the worker's claim query on unsent rows only.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("weather_alerts", sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column(
+        "weather_alerts",
+        sa.Column("delivery_attempts", sa.Integer(), server_default=sa.text("0"), nullable=False)
+    )
+    op.add_column("weather_alerts", sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("weather_alerts", sa.Column("last_error", sa.String(), nullable=True))
+    op.create_index(
+        "ix_weather_alerts_unsent", "weather_alerts", ["created_at"],
+        postgresql_where=sa.text("is_sent = false")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_weather_alerts_unsent", table_name="weather_alerts")
+    op.drop_column("weather_alerts", "last_error")
+    op.drop_column("weather_alerts", "next_attempt_at")
+    op.drop_column("weather_alerts", "delivery_attempts")
+    op.drop_column("weather_alerts", "sent_at")
@@ -0,0 +1,51 @@
+"""fetch_schedule table and weather_data.observed_at
+
+Cities are polled on their own adaptive interval; fetch_schedule holds that
+interval, when the city is next due, and the last stored reading (upstream dt
+and values) used to skip unchanged readings and to judge volatility.
+observed_at keeps OpenWeather's measurement time next to recorded_at.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: a catalog-only change, even on the partitioned table
+    op.add_column("weather_data", sa.Column("observed_at", sa.DateTime(timezone=True), nullable=True))
+
+    op.create_table(
+        "fetch_schedule",
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("interval_seconds", sa.Float(), nullable=False),
+        sa.Column("next_fetch_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_fetched_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_observed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("upstream_period_seconds", sa.Float(), nullable=True),
+        sa.Column("last_temperature", sa.Float(), nullable=True),
+        sa.Column("last_humidity", sa.Integer(), nullable=True),
+        sa.Column("last_pressure", sa.Integer(), nullable=True),
+        sa.Column("last_weather_main", sa.String(), nullable=True),
+        sa.Column("polls", sa.Integer(), nullable=False),
+        sa.Column("unchanged_polls", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("city"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fetch_schedule")
+    op.drop_column("weather_data", "observed_at")
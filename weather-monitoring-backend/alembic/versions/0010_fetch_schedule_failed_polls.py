@@ -0,0 +1,32 @@
+"""fetch_schedule.failed_polls
+
+Failed upstream calls now count in fetch_schedule.polls, like any other call
+against the quota; failed_polls keeps them apart from stored readings.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "fetch_schedule",
+        sa.Column("failed_polls", sa.Integer(), server_default=sa.text("0"), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("fetch_schedule", "failed_polls")
@@ -0,0 +1,138 @@
+"""Simulate a day of polling: fixed 30-minute cadence vs the adaptive FetchScheduler
+
+No network or database: upstream stations are modelled in memory on a virtual
+clock (each publishes every 10-60 minutes; some are steady, some volatile) and
+the real FetchScheduler policy decides when each city is polled:
+    python -m benchmarks.adaptive_fetch_benchmark --cities 200 --hours 24
+Reports API calls, rows stored, duplicate rows, data age (now minus the
+upstream time of the newest stored reading, sampled every minute) and swings
+missed: upstream readings 1°C or more from the stored one that were replaced
+before any poll stored them.
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from benchmarks.common import bootstrap_env, print_table
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class Station:
+    """Upstream station publishing a random-walk reading every `period` seconds"""
+
+    def __init__(self, name: str, rng: random.Random, period: int, step: float):
+        self.name = name
+        self.period = period
+        self.step = step
+        self.rng = rng
+        self.readings = {}  # publish index -> payload
+
+    def payload(self, now: datetime) -> dict:
+        index = int((now - START).total_seconds() // self.period)
+        while len(self.readings) <= index:
+            previous = self.readings.get(len(self.readings) - 1)
+            temp = previous["main"]["temp"] + self.rng.gauss(0, self.step) if previous else self.rng.uniform(5, 35)
+            main = previous["weather"][0]["main"] if previous else "Clear"
+            if self.rng.random() < self.step / 20:
+                main = self.rng.choice(["Clear", "Clouds", "Rain"])
+            self.readings[len(self.readings)] = {
+                "name": self.name,
+                "dt": int((START + timedelta(seconds=len(self.readings) * self.period)).timestamp()),
+                "main": {"temp": round(temp, 2), "humidity": 60, "pressure": 1012},
+                "weather": [{"main": main}],
+            }
+        return self.readings[index]
+
+
+def make_stations(args) -> list:
+    rng = random.Random(args.seed)
+    stations = []
+    for i in range(args.cities):
+        volatile = rng.random() < args.volatile_share
+        stations.append(Station(
+            f"City{i:04d}", random.Random(rng.random()),
+            period=rng.choice([600, 600, 600, 1200, 1800, 3600]),
+            step=rng.uniform(0.8, 2.0) if volatile else rng.uniform(0.05, 0.3)
+        ))
+    return stations
+
+
+def simulate(stations, minutes: int, adaptive: bool) -> dict:
+    from src.models.weather import FetchSchedule
+    from src.services.fetch_scheduler import FetchScheduler, observed_at
+
+    schedules = {s.name: FetchScheduler.new_schedule(s.name, START) for s in stations}
+    stored_dt = {s.name: None for s in stations}
+    calls = stored = duplicates = 0
+    seen = {s.name: set() for s in stations}
+    ages = []
+    for minute in range(minutes):
+        now = START + timedelta(minutes=minute)
+        for station in stations:
+            schedule: FetchSchedule = schedules[station.name]
+            if adaptive:
+                due = schedule.next_fetch_at <= now
+            else:
+                due = minute % 30 == 0
+            if due:
+                payload = station.payload(now)
+                calls += 1
+                if adaptive and FetchScheduler.is_unchanged(schedule, payload):
+                    pass
+                else:
+                    stored += 1
+                    duplicates += stored_dt[station.name] == payload["dt"]
+                    stored_dt[station.name] = payload["dt"]
+                    seen[station.name].add(payload["dt"])
+                if adaptive:
+                    FetchScheduler.record(schedule, payload, now)
+            if stored_dt[station.name] is not None:
+                ages.append((now - observed_at({"dt": stored_dt[station.name]})).total_seconds())
+    ages.sort()
+    missed = 0
+    for station in stations:
+        previous = None
+        for reading in station.readings.values():
+            temp = reading["main"]["temp"]
+            if previous is not None and abs(temp - previous) >= 1.0 and reading["dt"] not in seen[station.name]:
+                missed += 1
+            if reading["dt"] in seen[station.name]:
+                previous = temp
+    return {
+        "mode": "adaptive" if adaptive else "fixed 30 min",
+        "api_calls": calls,
+        "rows_stored": stored,
+        "duplicate_rows": duplicates,
+        "age_mean_min": round(sum(ages) / len(ages) / 60, 1),
+        "age_p95_min": round(ages[int(0.95 * len(ages))] / 60, 1),
+        "age_max_min": round(ages[-1] / 60, 1),
+        "swings_missed": missed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--volatile-share", type=float, default=0.2, help="fraction of cities with volatile weather")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--min-interval", type=float, default=600.0, help="FETCH_MIN_INTERVAL_SECONDS")
+    parser.add_argument("--max-interval", type=float, default=3600.0, help="FETCH_MAX_INTERVAL_SECONDS (freshness target)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    bootstrap_env(FETCH_MIN_INTERVAL_SECONDS=args.min_interval, FETCH_MAX_INTERVAL_SECONDS=args.max_interval)
+    minutes = int(args.hours * 60)
+    rows = [simulate(make_stations(args), minutes, adaptive) for adaptive in (False, True)]
+    fixed, adaptive = rows
+    adaptive["calls_saved_pct"] = round(100 * (fixed["api_calls"] - adaptive["api_calls"]) / fixed["api_calls"], 1)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    headers = list(adaptive)
+    print_table(headers, [[row.get(h, "") for h in headers] for row in rows])
+
+
+if __name__ == "__main__":
+    main()
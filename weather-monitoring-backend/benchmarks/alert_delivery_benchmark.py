@@ -0,0 +1,155 @@
+"""Deliver a backlog of alerts through local webhook / SMTP / file stubs
+
+Inserts N unsent alerts into DATABASE_URL, then delivers them
+  - one at a time: POST one alert, then AlertService.mark_alert_as_sent (one commit each)
+  - with AlertDeliveryWorker: SKIP LOCKED batches, chunked sink calls, bulk is_sent update
+and reports throughput, sink latency, retries and duplicate deliveries:
+    python -m benchmarks.alert_delivery_benchmark --alerts 5000 --workers 4 --fail-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from benchmarks.common import bootstrap_env, print_table
+from benchmarks.stubs import StubSmtpServer, StubWebhookServer
+
+CITY = "bench-alerts"
+
+
+async def seed(count: int):
+    from sqlalchemy import delete, insert
+    from src.database.connection import AsyncSessionLocal
+    from src.models.weather import WeatherAlert
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(WeatherAlert).where(WeatherAlert.city == CITY))
+        values = [
+            {"city": CITY, "alert_type": "high_temperature", "message": f"bench alert {i}",
+             "threshold_value": 35.0, "actual_value": 36.0, "is_sent": False}
+            for i in range(count)
+        ]
+        for start in range(0, count, 5000):
+            await db.execute(insert(WeatherAlert), values[start:start + 5000])
+        await db.commit()
+
+
+async def sent_count() -> int:
+    from sqlalchemy import func, select
+    from src.database.connection import AsyncSessionLocal
+    from src.models.weather import WeatherAlert
+
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count()).select_from(WeatherAlert).where(WeatherAlert.city == CITY, WeatherAlert.is_sent == True)
+        )
+
+
+async def run_naive(args, webhook) -> dict:
+    from sqlalchemy import select
+    from src.database.connection import AsyncSessionLocal
+    from src.models.weather import WeatherAlert
+    from src.services.alert_service import AlertService
+    from src.services.http_client import get_http_client
+
+    await seed(args.alerts)
+    client = get_http_client()
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        alerts = (await db.scalars(
+            select(WeatherAlert).where(WeatherAlert.city == CITY, WeatherAlert.is_sent == False)
+        )).all()
+        for alert in alerts:
+            response = await client.post(webhook.url, json={"alerts": [{"id": alert.id, "message": alert.message}]})
+            if response.status_code < 300:
+                await AlertService.mark_alert_as_sent(db, alert.id)
+    seconds = time.perf_counter() - started
+    return {"mode": "one at a time", "workers": 1, "sinks": "webhook", "seconds": round(seconds, 2),
+            "delivered": await sent_count(), "alerts_per_s": round(await sent_count() / seconds, 1),
+            "webhook_p95_ms": None, "retries": None, "duplicates": None}
+
+
+async def run_worker(args, webhook, smtp, path: str) -> dict:
+    from src.services import alert_delivery
+    from src.services.alert_delivery import AlertDeliveryWorker, FileSink, SmtpSink, WebhookSink
+
+    await seed(args.alerts)
+    alert_delivery.reset_delivery_stats()
+    sinks = [WebhookSink(webhook.url)]
+    if args.smtp:
+        sinks.append(SmtpSink(*smtp.address, "bench@weather.local", ["ops@weather.local"]))
+    sinks.append(FileSink(path))
+    workers = [AlertDeliveryWorker(sinks) for _ in range(args.workers)]
+
+    started = time.perf_counter()
+    deadline = started + args.timeout
+    while await sent_count() < args.alerts and time.perf_counter() < deadline:
+        delivered = await asyncio.gather(*(worker.run() for worker in workers))
+        if not sum(delivered):
+            await asyncio.sleep(0.05)  # Wait for retries to come due
+    seconds = time.perf_counter() - started
+
+    stats = alert_delivery.get_delivery_stats()
+    delivered = await sent_count()
+    # Ids delivered more than once to the webhook: a failed chunk is retried as a whole
+    duplicates = sum(n - 1 for n in Counter(webhook.received).values() if n > 1)
+    return {"mode": "delivery worker", "workers": args.workers, "sinks": "+".join(s.name for s in sinks),
+            "seconds": round(seconds, 2), "delivered": delivered, "alerts_per_s": round(delivered / seconds, 1),
+            "webhook_p95_ms": stats["sink_latency"]["webhook"]["p95_ms"], "retries": stats["failed_attempts"],
+            "duplicates": duplicates}
+
+
+async def run(args) -> list:
+    from sqlalchemy import delete
+    from src.database.connection import AsyncSessionLocal, engine
+    from src.models.weather import WeatherAlert
+    from src.services.http_client import close_http_client
+
+    rows = []
+    with StubWebhookServer(latency=args.latency, fail_rate=args.fail_rate) as webhook, \
+            StubSmtpServer(latency=args.latency / 10) as smtp, \
+            tempfile.TemporaryDirectory() as tmp:
+        if args.naive:
+            rows.append(await run_naive(args, webhook))
+            webhook.received.clear()
+        path = os.path.join(tmp, "alerts.ndjson")
+        rows.append(await run_worker(args, webhook, smtp, path))
+        with open(path) as f:
+            rows[-1]["file_lines"] = sum(1 for _ in f)
+        if args.smtp:
+            rows[-1]["emails"] = len(smtp.messages)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(WeatherAlert).where(WeatherAlert.city == CITY))
+        await db.commit()
+    await close_http_client()
+    await engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent delivery workers (claims use SKIP LOCKED)")
+    parser.add_argument("--latency", type=float, default=0.01, help="webhook stub latency in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of webhook calls answered with 503")
+    parser.add_argument("--smtp", action="store_true", help="also deliver through the SMTP stub")
+    parser.add_argument("--naive", action="store_true", help="also time one-at-a-time delivery")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    # Retries come due almost immediately so the run finishes
+    bootstrap_env(ALERT_DELIVERY_BACKOFF_BASE=0.05, ALERT_DELIVERY_BACKOFF_MAX=0.5, ALERT_DELIVERY_MAX_ATTEMPTS=20)
+    rows = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    headers = sorted({key for row in rows for key in row}, key=lambda key: list(rows[-1]).index(key)
+                     if key in rows[-1] else 0)
+    print_table(headers, [[row.get(h, "") for h in headers] for row in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Compare the NumPy analytics service with the same statistics computed in pure-Python loops
+
+The pure-Python version mirrors how compute_dashboard_summary worked on ORM rows:
+one city at a time, one list per metric. Both produce the same numbers (checked).
+    python -m benchmarks.analytics_benchmark --cities 10 100 500 --readings 336
+
+With --db it also times loading the series from DATABASE_URL as WeatherData
+objects versus the array_agg columnar load used by the service.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+from benchmarks.common import bootstrap_env, print_table
+
+READING_INTERVAL = 1800  # seconds, the fetch job's cadence
+
+
+def synthetic_batch(cities: int, readings: int, seed: int = 0):
+    import numpy as np
+    from src.services.analytics_service import ANALYTICS_METRICS, SeriesBatch
+
+    rng = np.random.default_rng(seed)
+    start = time.time() - readings * READING_INTERVAL
+    times = np.tile(start + np.arange(readings) * READING_INTERVAL, (cities, 1))
+    base = {"temperature": 25, "humidity": 60, "pressure": 1010, "wind_speed": 4}
+    values = {}
+    for metric in ANALYTICS_METRICS:
+        daily = np.sin(np.arange(readings) * 2 * np.pi / 48)[None, :] * base[metric] * 0.1
+        values[metric] = base[metric] + daily + rng.normal(0, base[metric] * 0.05, (cities, readings))
+        values[metric][:, ::97] += base[metric]  # A few outliers for the anomaly check
+    # Cities that started reporting later are padded at the front
+    for i in range(0, cities, 7):
+        times[i, : readings // 3] = np.nan
+        for metric in values:
+            values[metric][i, : readings // 3] = np.nan
+    names = [f"bench-city-{i}" for i in range(cities)]
+    return SeriesBatch(cities=names, times=times, values=values)
+
+
+def to_python_series(batch):
+    """Per-city lists of (time, value), the shape a loop over ORM rows works with"""
+    series = {}
+    for i, city in enumerate(batch.cities):
+        series[city] = {
+            metric: [
+                (float(t), float(v))
+                for t, v in zip(batch.times[i], values[i])
+                if not (math.isnan(t) or math.isnan(v))
+            ]
+            for metric, values in batch.values.items()
+        }
+    return series
+
+
+def python_percentile(ordered, q):
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def python_analyze(series, window: int, alpha: float, z_threshold: float):
+    results = []
+    for city, metrics in series.items():
+        result = {"city": city, "metrics": {}}
+        for metric, points in metrics.items():
+            values = [v for _, v in points]
+            n = len(values)
+            recent = deque(maxlen=window)
+            smoothed = None
+            for v in values:
+                recent.append(v)
+                smoothed = v if smoothed is None else alpha * v + (1 - alpha) * smoothed
+            mean = sum(values) / n
+            std = math.sqrt(sum((v - mean) ** 2 for v in values) / n)
+            hours = [t / 3600 for t, _ in points]
+            mean_t = sum(hours) / n
+            centered = [h - mean_t for h in hours]
+            denominator = n * sum(c * c for c in centered) - sum(centered) ** 2
+            slope = (n * sum(c * v for c, v in zip(centered, values)) - sum(centered) * sum(values)) / denominator
+            ordered = sorted(values)
+            result["metrics"][metric] = {
+                "count": n,
+                "latest": values[-1],
+                "rolling_mean": sum(recent) / len(recent),
+                "ewma": smoothed,
+                "trend_per_hour": slope,
+                "percentiles": {f"p{q}": python_percentile(ordered, q) for q in (5, 25, 50, 75, 95)},
+                "anomalies": [
+                    {
+                        "time": datetime.fromtimestamp(t, tz=timezone.utc).isoformat(),
+                        "value": round(v, 2),
+                        "zscore": round((v - mean) / std, 2)
+                    }
+                    for t, v in points
+                    if std > 0 and abs((v - mean) / std) > z_threshold
+                ],
+            }
+        results.append(result)
+    return results
+
+
+def check_same(vectorized, python):
+    for fast, slow in zip(vectorized, python):
+        for metric, stats in slow["metrics"].items():
+            other = fast["metrics"][metric]
+            assert other["count"] == stats["count"]
+            for key in ("rolling_mean", "ewma", "latest"):
+                assert math.isclose(other[key], stats[key], abs_tol=0.01), (metric, key, other[key], stats[key])
+            assert math.isclose(other["trend_per_hour"], stats["trend_per_hour"], abs_tol=1e-4)
+            assert len(other["anomalies"]) == len(stats["anomalies"])
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_compute(args):
+    from src.services.analytics_service import AnalyticsService
+
+    rows = []
+    for cities in args.cities:
+        batch = synthetic_batch(cities, args.readings)
+        series = to_python_series(batch)
+        numpy_seconds, fast = timed(lambda: AnalyticsService.analyze(batch, args.window, args.alpha, args.z), args.repeat)
+        python_seconds, slow = timed(lambda: python_analyze(series, args.window, args.alpha, args.z), args.repeat)
+        check_same(fast, slow)
+        rows.append({
+            "cities": cities,
+            "readings": args.readings,
+            "python_ms": round(python_seconds * 1000, 1),
+            "numpy_ms": round(numpy_seconds * 1000, 1),
+            "speedup": round(python_seconds / numpy_seconds, 1),
+        })
+    return rows
+
+
+async def run_load(args):
+    from datetime import timedelta
+    from sqlalchemy import distinct, select
+    from src.database.connection import AsyncSessionLocal, engine
+    from src.models.weather import WeatherData
+    from src.services.analytics_service import AnalyticsService
+
+    since = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+    async with AsyncSessionLocal() as db:
+        cities = list(await db.scalars(
+            select(distinct(WeatherData.city)).where(WeatherData.recorded_at >= since, WeatherData.is_deleted == False)
+        ))
+        started = time.perf_counter()
+        orm_rows = (await db.scalars(
+            select(WeatherData)
+            .where(WeatherData.city.in_(cities), WeatherData.recorded_at >= since, WeatherData.is_deleted == False)
+            .order_by(WeatherData.city, WeatherData.recorded_at)
+        )).all()
+        orm_seconds = time.perf_counter() - started
+        db.expunge_all()
+
+        started = time.perf_counter()
+        batch = await AnalyticsService.load_series(db, cities, since)
+        columnar_seconds = time.perf_counter() - started
+    await engine.dispose()
+    return [{
+        "cities": len(cities),
+        "readings": len(orm_rows),
+        "orm_load_ms": round(orm_seconds * 1000, 1),
+        "array_load_ms": round(columnar_seconds * 1000, 1),
+        "array_shape": "x".join(map(str, batch.times.shape)),
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--readings", type=int, default=336, help="readings per city (336 = 7 days at 30 min)")
+    parser.add_argument("--window", type=int, default=6)
+    parser.add_argument("--alpha", type=float, default=0.3)
+    parser.add_argument("--z", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", action="store_true", help="also time loading series from the database")
+    parser.add_argument("--hours", type=int, default=24, help="history loaded with --db")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    results = {"compute": run_compute(args)}
+    if args.db:
+        results["load"] = asyncio.run(run_load(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, rows in results.items():
+        print(f"\n{name}")
+        headers = list(rows[0].keys())
+        print_table(headers, [[row[h] for h in headers] for row in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare rows/second for per-row save_weather_data vs. the bulk writer
+
+Needs a reachable database in DATABASE_URL (migrations are applied first):
+    python -m benchmarks.bulk_insert_benchmark --rows 5000 --flush-size 100 500 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.common import bootstrap_env, print_table
+from benchmarks.stubs import fake_weather_payload
+
+BENCH_CITY_PREFIX = "bench-insert-"
+
+
+async def run(args):
+    from sqlalchemy import delete
+    from src.database.connection import AsyncSessionLocal, engine
+    from src.database.migrations import run_migrations
+    from src.models.weather import WeatherData
+    from src.services.weather_service import WeatherService
+    from src.services.bulk_writer import BulkWeatherWriter
+
+    await run_migrations()
+
+    payloads = [fake_weather_payload(f"{BENCH_CITY_PREFIX}{i % 100}") for i in range(args.rows)]
+    rows = []
+
+    async def cleanup():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(WeatherData).where(WeatherData.city.like(f"{BENCH_CITY_PREFIX}%")))
+            await db.commit()
+
+    await cleanup()
+    per_row_count = min(args.rows, args.per_row_limit)
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for payload in payloads[:per_row_count]:
+            await WeatherService.save_weather_data(db, payload)
+        elapsed = time.perf_counter() - started
+    rows.append({"method": "per-row", "flush_size": 1, "rows": per_row_count,
+                 "seconds": round(elapsed, 3), "rows_per_second": round(per_row_count / elapsed, 1)})
+    await cleanup()
+
+    for flush_size in args.flush_size:
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            async with BulkWeatherWriter(db, flush_size=flush_size, flush_interval=0) as writer:
+                for payload in payloads:
+                    await writer.add(payload)
+            elapsed = time.perf_counter() - started
+        rows.append({"method": "bulk", "flush_size": flush_size, "rows": len(writer.saved),
+                     "seconds": round(elapsed, 3), "rows_per_second": round(len(writer.saved) / elapsed, 1)})
+        await cleanup()
+
+    await engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--per-row-limit", type=int, default=2000, help="cap for the slow per-row pass")
+    parser.add_argument("--flush-size", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    rows = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(list(rows[0].keys()), [list(r.values()) for r in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare two benchmarks.run_suite result files and flag regressions
+
+Rows are matched on (benchmark, name, size). Throughput metrics (rps,
+*_per_second) regress when they drop, timings (seconds, *_ms) when they grow,
+by more than --threshold (a fraction); errors and failed fetches regress when
+they grow at all.
+Exits with status 1 when anything regressed, suitable for CI:
+    python -m benchmarks.compare_results .cache/benchmarks/<old>.json .cache/benchmarks/<new>.json
+"""
+import argparse
+import json
+import sys
+from benchmarks.common import print_table
+
+
+def direction(metric: str) -> int:
+    """+1 when higher is better, -1 when lower is better, 0 for informational fields"""
+    if metric == "rps" or metric.endswith("_per_second"):
+        return 1
+    if metric in ("seconds", "errors", "failed") or metric.endswith("_seconds") or metric.endswith("_ms"):
+        return -1
+    return 0
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {(row["benchmark"], row["name"], row["size"]): row for row in report["results"]}, report
+
+
+def compare(old: dict, new: dict, threshold: float, metrics=None) -> list:
+    rows = []
+    for key in sorted(old.keys() & new.keys(), key=lambda k: (k[2], k[0], k[1])):
+        for metric, before in old[key].items():
+            after = new[key].get(metric)
+            better = direction(metric)
+            if not better or (metrics and metric not in metrics):
+                continue
+            if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+                continue
+            change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+            if metric in ("errors", "failed"):
+                verdict = "REGRESSION" if after > before else ""
+            elif change * better < -threshold:
+                verdict = "REGRESSION"
+            elif change * better > threshold:
+                verdict = "improved"
+            else:
+                verdict = ""
+            rows.append({
+                "benchmark": key[0], "name": key[1], "size": key[2], "metric": metric,
+                "before": before, "after": after, "change_pct": round(change * 100, 1), "verdict": verdict,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts (default 0.10)")
+    parser.add_argument("--metrics", nargs="+", help="only compare these metrics, e.g. rps p99_ms seconds")
+    parser.add_argument("--changes-only", action="store_true", help="hide rows within the threshold")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    old, old_report = load(args.baseline)
+    new, new_report = load(args.candidate)
+    rows = compare(old, new, args.threshold, args.metrics)
+    regressions = [row for row in rows if row["verdict"] == "REGRESSION"]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        shown = [row for row in rows if row["verdict"]] if args.changes_only else rows
+        if shown:
+            print_table(list(shown[0]), [list(row.values()) for row in shown])
+        for label, report in (("baseline", old_report), ("candidate", new_report)):
+            git = report.get("git", {})
+            print(f"{label}: {git.get('commit')}{' (dirty)' if git.get('dirty') else ''} {report.get('started_at')}")
+        if old_report.get("config") != new_report.get("config"):
+            print("warning: the two runs used different suite options", file=sys.stderr)
+        unmatched = old.keys() ^ new.keys()
+        if unmatched:
+            print(f"warning: {len(unmatched)} rows appear in only one file", file=sys.stderr)
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
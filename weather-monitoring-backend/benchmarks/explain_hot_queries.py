@@ -0,0 +1,122 @@
+"""Fail if any hot query falls back to a sequential scan
+
+Runs the real service calls against DATABASE_URL, records every SELECT they emit
+and EXPLAINs it with enable_seqscan disabled. The planner then only picks a
+Seq Scan when no index can serve the query, so a regression shows up even on a
+near-empty database. Exits with status 1 on failure:
+    python -m benchmarks.explain_hot_queries
+tests/test_query_plans.py runs the same check as part of the test suite.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from benchmarks.common import bootstrap_env
+
+HOT_TABLES = {
+    "weather_data", "weather_alerts", "dashboard_summary",
+    "weather_hourly", "weather_daily", "alert_states",
+}
+
+# EXPLAIN names the partition it scans (weather_data_p20260101, weather_data_default), never the parent
+PARTITION_PREFIXES = {"weather_data_p": "weather_data", "weather_data_default": "weather_data"}
+
+
+def hot_table(relation: str) -> str:
+    """The table a scanned relation belongs to: the parent of a partition, else itself"""
+    for prefix, parent in PARTITION_PREFIXES.items():
+        if relation.startswith(prefix):
+            return parent
+    return relation
+
+
+def find_seq_scans(plan: dict) -> list:
+    """Return the relations scanned sequentially anywhere in a JSON plan tree"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and hot_table(plan.get("Relation Name", "")) in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+async def capture_hot_queries() -> list:
+    """Run the hot read paths and return the (statement, parameters) pairs they executed"""
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from src.config.settings import settings
+    from src.database.connection import engine
+    from src.services.weather_service import WeatherService
+    from src.services.alert_service import AlertService
+    from src.services.alert_state import AlertStateIndex
+    from src.services.rollup_service import RollupService
+
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        # Service commits become savepoints inside an outer transaction that is
+        # rolled back, so the database is left untouched
+        async with engine.connect() as conn:
+            outer = await conn.begin()
+            db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+            city = settings.CITY_NAME
+            await WeatherService.get_latest_weather(db, city=city)
+            await WeatherService.get_dashboard_summary(db, city=city)
+            await AlertService.get_recent_alerts(db, city=city)
+            await AlertService.check_weather_alerts(db)
+            await WeatherService.compute_dashboard_summaries(db, cities=[city])
+            await WeatherService.compute_dashboard_summaries(db)
+            for granularity in ("hourly", "daily"):
+                await RollupService.get_rollups(db, city, granularity, start=datetime.now(timezone.utc) - timedelta(days=7))
+            await AlertStateIndex().refresh(db, [city])
+            await db.close()
+            await outer.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    return captured
+
+
+async def explain_seq_scans(queries: list) -> list:
+    """EXPLAIN each (statement, parameters) with seq scans disabled: [(statement, seq-scanned relations)]"""
+    from src.database.connection import engine
+
+    results = []
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        try:
+            for statement, parameters in queries:
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = result.scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                results.append((statement, find_seq_scans(plan[0]["Plan"])))
+        finally:
+            await conn.exec_driver_sql("RESET enable_seqscan")
+    return results
+
+
+async def run() -> int:
+    from src.database.connection import engine
+    from src.database.migrations import run_migrations
+
+    await run_migrations()
+    failures = 0
+    for statement, seq_scans in await explain_seq_scans(await capture_hot_queries()):
+        status = "SEQ SCAN on " + ", ".join(seq_scans) if seq_scans else "ok"
+        failures += bool(seq_scans)
+        print(f"[{status}] {' '.join(statement.split())[:140]}")
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+def main():
+    bootstrap_env()
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Measure /api/weather/export throughput and the API worker's peak RSS per format
+
+Seeds `--rows` readings for one city (kept between runs, so only the first run
+pays for it), then downloads the whole range once per format from a fresh
+uvicorn worker and reports rows/second and the worker's peak RSS (VmHWM):
+    python -m benchmarks.export_benchmark --rows 10000000 --formats csv ndjson parquet
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import bootstrap_env, print_table
+
+BENCH_CITY = "bench-export"
+
+
+def serve(port: int):
+    bootstrap_env()
+    import uvicorn
+    from fastapi import FastAPI
+    from src.api.routes import weather
+
+    app = FastAPI()
+    app.include_router(weather.router)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def seed(rows: int, chunk: int = 1_000_000):
+    from sqlalchemy import func, select, text
+    from src.database.connection import AsyncSessionLocal, engine
+    from src.database.migrations import run_migrations
+    from src.models.weather import WeatherData
+
+    await run_migrations()
+    async with AsyncSessionLocal() as db:
+        existing = await db.scalar(
+            select(func.count()).select_from(WeatherData).where(WeatherData.city == BENCH_CITY)
+        )
+        for offset in range(existing, rows, chunk):
+            # One reading every 10ms going back from now, so the range spans the live partitions
+            await db.execute(text(
+                "INSERT INTO weather_data (city, temperature, feels_like, temp_min, temp_max, humidity, "
+                "pressure, weather_main, weather_description, wind_speed, clouds, recorded_at, is_deleted) "
+                "SELECT :city, 20 + random() * 10, 20 + random() * 10, 18, 32, (random() * 100)::int, "
+                "1000 + (random() * 30)::int, 'Clouds', 'scattered clouds', random() * 10, (random() * 100)::int, "
+                "now() - g * interval '10 milliseconds', false "
+                "FROM generate_series(CAST(:lo AS bigint), CAST(:hi AS bigint)) g"
+            ), {"city": BENCH_CITY, "lo": offset + 1, "hi": min(offset + chunk, rows)})
+            await db.commit()
+            print(f"seeded {min(offset + chunk, rows)}/{rows} rows", file=sys.stderr)
+        if existing < rows:
+            await db.execute(text("ANALYZE weather_data"))
+            await db.commit()
+    await engine.dispose()
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+def count_rows(fmt: str, path: str) -> int:
+    if fmt == "parquet":
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetFile(path).metadata.num_rows
+    with open(path, "rb") as f:
+        lines = sum(1 for _ in f)
+    return lines - 1 if fmt == "csv" else lines
+
+
+async def export_once(fmt: str, port: int, fields: str) -> dict:
+    import httpx
+
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.export_benchmark", "--serve", "--port", str(port)])
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/api/weather/stream-stats")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            idle_rss = peak_rss_mb(server.pid)
+
+            params = {"format": fmt, "city": BENCH_CITY}
+            if fields:
+                params["fields"] = fields
+            size = 0
+            with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as out:
+                started = time.perf_counter()
+                async with client.stream("GET", "/api/weather/export", params=params) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_raw():
+                        out.write(chunk)
+                        size += len(chunk)
+                elapsed = time.perf_counter() - started
+        rows = count_rows(fmt, out.name)
+        os.unlink(out.name)
+        return {
+            "format": fmt,
+            "rows": rows,
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(rows / elapsed),
+            "mb": round(size / 1e6, 1),
+            "idle_rss_mb": idle_rss,
+            "peak_rss_mb": peak_rss_mb(server.pid),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def run(args):
+    await seed(args.rows)
+    return [await export_once(fmt, args.port, args.fields) for fmt in args.formats]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "parquet"],
+                        choices=["csv", "ndjson", "parquet"])
+    parser.add_argument("--fields", default=None, help="comma-separated projection, all columns when omitted")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    bootstrap_env()
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        headers = list(results[0].keys())
+        print_table(headers, [[r[h] for h in headers] for r in results])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Fetch many cities by name vs through /group under an API plan's calls-per-minute limit
+
+Runs against a local stub OpenWeather server that answers 429 beyond the plan,
+no database is touched. The first run resolves every city by name (one request
+each) and learns its OpenWeather ID; the second fetches the same cities through
+/group, FETCH_GROUP_SIZE IDs per request:
+    python -m benchmarks.group_fetch_benchmark --cities 1000 --plan 600
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from benchmarks.common import bootstrap_env, print_table
+from benchmarks.stubs import StubOpenWeatherServer
+
+
+async def run(args, stub) -> list:
+    from src.services.ingestion_service import IngestionService
+    from src.services.city_ids import city_id_cache
+    from src.services.http_client import close_http_client, get_http_client_stats, reset_http_client_stats
+    from src.utils.rate_limiter import HostRateLimiter
+
+    cities = [f"City{i:04d}" for i in range(args.cities)]
+    rows = []
+    for mode in ("by name (cold ID cache)", "/group (warm ID cache)"):
+        reset_http_client_stats()
+        requests, throttled = stub.requests, stub.throttled
+        result = await IngestionService.fetch_cities(
+            cities, concurrency=args.concurrency, city_timeout=args.city_timeout,
+            rate_limiter=HostRateLimiter(10_000.0)
+        )
+        rows.append({
+            "mode": mode,
+            "cities": result.total,
+            "ok": len(result.payloads),
+            "failed": len(result.failed),
+            "requests": result.requests,
+            "http_attempts": get_http_client_stats()["requests"],
+            "429s": stub.throttled - throttled,
+            "seconds": round(result.duration, 2),
+            "cities_per_s": round(result.total / result.duration, 1),
+        })
+        assert stub.requests - requests == rows[-1]["http_attempts"]
+    rows[-1]["cached_ids"] = len(city_id_cache)
+    await close_http_client()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--plan", type=int, default=600, help="API plan calls per minute (stub answers 429 beyond it)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response latency in seconds")
+    parser.add_argument("--city-timeout", type=float, default=120.0)
+    parser.add_argument("--no-quota", action="store_true",
+                        help="do not size the client's token bucket to the plan (shows the 429s it prevents)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with StubOpenWeatherServer(latency=args.latency, calls_per_minute=args.plan) as stub, \
+            tempfile.TemporaryDirectory() as tmp:
+        bootstrap_env(
+            OPENWEATHER_BASE_URL=stub.base_url,
+            OPENWEATHER_CALLS_PER_MINUTE=10_000_000 if args.no_quota else args.plan,
+            CITY_ID_CACHE_PATH=os.path.join(tmp, "city_ids.json")
+        )
+        rows = asyncio.run(run(args, stub))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    headers = list(rows[-1])
+    print_table(headers, [[row.get(h, "") for h in headers] for row in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure multi-city ingestion throughput (cities/second) at several concurrency limits
+
+Runs entirely against a local stub OpenWeather server, no database is touched:
+    python -m benchmarks.ingestion_benchmark --cities 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from benchmarks.common import bootstrap_env, print_table
+from benchmarks.stubs import StubOpenWeatherServer
+
+
+async def run(args):
+    from src.services.ingestion_service import IngestionService
+    from src.services.http_client import close_http_client, get_http_client_stats, reset_http_client_stats
+    from src.utils.rate_limiter import HostRateLimiter
+
+    cities = [f"City{i:04d}" for i in range(args.cities)]
+    if args.slow_city:
+        cities[0] = "SlowCity"
+
+    rows = []
+    for concurrency in args.concurrency:
+        # Fresh limiter per run so earlier runs do not eat the budget
+        limiter = HostRateLimiter(args.rate_limit)
+        reset_http_client_stats()
+        result = await IngestionService.fetch_cities(
+            cities, concurrency=concurrency, city_timeout=args.city_timeout, rate_limiter=limiter
+        )
+        rows.append({
+            "concurrency": concurrency,
+            "cities": result.total,
+            "ok": len(result.payloads),
+            "failed": len(result.failed),
+            "seconds": round(result.duration, 3),
+            "cities_per_second": round(result.total / result.duration, 1),
+            "new_connections": get_http_client_stats()["new_connections"],
+        })
+    await close_http_client()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 25, 50, 100])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response latency in seconds")
+    parser.add_argument("--rate-limit", type=float, default=10_000.0, help="per-host requests/second")
+    parser.add_argument("--city-timeout", type=float, default=2.0)
+    parser.add_argument("--slow-city", action="store_true", help="make one city hang past the timeout")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    # One request per city and no API plan limit: this measures concurrency alone
+    with StubOpenWeatherServer(latency=args.latency, slow_cities={"SlowCity"}) as stub, \
+            tempfile.TemporaryDirectory() as tmp:
+        bootstrap_env(
+            OPENWEATHER_BASE_URL=stub.base_url, OPENWEATHER_CALLS_PER_MINUTE=10_000_000,
+            FETCH_GROUP_ENABLED=False, CITY_ID_CACHE_PATH=os.path.join(tmp, "city_ids.json")
+        )
+        rows = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(list(rows[0].keys()), [list(r.values()) for r in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cost of the Prometheus instrumentation: the same workload with METRICS_ENABLED on and off
+
+Each mode runs in its own process (settings are read at import time) against
+DATABASE_URL, and times
+  - in-process requests to GET /api/weather/cities (route latency middleware)
+  - `SELECT 1` round trips on a pooled session (pool checkout + query events)
+    python -m benchmarks.metrics_overhead_benchmark --requests 5000 --queries 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from benchmarks.common import bootstrap_env, print_table
+
+
+async def child(args) -> dict:
+    import httpx
+    from sqlalchemy import text
+    from src.main import app
+    from src.database.connection import AsyncSessionLocal, engine
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/api/weather/cities")
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            await client.get("/api/weather/cities")
+        request_us = (time.perf_counter() - started) / args.requests * 1e6
+
+    for _ in range(100):
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+    started = time.perf_counter()
+    for _ in range(args.queries):
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+    query_us = (time.perf_counter() - started) / args.queries * 1e6
+    await engine.dispose()
+    return {"request_us": round(request_us, 1), "session_query_us": round(query_us, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3, help="alternating off/on runs; the best of each is kept")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+        return
+
+    best = {}
+    for _ in range(args.rounds):
+        for enabled in ("false", "true"):
+            env = {**os.environ, "METRICS_ENABLED": enabled, "LOG_LEVEL": "WARNING"}
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.metrics_overhead_benchmark", "--child",
+                 "--requests", str(args.requests), "--queries", str(args.queries)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            run = json.loads(output)
+            previous = best.get(enabled)
+            best[enabled] = {k: min(v, previous[k]) if previous else v for k, v in run.items()}
+
+    rows = []
+    for metric in ("request_us", "session_query_us"):
+        off, on = best["false"][metric], best["true"][metric]
+        rows.append({"operation": metric, "metrics_off": off, "metrics_on": on,
+                     "overhead_us": round(on - off, 1), "overhead_pct": round(100 * (on - off) / off, 1)})
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print_table(list(rows[0]), [list(row.values()) for row in rows])
+
+
+if __name__ == "__main__":
+    main()
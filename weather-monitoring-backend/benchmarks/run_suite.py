@@ -0,0 +1,435 @@
+"""End-to-end benchmark suite: seeded database, the real app over HTTP, a stub OpenWeather
+
+For each data size, against a database dedicated to benchmarks (its name must
+contain "bench"; every table the suite touches is emptied first):
+  1. seed `size` weather_data rows spread over `--cities` cities and `--days`
+     days (daily partitions and rollups included, as the app would have them)
+  2. time the jobs: compute_dashboard_summaries, check_weather_alerts
+  3. start `src.main:app` under uvicorn (scheduler off) and measure throughput
+     and p50/p99 latency of the GET endpoints at `--concurrency`, in rounds
+  4. time ingestion from the stub OpenWeather server, cold (by name) and warm (/group)
+  5. time cleanup_old_data (last, it soft deletes the rows past retention)
+Results go to a JSON file named after the commit, for benchmarks.compare_results:
+    python -m benchmarks.run_suite --sizes 100000 1000000 10000000
+Postgres only: the schema relies on partitioning and ON CONFLICT upserts.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+from benchmarks.common import bootstrap_env, print_table
+from benchmarks.stubs import StubOpenWeatherServer
+
+SUITE_VERSION = 1
+RESET_TABLES = [
+    "weather_data", "weather_hourly", "weather_daily", "dashboard_summary",
+    "weather_alerts", "alert_states", "fetch_schedule", "job_leases",
+]
+ENDPOINTS = [
+    ("GET /api/weather/current", "/api/weather/current", lambda city: {"city": city}),
+    ("GET /api/weather/dashboard", "/api/weather/dashboard", lambda city: {"city": city}),
+    ("GET /api/weather/alerts", "/api/weather/alerts", lambda city: {"city": city}),
+    ("GET /api/weather/history", "/api/weather/history", lambda city: {
+        "city": city, "limit": 100, "from": (datetime.now(timezone.utc) - timedelta(hours=6)).isoformat()
+    }),
+    ("GET /api/weather/rollups", "/api/weather/rollups", lambda city: {"city": city, "granularity": "hourly"}),
+    ("GET /api/weather/analytics", "/api/weather/analytics", lambda city: {"city": city, "hours": 24}),
+    ("GET /api/weather/cities", "/api/weather/cities", lambda city: {}),
+    ("GET /health", "/health", lambda city: {}),
+]
+
+
+def bench_cities(count: int, prefix: str = "bench") -> list:
+    return [f"{prefix}-{i:04d}" for i in range(count)]
+
+
+def git_revision() -> dict:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection doing GETs and discarding bodies
+
+    Lighter than an httpx client per request (about 3x the requests/second from
+    one core), so the load generator takes less CPU from the server it measures.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, path: str, params: dict = None) -> int:
+        if self.reader is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        target = f"{path}?{urlencode(params, doseq=True)}" if params else path
+        self.writer.write(f"GET {target} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+        lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in lines[1:] if line)}
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        if headers.get("connection") == "close":
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def serve(port: int):
+    import uvicorn
+    uvicorn.run("src.main:app", host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+async def reset_database():
+    """Empty the suite's tables and drop partitions archived by a previous cleanup run"""
+    from sqlalchemy import text
+    from src.database.connection import AsyncSessionLocal
+    from src.services.alert_service import alert_rule_cache
+    from src.services.alert_state import alert_state_index
+
+    async with AsyncSessionLocal() as db:
+        archived = await db.scalars(text(
+            "SELECT c.relname FROM pg_class c WHERE c.relname LIKE 'weather_data\\_p%' AND c.relkind = 'r' "
+            "AND NOT c.relispartition"
+        ))
+        for name in archived.all():
+            await db.execute(text(f'DROP TABLE "{name}"'))
+        await db.execute(text(f"TRUNCATE {', '.join(RESET_TABLES)}"))
+        await db.commit()
+    alert_state_index.reset()
+    alert_rule_cache.invalidate()
+
+
+async def create_partitions(days: int):
+    """Daily partitions for the seeded range, like the ones ensure_partitions created day by day"""
+    from sqlalchemy import text
+    from src.database.connection import AsyncSessionLocal
+    from src.services.partition_service import PARENT_TABLE, PartitionService
+
+    async with AsyncSessionLocal() as db:
+        if not await PartitionService.is_partitioned(db):
+            return
+        await PartitionService.ensure_partitions(db, interval="day")
+        existing = await PartitionService.list_partitions(db)
+        lower = PartitionService.partition_start(datetime.now(timezone.utc) - timedelta(days=days), "day")
+        while not any(p.lower <= lower < p.upper for p in existing):
+            upper = lower + timedelta(days=1)
+            await db.execute(text(
+                f'CREATE TABLE "{PARENT_TABLE}_p{lower:%Y%m%d}" PARTITION OF {PARENT_TABLE} '
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            lower = upper
+        await db.commit()
+
+
+async def seed(size: int, cities: list, days: int, chunk: int = 1_000_000) -> float:
+    """Insert `size` deterministic readings, newest at now(), then backfill the rollups"""
+    from sqlalchemy import text
+    from src.database.connection import AsyncSessionLocal
+    from src.models.weather import ROLLUP_METRICS
+
+    started = time.perf_counter()
+    await create_partitions(days)
+    step = days * 86400 / max(1, size // len(cities))
+    async with AsyncSessionLocal() as db:
+        for lo in range(0, size, chunk):
+            await db.execute(text(
+                "INSERT INTO weather_data (city, temperature, feels_like, temp_min, temp_max, humidity, pressure, "
+                "weather_main, weather_description, wind_speed, clouds, recorded_at, observed_at, is_deleted) "
+                "SELECT 'bench-' || lpad((g % :cities)::text, 4, '0'), t, t - 1, t - 2, t + 2, "
+                "(g * 7919 % 100)::int, 985 + (g * 104729 % 50)::int, "
+                "(ARRAY['Clear', 'Clouds', 'Rain', 'Thunderstorm'])[g % 4 + 1], 'bench', "
+                "abs(sin(g * 0.013)) * 20, (g * 31 % 100)::int, ts, ts, false "
+                "FROM generate_series(CAST(:lo AS bigint), CAST(:hi AS bigint)) g, "
+                "LATERAL (SELECT round((10 + 30 * abs(sin(g * 0.0007)))::numeric, 2)::float AS t, "
+                "now() - (g / :cities) * :step * interval '1 second' AS ts) v"
+            ), {"cities": len(cities), "lo": lo, "hi": min(lo + chunk, size) - 1, "step": step})
+            await db.commit()
+            print(f"seeded {min(lo + chunk, size)}/{size} rows", file=sys.stderr)
+
+        aggregates = ", ".join(
+            f"count({m}), coalesce(sum({m}), 0), min({m}), max({m}), coalesce(sum({m}::float * {m}), 0)"
+            for m in ROLLUP_METRICS
+        )
+        columns = ", ".join(
+            ["city", "bucket", "observations"]
+            + [f"{m}_{part}" for m in ROLLUP_METRICS for part in ("count", "sum", "min", "max", "sumsq")]
+        )
+        for table, unit in (("weather_hourly", "hour"), ("weather_daily", "day")):
+            await db.execute(text(
+                f"INSERT INTO {table} ({columns}) SELECT city, date_trunc('{unit}', recorded_at, 'UTC'), count(*), "
+                f"{aggregates} FROM weather_data WHERE is_deleted = false GROUP BY 1, 2"
+            ))
+        await db.commit()
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+    return time.perf_counter() - started
+
+
+async def time_job(name: str, size: int, job, repeat: int, setup=None) -> dict:
+    from src.database.connection import AsyncSessionLocal
+
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            result = await job(db)
+            runs.append(time.perf_counter() - started)
+    return {
+        "benchmark": "job", "name": name, "size": size,
+        "seconds": round(statistics.median(runs), 4), "min_seconds": round(min(runs), 4),
+        "runs": repeat, "items": result,
+    }
+
+
+async def run_jobs(size: int, cities: list, repeat: int) -> list:
+    from sqlalchemy import text
+    from src.database.connection import AsyncSessionLocal
+    from src.services.alert_service import AlertService
+    from src.services.alert_state import alert_state_index
+    from src.services.weather_service import WeatherService
+
+    async def summaries(db):
+        return len(await WeatherService.compute_dashboard_summaries(db))
+
+    async def alerts(db):
+        return len(await AlertService.check_weather_alerts(db, cities=cities))
+
+    async def forget_alerts():
+        # Checks skip readings they have seen: start each run from no alerts and no state
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("TRUNCATE weather_alerts, alert_states"))
+            await db.commit()
+        alert_state_index.reset()
+
+    return [
+        await time_job("compute_dashboard_summaries", size, summaries, repeat),
+        await time_job("check_weather_alerts", size, alerts, repeat, setup=forget_alerts),
+    ]
+
+
+async def load_endpoint(connections: list, path: str, params, cities: list, requests: int) -> dict:
+    latencies = []
+    errors = 0
+    issued = 0
+
+    async def worker(connection: HttpConnection):
+        nonlocal errors, issued
+        while issued < requests:
+            city = cities[issued % len(cities)]
+            issued += 1
+            started = time.perf_counter()
+            status = await connection.get(path, params(city))
+            latencies.append(time.perf_counter() - started)
+            errors += status >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(connection) for connection in connections))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def wait_until_serving(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        connection = HttpConnection("127.0.0.1", port)
+        try:
+            await connection.get("/health")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+        finally:
+            connection.close()
+
+
+async def run_endpoints(size: int, cities: list, args) -> list:
+    """Load each endpoint in turn, `--rounds` times over, and keep each metric's median round"""
+    env = {**os.environ, "SCHEDULER_ENABLED": "false", "RUN_MIGRATIONS_ON_STARTUP": "false"}
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.run_suite", "--serve", "--port", str(args.port)], env=env)
+    connections = [HttpConnection("127.0.0.1", args.port) for _ in range(args.concurrency)]
+    rounds = {name: [] for name, _, _ in ENDPOINTS}
+    try:
+        await wait_until_serving(args.port)
+        for name, path, params in ENDPOINTS:
+            await load_endpoint(connections, path, params, cities, args.warmup)
+        for _ in range(args.rounds):
+            for name, path, params in ENDPOINTS:
+                rounds[name].append(await load_endpoint(connections, path, params, cities, args.requests))
+    finally:
+        for connection in connections:
+            connection.close()
+        server.terminate()
+        server.wait()
+    return [
+        {
+            "benchmark": "endpoint", "name": name, "size": size,
+            "requests": sum(r["requests"] for r in results), "errors": sum(r["errors"] for r in results),
+            **{metric: statistics.median(r[metric] for r in results) for metric in ("rps", "p50_ms", "p99_ms")},
+        }
+        for name, results in rounds.items()
+    ]
+
+
+async def run_ingestion(size: int, args) -> list:
+    from src.database.connection import AsyncSessionLocal
+    from src.services.ingestion_service import IngestionService
+    from src.services.http_client import close_http_client
+    from src.services.city_ids import city_id_cache
+
+    cities = bench_cities(args.ingest_cities, prefix="bench-ingest")
+    for city in cities:
+        city_id_cache.discard(city)  # Learnt by the previous size's run
+    rows = []
+    for name in ("ingest cold (by name)", "ingest warm (/group)"):
+        async with AsyncSessionLocal() as db:
+            result = await IngestionService.ingest(db, cities=cities)
+        rows.append({
+            "benchmark": "ingestion", "name": name, "size": size,
+            "seconds": round(result.duration, 3),
+            "cities_per_second": round(result.total / result.duration, 1),
+            "rows_per_second": round(result.saved / result.duration, 1),
+            "saved": result.saved, "failed": len(result.failed), "upstream_requests": result.requests,
+        })
+    await close_http_client()
+    return rows
+
+
+async def run_cleanup(size: int) -> dict:
+    from src.config.settings import settings
+    from src.services.weather_service import WeatherService
+
+    async def cleanup(db):
+        return await WeatherService.cleanup_old_data(db, days=settings.WEATHER_DATA_RETENTION_DAYS, hard_delete=False)
+
+    return await time_job("cleanup_old_data", size, cleanup, 1)
+
+
+async def run(args, cities: list) -> dict:
+    from sqlalchemy import text
+    from sqlalchemy.engine import make_url
+    from src.config.settings import settings
+    from src.database.connection import AsyncSessionLocal, engine
+    from src.database.migrations import run_migrations
+
+    database = make_url(settings.DATABASE_URL).database or ""
+    if "bench" not in database and not args.force:
+        sys.exit(f"Refusing to empty tables in {database!r}: use a database whose name contains 'bench', or --force")
+
+    await run_migrations()
+    async with AsyncSessionLocal() as db:
+        server_version = await db.scalar(text("SHOW server_version"))
+
+    seeding, results = [], []
+    for size in sorted(args.sizes):
+        await reset_database()
+        seeded = await seed(size, cities, args.days)
+        seeding.append({"size": size, "seconds": round(seeded, 2)})
+        results.extend(await run_jobs(size, cities, args.repeat))
+        results.extend(await run_endpoints(size, cities, args))
+        results.extend(await run_ingestion(size, args))
+        results.append(await run_cleanup(size))
+    await engine.dispose()
+
+    return {
+        "suite_version": SUITE_VERSION,
+        "git": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "postgres": server_version,
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("serve", "output")},
+        "seeding": seeding,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000], help="weather_data rows")
+    parser.add_argument("--cities", type=int, default=50, help="cities the seeded rows are spread over")
+    parser.add_argument("--days", type=int, default=7, help="days of history the seeded rows cover")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per endpoint and round")
+    parser.add_argument("--rounds", type=int, default=3, help="endpoint rounds (each metric's median is kept)")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per job (the median is kept)")
+    parser.add_argument("--ingest-cities", type=int, default=500)
+    parser.add_argument("--upstream-latency", type=float, default=0.02, help="stub OpenWeather latency in seconds")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", help="JSON results path (default .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--force", action="store_true", help="run even if the database name lacks 'bench'")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    cities = bench_cities(args.cities)
+    ingest_cities = bench_cities(args.ingest_cities, prefix="bench-ingest")
+    with StubOpenWeatherServer(latency=args.upstream_latency, cities=ingest_cities) as stub, \
+            tempfile.TemporaryDirectory() as tmp:
+        bootstrap_env(
+            # No plan quota or per-host limit: ingestion is measured, not the configured budget
+            OPENWEATHER_BASE_URL=stub.base_url, OPENWEATHER_CALLS_PER_MINUTE=10_000_000, FETCH_RATE_LIMIT_PER_HOST=10_000,
+            CITY_ID_CACHE_PATH=os.path.join(tmp, "city_ids.json"),
+            CITY_NAME=cities[0], MONITORED_CITIES=",".join(cities[1:])
+        )
+        report = asyncio.run(run(args, cities))
+
+    revision = report["git"]
+    output = args.output or os.path.join(
+        ".cache", "benchmarks", f"{(revision['commit'] or 'unknown')[:12]}{'-dirty' if revision['dirty'] else ''}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    headers = ["benchmark", "name", "size", "seconds", "rps", "p50_ms", "p99_ms", "rows_per_second"]
+    print_table(headers, [[row.get(h, "") for h in headers] for row in report["results"]])
+    print(f"\nwrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Hold thousands of /api/weather/stream subscribers on one worker and measure fan-out
+
+Starts a single uvicorn worker serving the weather router (no database needed),
+opens N raw SSE connections, publishes events through the in-process event bus
+and reports delivery latency and server memory:
+    python -m benchmarks.stream_load_test --subscribers 5000 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from benchmarks.common import bootstrap_env, print_table
+
+CITIES = [f"City{i:02d}" for i in range(20)]
+
+
+def serve(port: int):
+    bootstrap_env()
+    import uvicorn
+    from fastapi import FastAPI
+    from src.api.routes import weather
+    from src.services.event_bus import event_bus
+
+    app = FastAPI()
+    app.include_router(weather.router)
+
+    @app.post("/bench/publish")
+    async def publish(events: int = 1):
+        for i in range(events):
+            city = CITIES[i % len(CITIES)]
+            event_bus.publish("observation", city, {"city": city, "sent_at": time.time()})
+        return event_bus.get_stats()
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096,
+                timeout_graceful_shutdown=5)
+
+
+async def http_get(port: int, path: str, method: str = "GET") -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    data = await reader.read()
+    writer.close()
+    return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+
+async def subscriber(port: int, city, latencies: list, received: list, ready: asyncio.Event):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    query = f"?city={city}" if city else ""
+    writer.write(f"GET /api/weather/stream{query} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+    ready.set()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: {"):
+                payload = json.loads(line[6:])
+                if "sent_at" in payload:
+                    latencies.append(time.time() - payload["sent_at"])
+                    received[0] += 1
+    finally:
+        writer.close()
+
+
+def server_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+async def run(args) -> dict:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.stream_load_test", "--serve", "--port", str(args.port)])
+    try:
+        for _ in range(100):
+            try:
+                await http_get(args.port, "/api/weather/stream-stats")
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+        idle_rss = server_rss_mb(server.pid)
+
+        latencies, received = [], [0]
+        started = time.perf_counter()
+        tasks = []
+        # Half follow one city, half follow every city
+        cities = [CITIES[i % len(CITIES)] if i % 2 else None for i in range(args.subscribers)]
+        for city in cities:
+            ready = asyncio.Event()
+            tasks.append(asyncio.create_task(subscriber(args.port, city, latencies, received, ready)))
+            await ready.wait()
+        while (await http_get(args.port, "/api/weather/stream-stats"))["subscribers"] < args.subscribers:
+            await asyncio.sleep(0.1)
+        connect_seconds = time.perf_counter() - started
+        loaded_rss = server_rss_mb(server.pid)
+
+        # Every event reaches the all-city subscribers plus those following its city
+        per_round = args.events_per_round
+        followers = Counter(city for city in cities if city)
+        all_cities = cities.count(None)
+        expected = args.rounds * sum(all_cities + followers[CITIES[i % len(CITIES)]] for i in range(per_round))
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            await http_get(args.port, f"/bench/publish?events={per_round}", method="POST")
+            await asyncio.sleep(args.interval)
+        deadline = time.perf_counter() + 30
+        while received[0] < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        publish_seconds = time.perf_counter() - started
+        stats = await http_get(args.port, "/api/weather/stream-stats")
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        latencies.sort()
+        return {
+            "subscribers": args.subscribers,
+            "connect_seconds": round(connect_seconds, 2),
+            "events_published": stats["published"],
+            "deliveries": received[0],
+            "expected_deliveries": expected,
+            "coalesced": stats["coalesced"],
+            "dropped": stats["dropped"],
+            "deliveries_per_second": round(received[0] / publish_seconds, 1),
+            "latency_p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "latency_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1) if latencies else None,
+            "server_rss_idle_mb": idle_rss,
+            "server_rss_loaded_mb": loaded_rss,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--events-per-round", type=int, default=len(CITIES))
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between publish rounds")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_table(["metric", "value"], list(result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Local stand-ins for external services used by the benchmarks"""
+import json
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def fake_weather_payload(city: str, dt: int = None) -> dict:
+    """Build an OpenWeather /weather style payload with values derived from the city name and dt"""
+    dt = dt if dt is not None else int(time.time())
+    seed = zlib.crc32(city.encode())
+    rng = random.Random(seed + dt // 600)
+    temp = round(rng.uniform(-5, 42), 2)
+    return {
+        "id": seed % 10_000_000,
+        "name": city,
+        "dt": dt,
+        "main": {
+            "temp": temp,
+            "feels_like": round(temp + rng.uniform(-2, 2), 2),
+            "temp_min": round(temp - rng.uniform(0, 3), 2),
+            "temp_max": round(temp + rng.uniform(0, 3), 2),
+            "humidity": rng.randint(10, 100),
+            "pressure": rng.randint(980, 1040),
+        },
+        "weather": [{"main": rng.choice(["Clear", "Clouds", "Rain", "Thunderstorm"]), "description": "stub"}],
+        "wind": {"speed": round(rng.uniform(0, 20), 2)},
+        "clouds": {"all": rng.randint(0, 100)},
+    }
+
+
+class StubOpenWeatherServer:
+    """Threaded HTTP server answering /data/2.5/weather?q=<city> and /group?id=<ids> with a fixed latency
+
+    Cities listed in `slow_cities` answer after `slow_latency` seconds instead,
+    which lets benchmarks check that one slow city does not stall a tick.
+    With `update_interval`, dt (and the reading) only moves every that many
+    seconds, like a station that publishes periodically. /group knows the IDs of
+    `cities` and of every city already asked for by name. With
+    `calls_per_minute`, requests beyond that many in any `quota_window` seconds
+    (60 by default, shorter for tests) get a 429.
+    Cities in `malformed_cities` are answered without their "main" section.
+    Set `outage` to "error" (answer 503) or "hang" (answer after `slow_latency`)
+    at any time to simulate OpenWeather being down.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 slow_cities=(), slow_latency: float = 30.0, update_interval: int = None,
+                 cities=(), calls_per_minute: int = None, outage: str = None, malformed_cities=(),
+                 quota_window: float = 60.0):
+        self.latency = latency
+        self.update_interval = update_interval
+        self.slow_cities = set(slow_cities)
+        self.slow_latency = slow_latency
+        self.malformed_cities = set(malformed_cities)
+        self.calls_per_minute = calls_per_minute
+        self.quota_window = quota_window
+        self.outage = outage
+        self.requests = 0
+        self.group_requests = 0
+        self.throttled = 0
+        self.names = {fake_weather_payload(city)["id"]: city for city in cities}
+        self._calls = deque()
+        self._lock = threading.Lock()
+        server = self
+
+        def over_quota() -> bool:
+            if not server.calls_per_minute:
+                return False
+            with server._lock:
+                now = time.monotonic()
+                while server._calls and server._calls[0] <= now - server.quota_window:
+                    server._calls.popleft()
+                if len(server._calls) >= server.calls_per_minute:
+                    server.throttled += 1
+                    return True
+                server._calls.append(now)
+                return False
+
+        def weather_payload(city: str, dt: int) -> dict:
+            payload = fake_weather_payload(city, dt)
+            if city in server.malformed_cities:
+                del payload["main"]
+            return payload
+
+        def current_dt() -> int:
+            dt = int(time.time())
+            if server.update_interval:
+                dt -= dt % server.update_interval
+            return dt
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (e.g. per-city timeout), nothing to do
+                    pass
+
+            def do_GET(self):
+                server.requests += 1
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                if server.outage == "error":
+                    self._send_json(503, {"cod": 503, "message": "service unavailable"})
+                elif server.outage == "hang":
+                    time.sleep(server.slow_latency)
+                    self._send_json(503, {"cod": 503, "message": "service unavailable"})
+                elif over_quota():
+                    self._send_json(429, {"cod": 429, "message": "calls per minute exceeded"})
+                elif parsed.path.endswith("/weather") and "q" in query:
+                    city = query["q"][0]
+                    time.sleep(server.slow_latency if city in server.slow_cities else server.latency)
+                    payload = weather_payload(city, current_dt())
+                    server.names[payload["id"]] = city
+                    self._send_json(200, payload)
+                elif parsed.path.endswith("/group") and "id" in query:
+                    server.group_requests += 1
+                    ids = [int(city_id) for city_id in query["id"][0].split(",") if city_id]
+                    if len(ids) > 20:
+                        self._send_json(400, {"cod": "400", "message": "too many ids"})
+                        return
+                    time.sleep(server.latency)
+                    dt = current_dt()
+                    found = [weather_payload(server.names[i], dt) for i in ids if i in server.names]
+                    self._send_json(200, {"cnt": len(found), "list": found})
+                else:
+                    self._send_json(404, {"cod": "404", "message": "not found"})
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 1024
+
+        self._httpd = Server((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/data/2.5"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class StubWebhookServer:
+    """Threaded HTTP server accepting POSTed alert batches
+
+    Answers 503 for a `fail_rate` fraction of requests so retries can be exercised.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.01, fail_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.received = []  # Alert ids, in arrival order
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(server.latency)
+                with server._lock:
+                    server.requests += 1
+                    failed = server._rng.random() < server.fail_rate
+                    if not failed:
+                        server.received.extend(alert["id"] for alert in json.loads(body)["alerts"])
+                self.send_response(503 if failed else 204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/alerts"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class StubSmtpServer:
+    """Minimal threaded SMTP server that accepts and counts messages (no auth, no TLS)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        import socketserver
+
+        self.latency = latency
+        self.messages = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                self.reply("220 stub ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors="replace").strip().upper()
+                    if command.startswith("EHLO") or command.startswith("HELO"):
+                        self.reply("250 stub")
+                    elif command == "DATA":
+                        self.reply("354 end with <CRLF>.<CRLF>")
+                        lines = []
+                        for data in iter(self.rfile.readline, b""):
+                            if data in (b".\r\n", b".\n"):
+                                break
+                            lines.append(data)
+                        time.sleep(server.latency)
+                        with server._lock:
+                            server.messages.append(b"".join(lines))
+                        self.reply("250 queued")
+                    elif command == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:
+                        # MAIL, RCPT, RSET, NOOP
+                        self.reply("250 ok")
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self._server = Server((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
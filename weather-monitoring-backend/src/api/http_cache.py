@@ -0,0 +1,69 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from src.cron.scheduler import scheduler
+from src.config.settings import settings
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """A serialized response body plus the validators clients revalidate against"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def build_payload(data: Any, versions: Iterable[Tuple[int, datetime]]) -> CachedPayload:
+    """Serialize `data` once and derive a strong ETag from the (id, timestamp) pairs it was built from"""
+    versions = list(versions)
+    fingerprint = "|".join(f"{row_id}:{ts.isoformat() if ts else ''}" for row_id, ts in versions)
+    timestamps = [ts for _, ts in versions if ts is not None]
+    return CachedPayload(
+        body=json.dumps(jsonable_encoder(data), separators=(",", ":")).encode(),
+        etag=f'"{hashlib.sha256(fingerprint.encode()).hexdigest()[:32]}"',
+        last_modified=max(timestamps) if timestamps else None
+    )
+
+
+def seconds_until_next_run(job_id: str) -> int:
+    """Seconds until the cron job that refreshes this data runs next"""
+    job = scheduler.get_job(job_id) if scheduler.running else None
+    if job is None or job.next_run_time is None:
+        return settings.HTTP_CACHE_DEFAULT_MAX_AGE
+    return max(0, int((job.next_run_time - datetime.now(timezone.utc)).total_seconds()))
+
+
+def _not_modified(request: Request, payload: CachedPayload) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence and uses weak comparison (RFC 9110 13.1.2)
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or payload.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and payload.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return payload.last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def conditional_response(request: Request, payload: CachedPayload, job_id: str) -> Response:
+    """Return 304 when the client's validators match, otherwise the cached body"""
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": f"public, max-age={seconds_until_next_run(job_id)}",
+    }
+    if payload.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(payload.last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if _not_modified(request, payload):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timezone
+from src.utils.profiler import profiler, short_path
+from src.utils.slow_log import Origin, current_origin, slow_log
+
+
+def endpoint_site(endpoint) -> str:
+    code = getattr(endpoint, "__code__", None)
+    if code is None:
+        return repr(endpoint)
+    return f"{short_path(code.co_filename)}:{code.co_firstlineno} in {code.co_name}"
+
+
+class HttpDiagnosticsMiddleware:
+    """Pure ASGI middleware feeding the slow-request log and the profiler
+
+    Each request carries an Origin, so its statements are counted and named in
+    the slow-query log. Requests at least SLOW_REQUEST_MS to their response
+    headers are kept with their parameters, endpoint and database time; in
+    debug mode a sample of requests is profiled, rooted at the route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        origin = Origin(f"{scope['method']} {scope['path']}")
+        token = current_origin.set(origin)
+        window = profiler.start("request", origin.label)
+        status = None
+        elapsed = None
+
+        async def send_with_timing(message):
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            status = status or 500
+            raise
+        finally:
+            current_origin.reset(token)
+            if elapsed is None:
+                elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None)
+            if window is not None:
+                window.name = f"{scope['method']} {route or 'unmatched'}"
+            profile = profiler.finish(window)
+            if 0 < slow_log.request_threshold <= elapsed:
+                slow_log.record_request({
+                    "at": started_at.isoformat(),
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "query_string": scope.get("query_string", b"").decode("latin-1")[:1000],
+                    "path_params": scope.get("path_params") or {},
+                    "status": status,
+                    "endpoint": endpoint_site(scope["endpoint"]) if "endpoint" in scope else None,
+                    "db_queries": origin.queries,
+                    "db_ms": round(origin.query_seconds * 1000, 1),
+                    "profile": profile,
+                })
@@ -0,0 +1,41 @@
+import time
+from src.utils.metrics import HTTP_REQUEST_DURATION
+
+
+class HttpMetricsMiddleware:
+    """Pure ASGI middleware timing each request to its response headers, labelled by route template
+
+    Timing stops at the response start rather than the last body chunk, so
+    long-lived streams (SSE, exports) report their latency, not their lifetime.
+    Requests that match no route share one "unmatched" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int):
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
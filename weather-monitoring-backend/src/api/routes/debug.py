@@ -0,0 +1,86 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+from src.utils.profiler import profiler
+from src.utils.slow_log import slow_log
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Check X-Admin-Token against DEBUG_ADMIN_TOKEN; /api/debug stays closed while it is unset"""
+    expected = settings.DEBUG_ADMIN_TOKEN
+    if not expected:
+        raise HTTPException(status_code=403, detail="/api/debug is disabled, set DEBUG_ADMIN_TOKEN to enable it")
+    if not hmac.compare_digest((x_admin_token or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+
+# State is per worker: with several workers, each call reaches one of them
+router = APIRouter(prefix="/api/debug", tags=["debug"], dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+async def get_debug_state():
+    """Get the debug mode (profiling) state and the slow log thresholds and counters"""
+    return {"profiler": profiler.get_stats(), "slow_log": slow_log.get_stats()}
+
+
+@router.put("")
+async def set_debug_state(
+    enabled: Optional[bool] = None,
+    sample_rate: Optional[float] = Query(None, ge=0, le=1),
+    slow_query_ms: Optional[float] = Query(None, ge=0),
+    slow_request_ms: Optional[float] = Query(None, ge=0)
+):
+    """Toggle debug mode and adjust the profiling sample rate and slow log thresholds (0 disables)"""
+    if enabled is not None:
+        profiler.enabled = enabled
+    if sample_rate is not None:
+        profiler.sample_rate = sample_rate
+    if slow_query_ms is not None:
+        slow_log.query_threshold = slow_query_ms / 1000
+    if slow_request_ms is not None:
+        slow_log.request_threshold = slow_request_ms / 1000
+    logger.info(
+        f"Debug mode {'on' if profiler.enabled else 'off'} (sample rate {profiler.sample_rate}), "
+        f"slow query {slow_log.query_threshold * 1000:.0f}ms, slow request {slow_log.request_threshold * 1000:.0f}ms"
+    )
+    return {"profiler": profiler.get_stats(), "slow_log": slow_log.get_stats()}
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(limit: int = Query(50, ge=1)):
+    """Get the latest slow statements, newest first, with parameters, origin and call site"""
+    return list(reversed(slow_log.queries))[:limit]
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(limit: int = Query(50, ge=1)):
+    """Get the latest slow requests, newest first, with parameters, endpoint and database time"""
+    return list(reversed(slow_log.requests))[:limit]
+
+
+@router.delete("/slow-log")
+async def clear_slow_log():
+    """Empty both slow log buffers"""
+    slow_log.clear()
+    return {"message": "Slow log cleared"}
+
+
+@router.get("/profiles")
+async def get_profiles():
+    """List the profiles written in debug mode, newest first"""
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{filename}")
+async def download_profile(filename: str):
+    """Download one profile as folded stacks (flamegraph.pl, speedscope, inferno)"""
+    path = profiler.path_of(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {filename} not found")
+    return FileResponse(path, media_type="text/plain", filename=filename)
@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.connection import get_db
-from src.services.weather_service import WeatherService
+from src.services.weather_service import WeatherService, openweather_breaker
+from src.services.http_client import is_upstream_failure
 from src.services.alert_service import AlertService
+from src.services.alert_delivery import AlertDeliveryWorker, build_sinks, get_delivery_stats
+from src.services.job_lease import JobLeaseService
+from src.services.fetch_scheduler import FetchScheduler
+from src.services.city_registry import city_registry
+from src.services.cache import response_cache
+from src.services.event_bus import event_bus
+from src.services.history_service import HistoryService
+from src.services.export_service import ExportService
+from src.services.rollup_service import RollupService
+from src.services.analytics_service import AnalyticsService
+from src.services.rule_engine import RuleError
+from src.utils.circuit_breaker import CircuitOpenError
+from src.api.http_cache import build_payload, conditional_response
+from src.config.settings import settings
 from src.schemas.weather import (
     WeatherDataResponse, 
     DashboardSummaryResponse,
-    WeatherAlertResponse
+    WeatherAlertResponse,
+    WeatherRollupResponse,
+    AlertRuleCreate,
+    AlertRuleResponse
 )
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,13 +38,22 @@ router = APIRouter(prefix="/api/weather", tags=["weather"])
 
 
 @router.get("/current", response_model=List[WeatherDataResponse])
-async def get_current_weather(db: AsyncSession = Depends(get_db)):
+async def get_current_weather(request: Request, db: AsyncSession = Depends(get_db), city: str = settings.CITY_NAME):
     """Get latest weather data"""
+    async def load():
+        rows = await WeatherService.get_latest_weather(db, city=city)
+        if not rows:
+            return None
+        return build_payload(
+            [WeatherDataResponse.model_validate(row) for row in rows],
+            versions=[(row.id, row.recorded_at) for row in rows]
+        )
+    
     try:
-        weather_data = await WeatherService.get_latest_weather(db)
-        if not weather_data:
+        payload = await response_cache.get_or_load("current", city, load)
+        if payload is None:
             raise HTTPException(status_code=404, detail="No weather data found")
-        return weather_data
+        return conditional_response(request, payload, "fetch_weather_job")
     except HTTPException:
         raise
     except Exception as e:
@@ -32,20 +62,30 @@ async def get_current_weather(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/dashboard", response_model=DashboardSummaryResponse)
-async def get_dashboard_summary(db: AsyncSession = Depends(get_db)):
+async def get_dashboard_summary(request: Request, db: AsyncSession = Depends(get_db), city: str = settings.CITY_NAME):
     """Get dashboard summary data"""
-    try:
-        summary = await WeatherService.get_dashboard_summary(db)
+    async def load():
+        summary = await WeatherService.get_dashboard_summary(db, city=city)
         if not summary:
             
             logger.info("No dashboard summary found, computing new summary...")
-            summary = await WeatherService.compute_dashboard_summary(db)
-            if not summary:
-                raise HTTPException(
-                    status_code=404, 
-                    detail="No weather data available to create summary. Please fetch weather data first."
-                )
-        return summary
+            summary = await WeatherService.compute_dashboard_summary(db, city=city)
+        if not summary:
+            return None
+        return build_payload(
+            DashboardSummaryResponse.model_validate(summary),
+            versions=[(summary.id, summary.computed_at)]
+        )
+    
+    try:
+        payload = await response_cache.get_or_load("dashboard", city, load)
+        if payload is None:
+            raise HTTPException(
+                status_code=404, 
+                detail="No weather data available to create summary. Please fetch weather data first."
+            )
+        # Summaries are refreshed by the ingest dispatcher right after each fetch
+        return conditional_response(request, payload, "fetch_weather_job")
     except HTTPException:
         raise
     except Exception as e:
@@ -54,34 +94,223 @@ async def get_dashboard_summary(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/alerts", response_model=List[WeatherAlertResponse])
-async def get_alerts(db: AsyncSession = Depends(get_db)):
+async def get_alerts(request: Request, db: AsyncSession = Depends(get_db), city: str = settings.CITY_NAME):
     """Get recent weather alerts"""
+    async def load():
+        alerts = await AlertService.get_recent_alerts(db, city=city)
+        return build_payload(
+            [WeatherAlertResponse.model_validate(alert) for alert in alerts],
+            versions=[(alert.id, alert.sent_at or alert.created_at) for alert in alerts]
+        )
+    
     try:
-        alerts = await AlertService.get_recent_alerts(db)
-        return alerts
+        payload = await response_cache.get_or_load("alerts", city, load)
+        # Alerts are raised by the ingest dispatcher right after each fetch
+        return conditional_response(request, payload, "fetch_weather_job")
     except Exception as e:
         logger.error(f"Error fetching alerts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/cities", response_model=List[str])
+async def get_monitored_cities():
+    """Get the cities monitored by the ingestion job"""
+    return city_registry.list()
+
+
+@router.get("/history")
+async def get_weather_history(
+    city: str = settings.CITY_NAME,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, all when omitted"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE)
+):
+    """Get historical weather data for a city in [from, to), oldest first, keyset-paginated"""
+    try:
+        columns = HistoryService.parse_fields(fields)
+        after = HistoryService.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        HistoryService.stream_history(city, columns, start, end, after, limit),
+        media_type="application/json"
+    )
+
+
+@router.get("/rollups", response_model=List[WeatherRollupResponse])
+async def get_weather_rollups(
+    db: AsyncSession = Depends(get_db),
+    city: str = settings.CITY_NAME,
+    granularity: str = Query("hourly", pattern="^(hourly|daily)$"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to")
+):
+    """Get hourly or daily count/mean/min/max/stddev of temperature, humidity, pressure and wind"""
+    try:
+        rows = await RollupService.get_rollups(db, city, granularity, start, end)
+        return [RollupService.to_response(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Error fetching rollups: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics")
+async def get_weather_analytics(
+    db: AsyncSession = Depends(get_db),
+    city: Optional[List[str]] = Query(None, description="Repeat for several cities, all monitored cities when omitted"),
+    hours: int = Query(settings.ANALYTICS_DEFAULT_HOURS, ge=1, le=settings.ANALYTICS_MAX_HOURS),
+    window: int = Query(settings.ANALYTICS_WINDOW, ge=1, description="Readings in the rolling mean"),
+    alpha: float = Query(settings.ANALYTICS_EWMA_ALPHA, gt=0, le=1),
+    z_threshold: float = Query(settings.ANALYTICS_ZSCORE_THRESHOLD, gt=0)
+):
+    """Get rolling mean, EWMA, trend slope, percentiles and z-score anomalies per city and metric"""
+    try:
+        return await AnalyticsService.get_analytics(
+            db, city or city_registry.list(), hours=hours, window=window, alpha=alpha, z_threshold=z_threshold
+        )
+    except Exception as e:
+        logger.error(f"Error computing analytics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_weather_data(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    city: Optional[str] = Query(None, description="Export every city when omitted"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export, all when omitted")
+):
+    """Stream weather data in [from, to) as CSV, NDJSON or Parquet, oldest first"""
+    if not ExportService.is_available(format):
+        raise HTTPException(status_code=501, detail=f"{format} export is not available on this server (install pyarrow)")
+    try:
+        columns = HistoryService.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    encoder = ExportService.get_encoder(format, columns)
+    filename = f"weather_{city or 'all'}.{encoder.extension}"
+    return StreamingResponse(
+        ExportService.stream_export(encoder, city, columns, start, end),
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/stream")
+async def stream_weather_events(city: Optional[List[str]] = Query(None)):
+    """Server-Sent Events stream of new observations, summaries and alerts (all cities unless filtered)"""
+    if event_bus.subscriber_count >= settings.STREAM_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many stream subscribers, retry later")
+    
+    async def event_stream():
+        # Subscribe inside the generator so the finally below always runs;
+        # StreamingResponse cancels the generator when the client disconnects
+        subscription = event_bus.subscribe(city)
+        try:
+            yield "retry: 5000\n\n"
+            reported_drops = 0
+            while True:
+                event = await subscription.get(timeout=settings.STREAM_HEARTBEAT_SECONDS)
+                if subscription.dropped > reported_drops:
+                    # Tell the client it fell behind so it can refetch over REST
+                    yield f"event: lagged\ndata: {json.dumps({'dropped': subscription.dropped - reported_drops})}\n\n"
+                    reported_drops = subscription.dropped
+                if event is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield event.frame
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/job-leases")
+async def get_job_leases(db: AsyncSession = Depends(get_db)):
+    """Get which worker holds each scheduled job's lease"""
+    try:
+        return await JobLeaseService.list_leases(db)
+    except Exception as e:
+        logger.error(f"Error fetching job leases: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch job leases: {str(e)}")
+
+
+@router.get("/fetch-schedule")
+async def get_fetch_schedule(db: AsyncSession = Depends(get_db)):
+    """Get each city's adaptive poll interval and the API calls saved against a fixed 30-minute cadence"""
+    try:
+        return await FetchScheduler.get_stats(db)
+    except Exception as e:
+        logger.error(f"Error fetching fetch schedule: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch fetch schedule: {str(e)}")
+
+
+@router.get("/stream-stats")
+async def get_stream_stats():
+    """Get subscriber and delivery counters of the event stream"""
+    return event_bus.get_stats()
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get hit/miss/eviction counters of the read-through cache"""
+    return response_cache.get_stats()
+
+
+def _fetch_now_data(row) -> dict:
+    return {
+        "id": row.id,
+        "city": row.city,
+        "temperature": row.temperature,
+        "humidity": row.humidity,
+        "weather": row.weather_main,
+        "recorded_at": row.recorded_at
+    }
+
+
 @router.post("/fetch-now")
-async def fetch_weather_now(db: AsyncSession = Depends(get_db)):
-    """Manually trigger weather data fetch"""
+async def fetch_weather_now(db: AsyncSession = Depends(get_db), city: str = settings.CITY_NAME):
+    """Manually trigger weather data fetch, falling back to the last stored observation while OpenWeather is down"""
     try:
-        logger.info("Manual weather fetch triggered...")
-        weather_data = await WeatherService.fetch_weather_from_api()
+        logger.info(f"Manual weather fetch triggered for {city}...")
+        try:
+            weather_data = await WeatherService.fetch_weather_from_api(city)
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError) and not is_upstream_failure(e):
+                raise
+            logger.warning(f"OpenWeather unavailable for {city}, serving last known observation: {e}")
+            recent = await WeatherService.get_latest_weather(db, city=city)
+            last_known = recent[0] if recent else None
+            retry_after = round(openweather_breaker.retry_after) or settings.OPENWEATHER_BREAKER_RESET_SECONDS
+            if last_known is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"OpenWeather is unavailable and no observation is stored for {city}",
+                    headers={"Retry-After": str(int(retry_after))}
+                )
+            return {
+                "message": "OpenWeather is unavailable, returning the last known observation",
+                "stale": True,
+                "retry_after_seconds": retry_after,
+                "data": _fetch_now_data(last_known)
+            }
         saved_data = await WeatherService.save_weather_data(db, weather_data)
         return {
             "message": "Weather data fetched successfully", 
-            "data": {
-                "id": saved_data.id,
-                "city": saved_data.city,
-                "temperature": saved_data.temperature,
-                "humidity": saved_data.humidity,
-                "weather": saved_data.weather_main,
-                "recorded_at": saved_data.recorded_at
-            }
+            "stale": False,
+            "data": _fetch_now_data(saved_data)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching weather data: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch weather data: {str(e)}")
@@ -118,13 +347,11 @@ async def compute_summary_now(db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/trigger-alert-check")
-async def trigger_alert_check(db: AsyncSession = Depends(get_db)):
-    """Manually trigger weather alert check"""
+async def trigger_alert_check(db: AsyncSession = Depends(get_db), city: Optional[List[str]] = Query(None)):
+    """Manually trigger weather alert check (all cities unless `city` is given)"""
     try:
         logger.info("Manual alert check triggered...")
-        from src.schemas.weather import AlertThreshold
-        thresholds = AlertThreshold()
-        alerts = await AlertService.check_weather_alerts(db, thresholds)
+        alerts = await AlertService.check_weather_alerts(db, city)
         return {
             "message": f"Alert check completed. {len(alerts)} alerts created.",
             "alerts_count": len(alerts),
@@ -143,17 +370,82 @@ async def trigger_alert_check(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to check alerts: {str(e)}")
 
 
+@router.post("/trigger-alert-delivery")
+async def trigger_alert_delivery():
+    """Manually deliver pending alerts through the configured sinks"""
+    try:
+        sinks = build_sinks()
+        if not sinks:
+            raise HTTPException(status_code=400, detail="No alert sinks configured (ALERT_SINKS)")
+        delivered = await AlertDeliveryWorker(sinks).run()
+        return {"message": f"Delivered {delivered} alerts", "delivered": delivered, "stats": get_delivery_stats()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error delivering alerts: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to deliver alerts: {str(e)}")
+
+
+@router.get("/alert-delivery-stats")
+async def get_alert_delivery_stats():
+    """Get throughput, retry and latency counters of alert delivery"""
+    return get_delivery_stats()
+
+
+@router.get("/alert-rules", response_model=List[AlertRuleResponse])
+async def get_alert_rules(db: AsyncSession = Depends(get_db)):
+    """Get the alert rules"""
+    try:
+        return await AlertService.list_rules(db)
+    except Exception as e:
+        logger.error(f"Error fetching alert rules: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch alert rules: {str(e)}")
+
+
+@router.post("/alert-rules", response_model=AlertRuleResponse)
+async def save_alert_rule(rule: AlertRuleCreate, db: AsyncSession = Depends(get_db)):
+    """Create or replace the rule for (alert_type, city); takes effect on the next alert check"""
+    try:
+        return await AlertService.save_rule(db, rule)
+    except RuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error saving alert rule: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save alert rule: {str(e)}")
+
+
+@router.delete("/alert-rules/{rule_id}")
+async def delete_alert_rule(rule_id: int, db: AsyncSession = Depends(get_db)):
+    """Delete an alert rule"""
+    try:
+        if not await AlertService.delete_rule(db, rule_id):
+            raise HTTPException(status_code=404, detail=f"Alert rule {rule_id} not found")
+        return {"message": f"Alert rule {rule_id} deleted"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting alert rule: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to delete alert rule: {str(e)}")
+
+
 @router.delete("/cleanup-data")
-async def cleanup_old_data(db: AsyncSession = Depends(get_db), days: int = 2, hard_delete: bool = False):
-    """Manually trigger data cleanup (for testing purposes)"""
+async def cleanup_old_data(
+    db: AsyncSession = Depends(get_db),
+    days: int = 2,
+    hard_delete: bool = False,
+    archive: bool = False
+):
+    """Manually trigger data cleanup (for testing purposes); `archive` detaches old partitions into archive tables"""
     try:
-        logger.info(f"Manual data cleanup triggered (days={days}, hard_delete={hard_delete})...")
-        deleted_count = await WeatherService.cleanup_old_data(db, days=days, hard_delete=hard_delete)
+        logger.info(f"Manual data cleanup triggered (days={days}, hard_delete={hard_delete}, archive={archive})...")
+        deleted_count = await WeatherService.cleanup_old_data(db, days=days, hard_delete=hard_delete, archive=archive)
         return {
             "message": "Data cleanup completed successfully",
             "deleted_count": deleted_count,
-            "cleanup_type": "hard_delete" if hard_delete else "soft_delete"
+            "cleanup_type": "hard_delete" if hard_delete else "archive" if archive else "soft_delete"
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error during data cleanup: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to cleanup data: {str(e)}")
@@ -12,10 +12,128 @@ class Settings(BaseSettings):
     OPENWEATHER_API_KEY: str
     OPENWEATHER_BASE_URL: str
     CITY_NAME: str
+    # Extra cities to monitor alongside CITY_NAME (comma-separated)
+    MONITORED_CITIES: str = ""
+    OPENWEATHER_CALLS_PER_MINUTE: int = 60  # API plan limit, shared by every OpenWeather request (retries included)
+    OPENWEATHER_BREAKER_FAILURES: int = 5  # Consecutive failed requests that open the circuit
+    OPENWEATHER_BREAKER_RESET_SECONDS: float = 30.0  # Open time before a probe request is let through
+    
+    # Ingestion
+    FETCH_CONCURRENCY: int = 10
+    FETCH_RATE_LIMIT_PER_HOST: float = 10.0  # Requests per second per upstream host
+    FETCH_CITY_TIMEOUT: float = 15.0  # Seconds before a single city fetch is abandoned
+    FETCH_GROUP_ENABLED: bool = True  # Fetch cities with a known OpenWeather ID through /group
+    FETCH_GROUP_SIZE: int = 20  # City IDs per /group request (OpenWeather allows up to 20)
+    CITY_ID_CACHE_PATH: str = ".cache/openweather_city_ids.json"  # City name -> OpenWeather ID, kept across restarts
+    FETCH_ADAPTIVE: bool = True  # Poll each city when due (checked every minute) instead of all every 30 min
+    FETCH_MIN_INTERVAL_SECONDS: float = 600.0  # OpenWeather refreshes roughly every 10 minutes
+    FETCH_MAX_INTERVAL_SECONDS: float = 3600.0  # Freshness target: no city waits longer than this
+    FETCH_INITIAL_INTERVAL_SECONDS: float = 1800.0
+    FETCH_BASELINE_INTERVAL_SECONDS: float = 1800.0  # Fixed cadence the saved-calls metric compares against
+    BULK_INSERT_FLUSH_SIZE: int = 500  # Rows per INSERT batch
+    BULK_INSERT_FLUSH_INTERVAL: float = 1.0  # Max seconds a buffered row waits before a flush
+    
+    # weather_data partitioning and retention
+    WEATHER_DATA_PARTITION_INTERVAL: str = "day"  # "day" or "week"
+    WEATHER_DATA_PARTITIONS_AHEAD: int = 7  # Partitions created ahead of time
+    WEATHER_DATA_RETENTION_DAYS: int = 2  # Older rows are soft deleted (hidden, kept); at least 2, rollups still count them
+    WEATHER_DATA_PURGE_DAYS: int = 30  # Partitions older than this are dropped for good (0 keeps everything)
+    CLEANUP_BATCH_SIZE: int = 10000  # Rows per soft-delete UPDATE
+    WEATHER_DATA_PARTITION_LOCK_TIMEOUT: float = 5.0  # Max seconds a partition DETACH/DROP waits for weather_data's lock
+    
+    # Shared HTTP client for upstream calls
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2_ENABLED: bool = False  # Requires the 'h2' package
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_RETRY_BACKOFF_BASE: float = 0.5
+    HTTP_RETRY_BACKOFF_MAX: float = 8.0
+    
+    # Read-through cache for GET endpoints
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: float = 300.0
+    CACHE_MAX_ENTRIES: int = 1024
+    HTTP_CACHE_DEFAULT_MAX_AGE: int = 60  # Cache-Control max-age when the refreshing job is not scheduled
+    
+    # Server-Sent Events stream
+    STREAM_QUEUE_SIZE: int = 100  # Pending events per subscriber before the oldest is dropped
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    STREAM_MAX_SUBSCRIBERS: int = 10000
+    
+    # History API
+    HISTORY_PAGE_SIZE: int = 1000
+    HISTORY_MAX_PAGE_SIZE: int = 100000
+    HISTORY_FETCH_BATCH: int = 1000  # Rows pulled from the server-side cursor per round trip
+    EXPORT_FETCH_BATCH: int = 10000  # Also the Parquet row group size
+    
+    # Analytics
+    ANALYTICS_DEFAULT_HOURS: int = 24
+    ANALYTICS_MAX_HOURS: int = 24 * 31
+    ANALYTICS_WINDOW: int = 6  # Readings in the rolling mean
+    ANALYTICS_EWMA_ALPHA: float = 0.3
+    ANALYTICS_ZSCORE_THRESHOLD: float = 3.0
+    
+    # Alert rules
+    ALERT_LOOKBACK_HOURS: float = 3.0  # Only readings newer than this are checked against the rules
+    ALERT_RULES_REFRESH_SECONDS: float = 300.0  # Reload rules (and alert state) edited outside the API
+    ALERT_COOLDOWN_MINUTES: int = 180  # Minimum gap between two alerts of one type for one city
+    
+    # Evaluate alerts and refresh summaries right after each ingest (the alert cron becomes a sweep)
+    INGEST_DISPATCH_ENABLED: bool = True
+    INGEST_DISPATCH_QUEUE_SIZE: int = 10000  # Pending observations, coalesced per city
+    ALERT_RECONCILE_MINUTE: str = "7"  # Cron minute field of the alert reconciliation sweep
+    
+    # Scheduled jobs run on one worker at a time, coordinated through job_leases
+    JOB_LEASES_ENABLED: bool = True
+    SCHEDULER_ENABLED: bool = True  # False for API-only workers (and the benchmark suite's server)
+    
+    # Cache invalidations, rule edits and stream events relayed between workers (Postgres LISTEN/NOTIFY)
+    CLUSTER_EVENTS_ENABLED: bool = True  # Turn off only with a single worker process
+    CLUSTER_EVENTS_CHANNEL: str = "weather_events"
+    CLUSTER_EVENTS_QUEUE_SIZE: int = 10000  # Messages waiting to be sent before new ones are dropped
+    CLUSTER_EVENTS_PING_SECONDS: float = 15.0  # Idle time before the listener connection is checked
+    
+    # Alert delivery
+    ALERT_SINKS: str = ""  # Comma-separated: webhook, smtp, file (empty disables delivery)
+    ALERT_WEBHOOK_URL: Optional[str] = None
+    ALERT_SMTP_HOST: str = "localhost"
+    ALERT_SMTP_PORT: int = 25
+    ALERT_SMTP_USERNAME: Optional[str] = None
+    ALERT_SMTP_PASSWORD: Optional[str] = None
+    ALERT_SMTP_STARTTLS: bool = False
+    ALERT_SMTP_TIMEOUT: float = 10.0
+    ALERT_EMAIL_FROM: str = "alerts@weather.local"
+    ALERT_EMAIL_TO: str = ""  # Comma-separated recipients
+    ALERT_FILE_PATH: str = "alerts.ndjson"
+    ALERT_DELIVERY_BATCH_SIZE: int = 200  # Alerts claimed per transaction
+    ALERT_DELIVERY_CHUNK_SIZE: int = 20  # Alerts per sink call (one webhook POST, one SMTP session)
+    ALERT_DELIVERY_CONCURRENCY: int = 4  # Sink calls in flight per worker
+    ALERT_DELIVERY_MAX_ATTEMPTS: int = 6
+    ALERT_DELIVERY_BACKOFF_BASE: float = 30.0  # Seconds before the first retry, doubled per attempt
+    ALERT_DELIVERY_BACKOFF_MAX: float = 3600.0
+    ALERT_DELIVERY_LEASE_SECONDS: float = 300.0  # Claimed alerts are hidden from other workers this long
+    ALERT_DELIVERY_MAX_AGE_HOURS: int = 24  # Older unsent alerts are not delivered
+    
+    # Prometheus metrics (GET /metrics)
+    METRICS_ENABLED: bool = True
+    
+    # Diagnostics (/api/debug): per worker, adjustable at runtime with PUT /api/debug
+    PROFILING_ENABLED: bool = False  # Debug mode: profile a sample of requests and job ticks
+    PROFILE_SAMPLE_RATE: float = 0.05  # Share of requests and job ticks profiled in debug mode
+    PROFILE_INTERVAL_MS: float = 5.0  # Stack sampling period of the profiler
+    PROFILE_DIR: str = ".cache/profiles"  # Folded-stack files for flamegraph.pl / speedscope
+    PROFILE_MAX_FILES: int = 200  # The oldest profiles are deleted beyond this
+    SLOW_QUERY_MS: float = 500.0  # Statements at least this slow are kept (0 disables)
+    SLOW_REQUEST_MS: float = 2000.0  # Requests at least this slow are kept (0 disables)
+    SLOW_LOG_SIZE: int = 200  # Entries kept per ring buffer
+    DEBUG_ADMIN_TOKEN: Optional[str] = None  # /api/debug requires it in X-Admin-Token (disabled while unset)
     
     # App Settings
     APP_NAME: str = "Weather Monitoring System"
     DEBUG: bool = True
+    RUN_MIGRATIONS_ON_STARTUP: bool = True
     
     class Config:
         env_file = ".env"
@@ -1,66 +1,100 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
+from datetime import datetime, timedelta
 from src.database.connection import AsyncSessionLocal
-from src.services.weather_service import WeatherService
+from src.services.weather_service import WeatherService, openweather_breaker
 from src.services.alert_service import AlertService
-from src.schemas.weather import AlertThreshold
+from src.services.alert_delivery import AlertDeliveryWorker, build_sinks
+from src.services.ingestion_service import IngestionService
+from src.services.partition_service import PartitionService
+from src.services.job_lease import leased
+from src.utils.metrics import JOB_SKIPPED, track_job
+from src.config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler()
 
-# Job 1: Fetch weather data every 30 minutes
+# Each job logs its own failure and re-raises it, so track_job counts the outcome for /metrics.
+# Jobs 1-4 run on one worker per tick: the lease TTL is shorter than the job's interval
+# so the next tick is free, and longer than the spread of the workers' clocks and start-up.
+
+# Job 1: Fetch weather data for the cities that are due (every minute), or for all every 30 minutes
+FETCH_LEASE_TTL = timedelta(seconds=45) if settings.FETCH_ADAPTIVE else timedelta(minutes=25)
+
+@track_job("fetch_weather_job")
+@leased("fetch_weather_job", ttl=FETCH_LEASE_TTL)
 async def fetch_weather_job():
-    """Cron job to fetch weather data from OpenWeatherMap API"""
-    logger.info("⏰ Fetching weather data...")
+    """Cron job to fetch weather data for monitored cities from OpenWeatherMap API"""
+    if openweather_breaker.is_open:
+        logger.warning(f"⏸️ OpenWeather circuit is open, skipping fetch (retry in {openweather_breaker.retry_after:.0f}s)")
+        return JOB_SKIPPED
     async with AsyncSessionLocal() as db:
         try:
-            weather_data = await WeatherService.fetch_weather_from_api()
-            await WeatherService.save_weather_data(db, weather_data)
-            logger.info(f"✅ Weather data saved: {weather_data['name']} - {weather_data['main']['temp']}°C")
+            if not settings.FETCH_ADAPTIVE:
+                logger.info("⏰ Fetching weather data...")
+                result = await IngestionService.ingest(db)
+                logger.info(f"✅ Weather data saved for {result.saved}/{result.total} cities in {result.duration:.2f}s")
+                return
+            result = await IngestionService.ingest_due(db)
+            if result.total:
+                logger.info(
+                    f"✅ Polled {result.total} due cities in {result.duration:.2f}s: {result.saved} saved, "
+                    f"{result.unchanged} unchanged upstream, {len(result.failed)} failed, {result.not_due} not due"
+                )
         except Exception as e:
             logger.error(f"❌ Weather fetch failed: {e}")
+            raise
 
 # Job 2: Compute dashboard summary every hour
+@track_job("dashboard_summary_job")
+@leased("dashboard_summary_job", ttl=timedelta(minutes=50))
 async def dashboard_summary_job():
     """Cron job to compute dashboard summary data"""
     logger.info("⏰ Computing dashboard summary...")
     async with AsyncSessionLocal() as db:
         try:
-            summary = await WeatherService.compute_dashboard_summary(db)
-            if summary:
-                logger.info(f"✅ Dashboard summary computed: Avg {summary.avg_temperature}°C")
+            summaries = await WeatherService.compute_dashboard_summaries(db)
+            if summaries:
+                logger.info(f"✅ Dashboard summary computed for {len(summaries)} cities")
             else:
                 logger.warning("⚠️ No data for dashboard summary")
         except Exception as e:
             logger.error(f"❌ Dashboard summary failed: {e}")
+            raise
 
 # Job 3: Cleanup old data daily
+@track_job("cleanup_data_job")
+@leased("cleanup_data_job", ttl=timedelta(hours=12))
 async def cleanup_data_job():
-    """Cron job to cleanup old weather records"""
+    """Cron job to cleanup old weather records and create upcoming partitions"""
     logger.info("⏰ Cleaning up old data...")
     async with AsyncSessionLocal() as db:
         try:
-            deleted_count = await WeatherService.cleanup_old_data(db, days=2, hard_delete=False)
+            await PartitionService.ensure_partitions(db)
+            deleted_count = await WeatherService.cleanup_old_data(
+                db, days=settings.WEATHER_DATA_RETENTION_DAYS, hard_delete=False
+            )
             logger.info(f"✅ Cleaned {deleted_count} old records")
+            if settings.WEATHER_DATA_PURGE_DAYS:
+                purged_count = await WeatherService.cleanup_old_data(
+                    db, days=settings.WEATHER_DATA_PURGE_DAYS, hard_delete=True
+                )
+                logger.info(f"✅ Purged {purged_count} records older than {settings.WEATHER_DATA_PURGE_DAYS} days")
         except Exception as e:
             logger.error(f"❌ Data cleanup failed: {e}")
+            raise
 
-# Job 4: Check weather alerts every 15 minutes
+# Job 4: Reconcile weather alerts hourly (new observations are checked on ingest)
+@track_job("weather_alert_job")
+@leased("weather_alert_job", ttl=timedelta(minutes=10))
 async def weather_alert_job():
-    """Cron job to check weather conditions and send alerts"""
-    logger.info("⏰ Checking weather alerts...")
+    """Cron job to check weather conditions for anything the ingest dispatcher missed"""
+    logger.info("⏰ Reconciling weather alerts...")
     async with AsyncSessionLocal() as db:
         try:
-            thresholds = AlertThreshold(
-                high_temperature=35.0,
-                high_humidity=80,
-                extreme_weather_conditions=["Thunderstorm", "Heavy Rain", "Storm", "Tornado", "Hurricane"]
-            )
-            
-            alerts = await AlertService.check_weather_alerts(db, thresholds)
+            alerts = await AlertService.check_weather_alerts(db)
             if alerts:
                 logger.warning(f"⚠️ {len(alerts)} weather alerts triggered!")
                 for alert in alerts:
@@ -69,16 +103,31 @@ async def weather_alert_job():
                 logger.info("✅ No alerts - conditions normal")
         except Exception as e:
             logger.error(f"❌ Alert check failed: {e}")
+            raise
+
+# Job 5: Deliver pending alerts every minute
+# Not leased: workers claim disjoint batches with SKIP LOCKED, so every worker can help
+@track_job("alert_delivery_job")
+async def alert_delivery_job():
+    """Cron job to deliver unsent alerts through the configured sinks"""
+    try:
+        delivered = await AlertDeliveryWorker(build_sinks()).run()
+        if delivered:
+            logger.info(f"📨 Delivered {delivered} alerts")
+    except Exception as e:
+        logger.error(f"❌ Alert delivery failed: {e}")
+        raise
 
 def start_scheduler():
     """Initialize and start all cron jobs"""
     
-    # Job 1: Fetch weather every 30 minutes
+    # Job 1: Fetch due cities every minute, or every city every 30 minutes without adaptive scheduling
     scheduler.add_job(
         fetch_weather_job,
-        trigger=CronTrigger(minute="*/30"),
+        trigger=CronTrigger(minute="*" if settings.FETCH_ADAPTIVE else "*/30"),
         id="fetch_weather_job",
         name="Fetch weather data",
+        max_instances=1,
         replace_existing=True
     )
     
@@ -100,15 +149,27 @@ def start_scheduler():
         replace_existing=True
     )
     
-    # Job 4: Check alerts every 15 minutes
+    # Job 4: Reconcile alerts hourly, or poll every 15 minutes without the ingest dispatcher
+    alert_minute = settings.ALERT_RECONCILE_MINUTE if settings.INGEST_DISPATCH_ENABLED else "*/15"
     scheduler.add_job(
         weather_alert_job,
-        trigger=CronTrigger(minute="*/15"),
+        trigger=CronTrigger(minute=alert_minute),
         id="weather_alert_job",
         name="Weather alerts",
         replace_existing=True
     )
     
+    # Job 5: Deliver alerts every minute, when sinks are configured
+    if settings.ALERT_SINKS:
+        scheduler.add_job(
+            alert_delivery_job,
+            trigger=CronTrigger(minute="*"),
+            id="alert_delivery_job",
+            name="Alert delivery",
+            max_instances=1,
+            replace_existing=True
+        )
+    
     scheduler.start()
     logger.info("📅 All cron jobs scheduled successfully")
 
@@ -1,15 +1,25 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from src.config.settings import settings
+from src.utils.metrics import TimedAsyncQueuePool, instrument_engine
+from src.utils.slow_log import instrument_slow_queries
+
+POOL_SIZE = 20
+MAX_OVERFLOW = 10
 
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
     future=True,
-    pool_size=20,
-    max_overflow=10
+    poolclass=TimedAsyncQueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW
 )
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, max_connections=POOL_SIZE + MAX_OVERFLOW)
+# Statement timings for the slow-query log and each request's database time
+instrument_slow_queries(engine)
 
 # Create session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -0,0 +1,33 @@
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from src.database.connection import engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Arbitrary constant so concurrently starting workers apply migrations one at a time
+MIGRATION_LOCK_ID = 4_815_162_342
+
+
+def get_alembic_config() -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return config
+
+
+async def run_migrations(revision: str = "head"):
+    """Upgrade the database to `revision` using the application's engine"""
+
+    def upgrade(connection):
+        config = get_alembic_config()
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        await conn.run_sync(upgrade)
+    logger.info(f"Database migrated to {revision}")
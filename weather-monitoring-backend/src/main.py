@@ -1,10 +1,19 @@
-from fastapi import FastAPI
+import os
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
 from contextlib import asynccontextmanager
-from src.api.routes import weather
+from src.api.routes import weather, debug
+from src.api.http_metrics import HttpMetricsMiddleware
+from src.api.http_diagnostics import HttpDiagnosticsMiddleware
 from src.cron.scheduler import start_scheduler, shutdown_scheduler
-from src.database.connection import engine
-from src.database.base import Base
+from src.database.connection import engine, AsyncSessionLocal
+from src.services.http_client import start_http_client, close_http_client, get_http_client_stats
+from src.database.migrations import run_migrations
+from src.services.partition_service import PartitionService
+from src.services.ingest_dispatcher import ingest_dispatcher
+from src.services.cluster_events import cluster_events
+from src.services.weather_service import openweather_breaker
 from src.config.settings import settings
 from src.config.logging_config import setup_logging
 import logging
@@ -19,20 +28,40 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Weather Monitoring System...")
     
-    # Create database tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Apply database migrations
+    if settings.RUN_MIGRATIONS_ON_STARTUP:
+        await run_migrations()
+    async with AsyncSessionLocal() as db:
+        await PartitionService.ensure_partitions(db)
     logger.info("✅ Database tables ready")
     
+    # Shared upstream HTTP client
+    await start_http_client()
+    logger.info("✅ HTTP client pool ready")
+    
+    # Other workers' cache invalidations and events
+    if settings.CLUSTER_EVENTS_ENABLED:
+        cluster_events.start()
+        logger.info("✅ Cluster events relay started")
+    
+    # Alerts and summaries follow each ingest
+    if settings.INGEST_DISPATCH_ENABLED:
+        ingest_dispatcher.start()
+        logger.info("✅ Ingest dispatcher started")
+    
     # Start scheduler
-    start_scheduler()
-    logger.info("✅ Cron scheduler started")
+    if settings.SCHEDULER_ENABLED:
+        start_scheduler()
+        logger.info("✅ Cron scheduler started")
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down application...")
     shutdown_scheduler()
+    await ingest_dispatcher.stop()
+    await cluster_events.stop()
+    await close_http_client()
     await engine.dispose()
     logger.info("✅ Application shutdown complete")
 
@@ -53,8 +82,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route, for GET /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(HttpMetricsMiddleware)
+
+# Slow-request log and sampled profiles, for /api/debug
+app.add_middleware(HttpDiagnosticsMiddleware)
+
 # Include routers
 app.include_router(weather.router)
+app.include_router(debug.router)
 
 # Health check endpoint
 @app.get("/")
@@ -67,7 +104,23 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        # Still serving from the database, but not getting fresh data
+        "status": "degraded" if openweather_breaker.is_open else "healthy",
+        "http_client": get_http_client_stats(),
+        "openweather_circuit": openweather_breaker.get_stats(),
+        "ingest_dispatch": ingest_dispatcher.get_stats(),
+        "cluster_events": cluster_events.get_stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus exposition of this worker's metrics (all workers' when PROMETHEUS_MULTIPROC_DIR is set)"""
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
 
 if __name__ == "__main__":
     import uvicorn
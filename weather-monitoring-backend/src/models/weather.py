@@ -1,12 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Index, text
 from sqlalchemy.sql import func
 from src.database.base import Base
 
 class WeatherData(Base):
     __tablename__ = "weather_data"
     
-    id = Column(Integer, primary_key=True, index=True)
-    city = Column(String, index=True)
+    # Range-partitioned by recorded_at, so the partition key is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    city = Column(String)
     temperature = Column(Float)
     feels_like = Column(Float)
     temp_min = Column(Float)
@@ -17,29 +18,172 @@ class WeatherData(Base):
     weather_description = Column(String)
     wind_speed = Column(Float)
     clouds = Column(Integer)
-    recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    recorded_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    observed_at = Column(DateTime(timezone=True), nullable=True)  # Upstream measurement time (OpenWeather dt)
     is_deleted = Column(Boolean, default=False)  # For delete
     
+    __table_args__ = (
+        Index("ix_weather_data_city_recorded_at_live", city, recorded_at.desc(),
+              postgresql_where=text("is_deleted = false")),
+        Index("ix_weather_data_recorded_at_live", recorded_at,
+              postgresql_where=text("is_deleted = false")),
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
+    
 class DashboardSummary(Base):
     __tablename__ = "dashboard_summary"
     
     id = Column(Integer, primary_key=True, index=True)
-    city = Column(String, index=True)
+    city = Column(String)
     avg_temperature = Column(Float)
     max_temperature = Column(Float)
     min_temperature = Column(Float)
     avg_humidity = Column(Float)
     trend_data = Column(JSON)  # Store hourly trends
     computed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_dashboard_summary_city_computed_at", city, computed_at.desc()),
+    )
 
 class WeatherAlert(Base):
     __tablename__ = "weather_alerts"
     
     id = Column(Integer, primary_key=True, index=True)
-    city = Column(String, index=True)
+    city = Column(String)
     alert_type = Column(String)  # high_temp, high_humidity, extreme_weather
     message = Column(String)
     threshold_value = Column(Float, nullable=True)
     actual_value = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_sent = Column(Boolean, default=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    delivery_attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # Retry time, or end of a worker's claim
+    last_error = Column(String, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_weather_alerts_city_created_at", city, created_at.desc()),
+        Index("ix_weather_alerts_unsent", created_at, postgresql_where=text("is_sent = false")),
+    )
+
+
+class AlertRule(Base):
+    __tablename__ = "alert_rules"
+    
+    id = Column(Integer, primary_key=True)
+    alert_type = Column(String, nullable=False)  # Becomes WeatherAlert.alert_type
+    city = Column(String, nullable=True)  # NULL applies to every city; a city rule overrides it
+    condition = Column(JSON, nullable=False)  # See src/services/rule_engine.py for the grammar
+    message = Column(String, nullable=True)  # str.format template, e.g. "Current: {temperature}°C"
+    clear_condition = Column(JSON, nullable=True)  # Hysteresis: an active alert resets only once this holds
+    cooldown_minutes = Column(Integer, nullable=True)  # Minimum gap between alerts; NULL uses ALERT_COOLDOWN_MINUTES
+    enabled = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("uq_alert_rules_type_city", alert_type, city, unique=True,
+              postgresql_where=text("city IS NOT NULL")),
+        Index("uq_alert_rules_type_global", alert_type, unique=True,
+              postgresql_where=text("city IS NULL")),
+    )
+
+
+class AlertState(Base):
+    __tablename__ = "alert_states"
+    
+    # One row per (city, alert_type) that has ever fired, written only when it changes
+    city = Column(String, primary_key=True)
+    alert_type = Column(String, primary_key=True)
+    active = Column(Boolean, nullable=False, default=False)
+    last_observation_id = Column(Integer, nullable=True)  # Observation that caused the last change
+    last_alerted_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class FetchSchedule(Base):
+    __tablename__ = "fetch_schedule"
+    
+    # Adaptive polling state per monitored city (keyed by the name we query with)
+    city = Column(String, primary_key=True)
+    interval_seconds = Column(Float, nullable=False)
+    next_fetch_at = Column(DateTime(timezone=True), nullable=False)
+    last_fetched_at = Column(DateTime(timezone=True), nullable=True)
+    last_observed_at = Column(DateTime(timezone=True), nullable=True)  # Upstream dt of the last stored reading
+    upstream_period_seconds = Column(Float, nullable=True)  # Observed spacing of upstream dt values
+    last_temperature = Column(Float, nullable=True)
+    last_humidity = Column(Integer, nullable=True)
+    last_pressure = Column(Integer, nullable=True)
+    last_weather_main = Column(String, nullable=True)
+    polls = Column(Integer, nullable=False, default=0)
+    unchanged_polls = Column(Integer, nullable=False, default=0)  # Upstream dt had not moved, nothing stored
+    failed_polls = Column(Integer, nullable=False, default=0)  # The call failed, nothing stored
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+    
+    # One row per scheduled job; the holder runs the current tick, others skip it
+    job_id = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # host:pid:nonce of the worker process
+    acquired_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class RateLimit(Base):
+    __tablename__ = "rate_limits"
+    
+    # One row per upstream quota shared by all workers: when its next call may be sent
+    name = Column(String, primary_key=True)
+    next_slot_at = Column(DateTime(timezone=True), nullable=False)
+
+
+# Metrics tracked by the rollup tables, named after their WeatherData columns
+ROLLUP_METRICS = ("temperature", "humidity", "pressure", "wind_speed")
+
+
+class WeatherRollupMixin:
+    """Mergeable per-city aggregates for one time bucket
+
+    count/sum/min/max/sum of squares combine by addition (min/max by least/greatest),
+    so observations are folded in with an upsert instead of rescanning raw rows.
+    Mean is sum / count and the population variance is sumsq / count - mean².
+    """
+    city = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # Start of the hour / day (UTC)
+    observations = Column(Integer, nullable=False, default=0)
+    temperature_count = Column(Integer, nullable=False, default=0)
+    temperature_sum = Column(Float, nullable=False, default=0)
+    temperature_min = Column(Float)
+    temperature_max = Column(Float)
+    temperature_sumsq = Column(Float, nullable=False, default=0)
+    humidity_count = Column(Integer, nullable=False, default=0)
+    humidity_sum = Column(Float, nullable=False, default=0)
+    humidity_min = Column(Float)
+    humidity_max = Column(Float)
+    humidity_sumsq = Column(Float, nullable=False, default=0)
+    pressure_count = Column(Integer, nullable=False, default=0)
+    pressure_sum = Column(Float, nullable=False, default=0)
+    pressure_min = Column(Float)
+    pressure_max = Column(Float)
+    pressure_sumsq = Column(Float, nullable=False, default=0)
+    wind_speed_count = Column(Integer, nullable=False, default=0)
+    wind_speed_sum = Column(Float, nullable=False, default=0)
+    wind_speed_min = Column(Float)
+    wind_speed_max = Column(Float)
+    wind_speed_sumsq = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class WeatherHourly(WeatherRollupMixin, Base):
+    __tablename__ = "weather_hourly"
+    
+    # The all-city dashboard reads the last 24 buckets without a city filter
+    __table_args__ = (
+        Index("ix_weather_hourly_bucket", "bucket"),
+    )
+
+
+class WeatherDaily(WeatherRollupMixin, Base):
+    __tablename__ = "weather_daily"
@@ -16,6 +16,7 @@ class WeatherDataResponse(BaseModel):
     wind_speed: float
     clouds: int
     recorded_at: datetime
+    observed_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -39,16 +40,50 @@ class WeatherAlertResponse(BaseModel):
     alert_type: str
     message: str
     threshold_value: Optional[float]
-    actual_value: float
+    actual_value: Optional[float]  # None when the matching condition has no numeric reading
     created_at: datetime
     is_sent: bool
     
     class Config:
         from_attributes = True
 
-class AlertThreshold(BaseModel):
-    high_temperature: float = Field(default=35.0, description="Temperature in Celsius")
-    high_humidity: int = Field(default=80, description="Humidity percentage")
-    extreme_weather_conditions: list[str] = Field(
-        default=["Thunderstorm", "Heavy Rain", "Storm", "Tornado", "Hurricane"]
+class MetricStats(BaseModel):
+    count: int
+    mean: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    stddev: Optional[float]
+
+class WeatherRollupResponse(BaseModel):
+    city: str
+    bucket: datetime
+    observations: int
+    temperature: MetricStats
+    humidity: MetricStats
+    pressure: MetricStats
+    wind_speed: MetricStats
+
+class AlertRuleCreate(BaseModel):
+    alert_type: str
+    city: Optional[str] = Field(default=None, description="Omit for a rule that applies to every city")
+    condition: dict = Field(description='e.g. {"metric": "temperature", "op": ">", "value": 35}')
+    message: Optional[str] = Field(default=None, description="str.format template over the observation")
+    clear_condition: Optional[dict] = Field(
+        default=None, description="Resets an active alert; omit to reset as soon as the condition stops holding"
     )
+    cooldown_minutes: Optional[int] = Field(default=None, description="Minimum gap between alerts, default from settings")
+    enabled: bool = True
+
+class AlertRuleResponse(BaseModel):
+    id: int
+    alert_type: str
+    city: Optional[str]
+    condition: dict
+    message: Optional[str]
+    clear_condition: Optional[dict]
+    cooldown_minutes: Optional[int]
+    enabled: bool
+    updated_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,308 @@
+"""Deliver unsent WeatherAlert rows through pluggable sinks
+
+A worker claims a batch of due alerts with SELECT ... FOR UPDATE SKIP LOCKED and
+pushes their next_attempt_at forward by a lease, so concurrent workers (or app
+instances) never deliver the same alert at the same time and a crashed worker's
+claim simply expires. The batch is split into chunks; every chunk is handed to
+every configured sink with bounded concurrency. Delivered alerts are marked sent
+with one UPDATE; failed chunks get an exponential-backoff retry time.
+
+Delivery is at least once: when one of several sinks fails, the retry also goes
+to the sinks that already succeeded.
+"""
+import asyncio
+import json
+import smtplib
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Deque, Dict, List, Optional, Sequence
+from sqlalchemy import func, or_, select, update
+from src.database.connection import AsyncSessionLocal
+from src.models.weather import WeatherAlert
+from src.services.cache import response_cache
+from src.services.http_client import get_http_client
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 1000
+
+
+class AlertSink(ABC):
+    """Delivers a chunk of alerts (JSON-ready dicts); raises on failure"""
+    name = "sink"
+
+    @abstractmethod
+    async def send(self, alerts: List[dict]):
+        ...
+
+
+class WebhookSink(AlertSink):
+    """POST {"alerts": [...]} to a URL on the shared HTTP client"""
+    name = "webhook"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def send(self, alerts: List[dict]):
+        # No client-level retries here: the worker reschedules the whole chunk
+        response = await get_http_client().post(self.url, json={"alerts": alerts})
+        response.raise_for_status()
+
+
+class SmtpSink(AlertSink):
+    """One email per alert, one SMTP session per chunk, run in a thread (smtplib blocks)"""
+    name = "smtp"
+
+    def __init__(self, host: str, port: int, sender: str, recipients: Sequence[str], username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = False, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def _message(self, alert: dict) -> EmailMessage:
+        message = EmailMessage()
+        message["Subject"] = f"[{alert['city']}] {alert['alert_type'].replace('_', ' ')}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(f"{alert['message']}\n\nCity: {alert['city']}\nAt: {alert['created_at']}\n")
+        return message
+
+    def _send_blocking(self, alerts: List[dict]):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            for alert in alerts:
+                smtp.send_message(self._message(alert))
+
+    async def send(self, alerts: List[dict]):
+        await asyncio.to_thread(self._send_blocking, alerts)
+
+
+class FileSink(AlertSink):
+    """Append alerts as NDJSON lines to a local file"""
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, alerts: List[dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(alert) + "\n" for alert in alerts))
+
+    async def send(self, alerts: List[dict]):
+        await asyncio.to_thread(self._append, alerts)
+
+
+def build_sinks(names: Optional[str] = None) -> List[AlertSink]:
+    """Sinks named in ALERT_SINKS, configured from settings"""
+    sinks = []
+    for name in filter(None, (part.strip().lower() for part in (names if names is not None else settings.ALERT_SINKS).split(","))):
+        if name == "webhook":
+            if not settings.ALERT_WEBHOOK_URL:
+                raise ValueError("ALERT_SINKS includes webhook but ALERT_WEBHOOK_URL is not set")
+            sinks.append(WebhookSink(settings.ALERT_WEBHOOK_URL))
+        elif name == "smtp":
+            recipients = [r.strip() for r in settings.ALERT_EMAIL_TO.split(",") if r.strip()]
+            if not recipients:
+                raise ValueError("ALERT_SINKS includes smtp but ALERT_EMAIL_TO is empty")
+            sinks.append(SmtpSink(
+                settings.ALERT_SMTP_HOST, settings.ALERT_SMTP_PORT, settings.ALERT_EMAIL_FROM, recipients,
+                settings.ALERT_SMTP_USERNAME, settings.ALERT_SMTP_PASSWORD, settings.ALERT_SMTP_STARTTLS,
+                settings.ALERT_SMTP_TIMEOUT
+            ))
+        elif name == "file":
+            sinks.append(FileSink(settings.ALERT_FILE_PATH))
+        else:
+            raise ValueError(f"Unknown alert sink: {name}")
+    return sinks
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+@dataclass
+class DeliveryStats:
+    claimed: int = 0
+    delivered: int = 0
+    failed_attempts: int = 0
+    gave_up: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+    sink_latency: Dict[str, Deque[float]] = field(default_factory=dict)  # Seconds per sink call
+    end_to_end: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))  # created -> sent
+
+    def record_sink(self, name: str, seconds: float):
+        self.sink_latency.setdefault(name, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "claimed": self.claimed,
+            "delivered": self.delivered,
+            "failed_attempts": self.failed_attempts,
+            "gave_up": self.gave_up,
+            "batches": self.batches,
+            "throughput_per_second": round(self.delivered / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            "sink_latency": {name: _percentiles(samples) for name, samples in self.sink_latency.items()},
+            "end_to_end_latency": _percentiles(self.end_to_end),
+        }
+
+
+stats = DeliveryStats()
+
+
+class AlertDeliveryWorker:
+    """Claims due alerts in batches and delivers them through `sinks`"""
+
+    def __init__(
+        self,
+        sinks: List[AlertSink],
+        batch_size: int = None,
+        chunk_size: int = None,
+        concurrency: int = None,
+        max_attempts: int = None
+    ):
+        self.sinks = sinks
+        self.batch_size = batch_size or settings.ALERT_DELIVERY_BATCH_SIZE
+        self.chunk_size = chunk_size or settings.ALERT_DELIVERY_CHUNK_SIZE
+        self.max_attempts = max_attempts or settings.ALERT_DELIVERY_MAX_ATTEMPTS
+        self._semaphore = asyncio.Semaphore(concurrency or settings.ALERT_DELIVERY_CONCURRENCY)
+
+    def _claim_query(self, now: datetime):
+        due = select(WeatherAlert.id).where(
+            WeatherAlert.is_sent == False,
+            WeatherAlert.created_at >= now - timedelta(hours=settings.ALERT_DELIVERY_MAX_AGE_HOURS),
+            WeatherAlert.delivery_attempts < self.max_attempts,
+            or_(WeatherAlert.next_attempt_at.is_(None), WeatherAlert.next_attempt_at <= now)
+        ).order_by(WeatherAlert.created_at).limit(self.batch_size).with_for_update(skip_locked=True)
+        return update(WeatherAlert).where(WeatherAlert.id.in_(due)).values(
+            next_attempt_at=now + timedelta(seconds=settings.ALERT_DELIVERY_LEASE_SECONDS)
+        ).returning(
+            WeatherAlert.id, WeatherAlert.city, WeatherAlert.alert_type, WeatherAlert.message,
+            WeatherAlert.threshold_value, WeatherAlert.actual_value, WeatherAlert.created_at,
+            WeatherAlert.delivery_attempts
+        )
+
+    async def claim(self) -> List[dict]:
+        """Lease up to batch_size due alerts (committed, so the row locks are held only briefly)"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(self._claim_query(datetime.now(timezone.utc)))
+            rows = [dict(row) for row in result.mappings()]
+            await db.commit()
+        return sorted(rows, key=lambda row: row["created_at"])
+
+    async def _send_chunk(self, chunk: List[dict]) -> Optional[str]:
+        """Deliver one chunk to every sink; the first error message, or None"""
+        payload = [
+            {**{k: v for k, v in alert.items() if k != "delivery_attempts"}, "created_at": alert["created_at"].isoformat()}
+            for alert in chunk
+        ]
+
+        async def send(sink: AlertSink):
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    await sink.send(payload)
+                finally:
+                    stats.record_sink(sink.name, time.perf_counter() - started)
+
+        results = await asyncio.gather(*(send(sink) for sink in self.sinks), return_exceptions=True)
+        errors = [f"{sink.name}: {result.__class__.__name__}: {result}"
+                  for sink, result in zip(self.sinks, results) if isinstance(result, BaseException)]
+        return "; ".join(errors)[:500] if errors else None
+
+    async def _record(self, sent_ids: List[int], failures: Dict[str, List[int]]):
+        async with AsyncSessionLocal() as db:
+            if sent_ids:
+                await db.execute(update(WeatherAlert).where(WeatherAlert.id.in_(sent_ids)).values(
+                    is_sent=True,
+                    sent_at=func.now(),
+                    delivery_attempts=WeatherAlert.delivery_attempts + 1,
+                    next_attempt_at=None,
+                    last_error=None
+                ))
+            for error, ids in failures.items():
+                # Equal-jitter exponential backoff computed in SQL from each row's attempt count
+                delay = func.least(
+                    settings.ALERT_DELIVERY_BACKOFF_MAX,
+                    settings.ALERT_DELIVERY_BACKOFF_BASE * func.power(2, WeatherAlert.delivery_attempts)
+                ) * (0.5 + func.random() / 2)
+                result = await db.execute(update(WeatherAlert).where(WeatherAlert.id.in_(ids)).values(
+                    delivery_attempts=WeatherAlert.delivery_attempts + 1,
+                    next_attempt_at=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, delay),
+                    last_error=error
+                ).returning(WeatherAlert.id, WeatherAlert.delivery_attempts))
+                exhausted = [row.id for row in result if row.delivery_attempts >= self.max_attempts]
+                if exhausted:
+                    stats.gave_up += len(exhausted)
+                    logger.error(f"Giving up on alerts {exhausted} after {self.max_attempts} attempts: {error}")
+            await db.commit()
+
+    async def deliver_batch(self, alerts: List[dict]) -> int:
+        """Deliver claimed alerts and record the outcome; returns how many were delivered"""
+        chunks = [alerts[i:i + self.chunk_size] for i in range(0, len(alerts), self.chunk_size)]
+        errors = await asyncio.gather(*(self._send_chunk(chunk) for chunk in chunks))
+
+        sent_ids, failures = [], {}
+        for chunk, error in zip(chunks, errors):
+            ids = [alert["id"] for alert in chunk]
+            if error is None:
+                sent_ids.extend(ids)
+            else:
+                failures.setdefault(error, []).extend(ids)
+                logger.warning(f"Delivery of {len(ids)} alerts failed: {error}")
+        await self._record(sent_ids, failures)
+        # /alerts shows is_sent
+        for city in {alert["city"] for alert in alerts}:
+            response_cache.invalidate("alerts", city)
+
+        now = datetime.now(timezone.utc)
+        for chunk, error in zip(chunks, errors):
+            if error is None:
+                stats.end_to_end.extend((now - alert["created_at"]).total_seconds() for alert in chunk)
+        stats.delivered += len(sent_ids)
+        stats.failed_attempts += sum(len(ids) for ids in failures.values())
+        return len(sent_ids)
+
+    async def run(self, max_batches: Optional[int] = None) -> int:
+        """Claim and deliver batches until nothing is due; returns alerts delivered"""
+        if not self.sinks:
+            return 0
+        delivered, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            started = time.perf_counter()
+            alerts = await self.claim()
+            if not alerts:
+                break
+            stats.claimed += len(alerts)
+            stats.batches += 1
+            batches += 1
+            delivered += await self.deliver_batch(alerts)
+            stats.busy_seconds += time.perf_counter() - started
+        return delivered
+
+
+def get_delivery_stats() -> dict:
+    return stats.to_dict()
+
+
+def reset_delivery_stats():
+    global stats
+    stats = DeliveryStats()
@@ -1,85 +1,190 @@
+import asyncio
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from src.models.weather import WeatherData, WeatherAlert
-from src.schemas.weather import AlertThreshold
+from sqlalchemy import func, insert, select
+from src.models.weather import WeatherData, WeatherAlert, AlertRule
+from src.schemas.weather import WeatherAlertResponse, AlertRuleCreate
+from src.services.cache import response_cache
+from src.services.city_registry import city_registry
+from src.services.alert_state import alert_state_index
+from src.services.event_bus import event_bus
+from src.services.rule_engine import CompiledRule, RuleError, RuleSet, OBSERVATION_FIELDS
 from src.config.settings import settings
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+class AlertRuleCache:
+    """Enabled alert rules, compiled once and reused until edited or ALERT_RULES_REFRESH_SECONDS pass"""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._rules: Optional[RuleSet] = None
+        self._loaded_at = 0.0
+        self.relays: List[Callable[[], None]] = []  # Told about local edits (cluster_events)
+
+    async def get(self, db: AsyncSession) -> RuleSet:
+        if self._rules is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+            result = await db.scalars(select(AlertRule).where(AlertRule.enabled == True))
+            compiled = []
+            for rule in result:
+                try:
+                    compiled.append(CompiledRule.compile(
+                        rule.alert_type, rule.condition, rule.message, rule.city, rule.id,
+                        rule.clear_condition, rule.cooldown_minutes
+                    ))
+                except RuleError as e:
+                    logger.error(f"Skipping alert rule {rule.id} ({rule.alert_type}): {e}")
+            self._rules = RuleSet(compiled)
+            self._loaded_at = time.monotonic()
+        return self._rules
+
+    def invalidate(self, remote: bool = False):
+        self._rules = None
+        if not remote:
+            for relay in self.relays:
+                relay()
+
+
+alert_rule_cache = AlertRuleCache(refresh_seconds=settings.ALERT_RULES_REFRESH_SECONDS)
+
+# The ingest dispatcher, the reconciliation job and manual triggers share alert_state_index
+_check_lock = asyncio.Lock()
+
+
 class AlertService:
     
     @staticmethod
-    async def check_weather_alerts(db: AsyncSession, thresholds: AlertThreshold = AlertThreshold()):
-        """Check weather conditions and create alerts if thresholds are exceeded"""
+    def latest_observations_query(cities: List[str], since: datetime, rate_metrics=()):
+        """Latest observation per city via DISTINCT ON, with lag() columns for rate-of-change rules
+        
+        Restricted to `cities` and the lookback window, so the rows read follow
+        the polling cadence rather than the table size.
+        """
+        columns = [getattr(WeatherData, name) for name in sorted(OBSERVATION_FIELDS)]
+        if rate_metrics:
+            window = {"partition_by": WeatherData.city, "order_by": WeatherData.recorded_at}
+            columns.append(func.lag(WeatherData.recorded_at).over(**window).label("prev_recorded_at"))
+            columns += [
+                func.lag(getattr(WeatherData, metric)).over(**window).label(f"prev_{metric}")
+                for metric in sorted(rate_metrics)
+            ]
+        return select(*columns).where(
+            WeatherData.city.in_(cities),
+            WeatherData.is_deleted == False,
+            WeatherData.recorded_at >= since
+        ).distinct(WeatherData.city).order_by(WeatherData.city, WeatherData.recorded_at.desc())
+    
+    @staticmethod
+    async def check_weather_alerts(db: AsyncSession, cities: Optional[List[str]] = None) -> List[WeatherAlert]:
+        """Evaluate the alert rules against the latest observation of every monitored city (or `cities`)
+        
+        One SELECT for the observations and one multi-row INSERT ... RETURNING for
+        the alerts; rules come from alert_rule_cache. Only state changes (activation
+        past the cooldown) that alert_states accepts create alerts, so workers
+        checking concurrently do not alert twice, and readings already evaluated
+        are skipped. Checks run one at a time per worker.
+        """
+        async with _check_lock:
+            return await AlertService._check_weather_alerts(db, cities)
+    
+    @staticmethod
+    async def _check_weather_alerts(db: AsyncSession, cities: Optional[List[str]]) -> List[WeatherAlert]:
         try:
-            # Get latest weather data
-            query = select(WeatherData).where(
-                and_(
-                    WeatherData.city == settings.CITY_NAME,
-                    WeatherData.is_deleted == False
-                )
-            ).order_by(WeatherData.recorded_at.desc()).limit(1)
-            
-            result = await db.execute(query)
-            latest_weather = result.scalar_one_or_none()
-            
-            if not latest_weather:
-                logger.warning("No weather data found for alert checking")
+            rules = await alert_rule_cache.get(db)
+            if not len(rules):
+                logger.warning("No enabled alert rules")
                 return []
+            if alert_state_index.rules is not rules:
+                alert_state_index.load(rules)
             
-            alerts = []
-            
-            # Check high temperature
-            if latest_weather.temperature > thresholds.high_temperature:
-                alert = WeatherAlert(
-                    city=latest_weather.city,
-                    alert_type="high_temperature",
-                    message=f"High temperature alert! Current: {latest_weather.temperature}°C, Threshold: {thresholds.high_temperature}°C",
-                    threshold_value=thresholds.high_temperature,
-                    actual_value=latest_weather.temperature,
-                    is_sent=False
-                )
-                alerts.append(alert)
+            cities = cities or city_registry.list()
+            since = datetime.now(timezone.utc) - timedelta(hours=settings.ALERT_LOOKBACK_HOURS)
+            result = await db.execute(AlertService.latest_observations_query(cities, since, rules.rate_metrics))
+            observations = result.mappings().all()
             
-            # Check high humidity
-            if latest_weather.humidity > thresholds.high_humidity:
-                alert = WeatherAlert(
-                    city=latest_weather.city,
-                    alert_type="high_humidity",
-                    message=f"High humidity alert! Current: {latest_weather.humidity}%, Threshold: {thresholds.high_humidity}%",
-                    threshold_value=float(thresholds.high_humidity),
-                    actual_value=float(latest_weather.humidity),
-                    is_sent=False
-                )
-                alerts.append(alert)
+            if not observations:
+                logger.warning("No recent weather data found for alert checking")
+                return []
             
-            # Check extreme weather
-            if latest_weather.weather_main in thresholds.extreme_weather_conditions:
-                alert = WeatherAlert(
-                    city=latest_weather.city,
-                    alert_type="extreme_weather",
-                    message=f"Extreme weather alert! Current condition: {latest_weather.weather_main} - {latest_weather.weather_description}",
-                    threshold_value=None,
-                    actual_value=0.0,
-                    is_sent=False
-                )
-                alerts.append(alert)
+            observations = alert_state_index.pending(observations)
+            if not observations:
+                logger.info("No new observations since the last alert check")
+                return []
             
-            # Save alerts
-            if alerts:
-                db.add_all(alerts)
+            await alert_state_index.refresh(db, {o["city"] for o in observations})
+            now = datetime.now(timezone.utc)
+            changes = alert_state_index.evaluate(
+                observations, now, timedelta(minutes=settings.ALERT_COOLDOWN_MINUTES)
+            )
+            alerts = []
+            if changes:
+                changes = await alert_state_index.save(db, changes, now)
+                values = [change.alert for change in changes if change.alert is not None]
+                if values:
+                    # Save alerts; render_nulls keeps rows with and without a threshold in one INSERT
+                    stmt = insert(WeatherAlert).execution_options(render_nulls=True).returning(WeatherAlert)
+                    alerts = (await db.scalars(stmt, values)).all()
                 await db.commit()
-                logger.info(f"Created {len(alerts)} weather alerts")
+            alert_state_index.apply(changes, observations)
+            for city in {alert.city for alert in alerts}:
+                response_cache.invalidate("alerts", city)
+            for alert in alerts:
+                event_bus.publish("alert", alert.city, WeatherAlertResponse.model_validate(alert).model_dump(mode="json"))
+            logger.info(f"Created {len(alerts)} weather alerts")
             
             return alerts
             
         except Exception as e:
             await db.rollback()
+            alert_state_index.reset()
             logger.error(f"Error checking weather alerts: {e}")
             raise
     
+    @staticmethod
+    async def list_rules(db: AsyncSession) -> List[AlertRule]:
+        """Get every alert rule, global rules first"""
+        result = await db.scalars(
+            select(AlertRule).order_by(AlertRule.city.nulls_first(), AlertRule.alert_type)
+        )
+        return result.all()
+    
+    @staticmethod
+    async def save_rule(db: AsyncSession, data: AlertRuleCreate) -> AlertRule:
+        """Create or replace the rule for (alert_type, city); raises RuleError if it does not compile"""
+        CompiledRule.compile(
+            data.alert_type, data.condition, data.message, data.city,
+            clear_condition=data.clear_condition, cooldown_minutes=data.cooldown_minutes
+        )
+        
+        city_filter = AlertRule.city.is_(None) if data.city is None else AlertRule.city == data.city
+        rule = await db.scalar(select(AlertRule).where(AlertRule.alert_type == data.alert_type, city_filter))
+        if rule is None:
+            rule = AlertRule(alert_type=data.alert_type, city=data.city)
+            db.add(rule)
+        rule.condition = data.condition
+        rule.message = data.message
+        rule.clear_condition = data.clear_condition
+        rule.cooldown_minutes = data.cooldown_minutes
+        rule.enabled = data.enabled
+        await db.commit()
+        await db.refresh(rule)
+        alert_rule_cache.invalidate()
+        return rule
+    
+    @staticmethod
+    async def delete_rule(db: AsyncSession, rule_id: int) -> bool:
+        rule = await db.get(AlertRule, rule_id)
+        if rule is None:
+            return False
+        await db.delete(rule)
+        await db.commit()
+        alert_rule_cache.invalidate()
+        return True
+    
     @staticmethod
     async def get_recent_alerts(db: AsyncSession, city: str = settings.CITY_NAME, limit: int = 10):
         """Get recent alerts for a city"""
@@ -0,0 +1,172 @@
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.weather import AlertState
+from src.services.rule_engine import Observation, RuleSet
+import logging
+
+logger = logging.getLogger(__name__)
+
+StateKey = Tuple[str, str]  # (city, alert_type)
+
+
+@dataclass(frozen=True)
+class AlertStateEntry:
+    active: bool = False
+    last_observation_id: Optional[int] = None
+    last_alerted_at: Optional[datetime] = None
+
+
+INACTIVE = AlertStateEntry()
+
+
+@dataclass(frozen=True)
+class StateChange:
+    """A state change an observation calls for, and the alert it creates if it is written"""
+    key: StateKey
+    state: AlertStateEntry
+    alert: Optional[dict] = None
+    cooldown: Optional[timedelta] = None  # Set with `alert`: the last alert must be at least this old
+
+
+class AlertStateIndex:
+    """Per-(city, alert_type) alert state, decided by the alert_states rows
+
+    A rule alerts when its (city, alert_type) goes from inactive to active and the
+    cooldown since the last alert has passed; it goes back to inactive only when
+    the rule's clear condition holds. Rows are written only for those changes, and
+    an observation already evaluated against the current rule set is skipped.
+
+    Several workers evaluate alerts (the fetch lease moves between them, and manual
+    checks land anywhere), so the copy held here is only a snapshot, re-read for
+    the cities of every check. Each change is written with a conditional upsert
+    that re-checks the row (still inactive, cooled down, not already moved on by a
+    newer observation); an alert is created only for changes the database accepted.
+    """
+
+    def __init__(self):
+        self._states: Dict[StateKey, AlertStateEntry] = {}
+        self._evaluated: Dict[str, int] = {}  # city -> last observation id evaluated
+        self.rules: Optional[RuleSet] = None
+
+    def load(self, rules: RuleSet):
+        """Start over with a (re)loaded rule set: every latest observation is evaluated again"""
+        self._evaluated.clear()
+        self.rules = rules
+
+    def reset(self):
+        """Forget everything so the next check reloads from the database"""
+        self.rules = None
+
+    async def refresh(self, db: AsyncSession, cities: Iterable[str]):
+        """Replace the snapshot of `cities` with their current alert_states rows"""
+        cities = set(cities)
+        result = await db.execute(select(AlertState).where(AlertState.city.in_(cities)))
+        self._states = {key: state for key, state in self._states.items() if key[0] not in cities}
+        for row in result.scalars():
+            self._states[(row.city, row.alert_type)] = AlertStateEntry(
+                row.active, row.last_observation_id, row.last_alerted_at
+            )
+
+    def get(self, city: str, alert_type: str) -> AlertStateEntry:
+        return self._states.get((city, alert_type), INACTIVE)
+
+    def pending(self, observations: Iterable[Observation]) -> List[Observation]:
+        """Observations not evaluated yet (each city's reading is checked once)"""
+        return [o for o in observations if self._evaluated.get(o["city"]) != o["id"]]
+
+    def evaluate(
+        self,
+        observations: Iterable[Observation],
+        now: datetime,
+        default_cooldown: timedelta
+    ) -> List[StateChange]:
+        """State changes (with their alerts) called for by the snapshot; nothing is changed until save()"""
+        changes = []
+        for observation in observations:
+            for rule in self.rules.rules_for(observation["city"]):
+                key = (observation["city"], rule.alert_type)
+                state = self._states.get(key, INACTIVE)
+                if state.last_observation_id == observation["id"]:
+                    continue
+                if state.active:
+                    if rule.clears(observation):
+                        changes.append(StateChange(key, replace(state, active=False, last_observation_id=observation["id"])))
+                    continue
+                alert = rule.evaluate(observation)
+                if alert is None:
+                    continue
+                cooldown = rule.cooldown if rule.cooldown is not None else default_cooldown
+                if state.last_alerted_at is None or now - state.last_alerted_at >= cooldown:
+                    changes.append(StateChange(
+                        key, AlertStateEntry(True, observation["id"], now), alert=alert, cooldown=cooldown
+                    ))
+                else:
+                    changes.append(StateChange(key, replace(state, active=True, last_observation_id=observation["id"])))
+        return changes
+
+    @staticmethod
+    async def save(db: AsyncSession, changes: List[StateChange], now: datetime) -> List[StateChange]:
+        """Write the changes the alert_states rows still allow; returns those (caller commits)
+
+        One INSERT ... ON CONFLICT DO UPDATE ... WHERE ... RETURNING per kind of
+        change (and per cooldown): a row another worker has already activated,
+        alerted within the cooldown, cleared, or moved on with a newer observation
+        is left as it is, and the change is dropped.
+        """
+        def kind(change: StateChange):
+            return (change.state.active, change.alert is not None, change.cooldown or timedelta(0))
+
+        accepted = []
+        for (active, alerting, cooldown), group in groupby(sorted(changes, key=lambda c: (kind(c), c.key)), key=kind):
+            group = list(group)
+            stmt = insert(AlertState).values([
+                {
+                    "city": change.key[0],
+                    "alert_type": change.key[1],
+                    "active": change.state.active,
+                    "last_observation_id": change.state.last_observation_id,
+                    "last_alerted_at": change.state.last_alerted_at,
+                }
+                for change in group
+            ])
+            current = AlertState.__table__.c
+            guard = [
+                or_(current.last_observation_id.is_(None), current.last_observation_id < stmt.excluded.last_observation_id),
+                current.active == (not active),
+            ]
+            if alerting:
+                guard.append(or_(current.last_alerted_at.is_(None), current.last_alerted_at <= now - cooldown))
+            result = await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["city", "alert_type"],
+                    set_={
+                        "active": stmt.excluded.active,
+                        "last_observation_id": stmt.excluded.last_observation_id,
+                        "last_alerted_at": stmt.excluded.last_alerted_at,
+                        "updated_at": func.now(),
+                    },
+                    where=and_(*guard)
+                ).returning(current.city, current.alert_type)
+            )
+            written = set(map(tuple, result.all()))
+            accepted += [change for change in group if change.key in written]
+        if len(accepted) < len(changes):
+            logger.info(f"{len(changes) - len(accepted)} alert state changes were already made by another worker")
+        return accepted
+
+    def apply(self, changes: List[StateChange], observations: Iterable[Observation]):
+        """Record committed changes and evaluated observations in memory"""
+        self._states.update((change.key, change.state) for change in changes)
+        for observation in observations:
+            self._evaluated[observation["city"]] = observation["id"]
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+alert_state_index = AlertStateIndex()
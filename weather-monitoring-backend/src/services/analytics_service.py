@@ -0,0 +1,231 @@
+import math
+import warnings
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.weather import WeatherData, ROLLUP_METRICS
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_METRICS = ROLLUP_METRICS
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class SeriesBatch:
+    """Observations of many cities as right-aligned (cities x time) arrays, NaN padded at the front"""
+    cities: List[str]
+    times: np.ndarray  # Epoch seconds
+    values: Dict[str, np.ndarray]  # metric -> values, same shape as times
+
+
+class AnalyticsService:
+    """Trend, smoothing and anomaly statistics computed on NumPy arrays for many cities at once"""
+
+    @staticmethod
+    async def load_series(
+        db: AsyncSession,
+        cities: Sequence[str],
+        since: datetime,
+        metrics: Sequence[str] = ANALYTICS_METRICS
+    ) -> SeriesBatch:
+        """Load each city's series as arrays, one row per city via array_agg (no ORM objects)"""
+        order = WeatherData.recorded_at
+        query = select(
+            WeatherData.city,
+            func.array_agg(aggregate_order_by(cast(func.extract("epoch", WeatherData.recorded_at), Float), order)),
+            *(func.array_agg(aggregate_order_by(getattr(WeatherData, metric), order)) for metric in metrics)
+        ).where(
+            WeatherData.city.in_(cities),
+            WeatherData.recorded_at >= since,
+            WeatherData.is_deleted == False
+        ).group_by(WeatherData.city)
+        rows = {row[0]: row[1:] for row in await db.execute(query)}
+
+        ordered = [city for city in cities if city in rows]
+        width = max((len(rows[city][0]) for city in ordered), default=0)
+        times = np.full((len(ordered), width), np.nan)
+        values = {metric: np.full((len(ordered), width), np.nan) for metric in metrics}
+        for i, city in enumerate(ordered):
+            columns = rows[city]
+            length = len(columns[0])
+            times[i, width - length:] = columns[0]
+            for metric, column in zip(metrics, columns[1:]):
+                # None (missing reading) becomes NaN
+                values[metric][i, width - length:] = np.array(column, dtype=float)
+        return SeriesBatch(cities=ordered, times=times, values=values)
+
+    @staticmethod
+    def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+        """Mean of the last `window` readings at every position, ignoring NaNs"""
+        valid = ~np.isnan(values)
+        sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+        counts = np.cumsum(valid, axis=1)
+        zeros = np.zeros((values.shape[0], 1))
+        sums = np.concatenate([zeros, sums], axis=1)
+        counts = np.concatenate([zeros, counts], axis=1)
+        start = np.maximum(np.arange(1, values.shape[1] + 1) - window, 0)
+        window_counts = counts[:, 1:] - counts[:, start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(window_counts > 0, (sums[:, 1:] - sums[:, start]) / window_counts, np.nan)
+
+    @staticmethod
+    def fill_gaps(values: np.ndarray) -> np.ndarray:
+        """Forward-fill missing readings; positions before a city's first reading take that reading"""
+        valid = ~np.isnan(values)
+        positions = np.arange(values.shape[1])
+        first = np.argmax(valid, axis=1)
+        last_seen = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+        last_seen = np.where(last_seen < 0, first[:, None], last_seen)
+        return values[np.arange(values.shape[0])[:, None], last_seen]
+
+    @staticmethod
+    def ewma(values: np.ndarray, alpha: float, block: int = 64) -> np.ndarray:
+        """Exponentially weighted moving average, s[t] = alpha * x[t] + (1 - alpha) * s[t - 1]
+
+        Within a block of `block` readings the recurrence is a lower-triangular
+        matrix product, so Python only loops once per block and every block is
+        computed for all cities at once. Gaps are forward-filled first.
+        """
+        filled = AnalyticsService.fill_gaps(values)
+        lags = np.arange(block)[:, None] - np.arange(block)[None, :]
+        weights = np.where(lags >= 0, alpha * (1 - alpha) ** np.maximum(lags, 0), 0.0)
+        decay = (1 - alpha) ** np.arange(1, block + 1)
+
+        smoothed = np.empty_like(filled)
+        state = filled[:, 0]  # s[-1] = x[0] so the average starts at the first reading
+        for start in range(0, filled.shape[1], block):
+            chunk = filled[:, start:start + block]
+            width = chunk.shape[1]
+            smoothed[:, start:start + width] = chunk @ weights[:width, :width].T + state[:, None] * decay[None, :width]
+            state = smoothed[:, start + width - 1]
+
+        # Padding before a city's first reading stays empty
+        started = np.cumsum(~np.isnan(values), axis=1) > 0
+        return np.where(started, smoothed, np.nan)
+
+    @staticmethod
+    def trend_slope(times: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Least-squares slope per city, in units per hour"""
+        mask = ~np.isnan(values) & ~np.isnan(times)
+        hours = np.where(mask, times, 0.0) / 3600.0
+        x = np.where(mask, values, 0.0)
+        n = mask.sum(axis=1)
+        # Center time per city so the normal equations stay well conditioned
+        with np.errstate(invalid="ignore", divide="ignore"):
+            hours = np.where(mask, hours - hours.sum(axis=1, keepdims=True) / n[:, None], 0.0)
+            sum_t = hours.sum(axis=1)
+            sum_x = x.sum(axis=1)
+            denominator = n * (hours * hours).sum(axis=1) - sum_t * sum_t
+            slope = (n * (hours * x).sum(axis=1) - sum_t * sum_x) / denominator
+        return np.where((n >= 2) & (denominator > 0), slope, np.nan)
+
+    @staticmethod
+    def zscores(values: np.ndarray) -> np.ndarray:
+        """Standard score of every reading against its own city's mean and deviation"""
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN rows
+            mean = np.nanmean(values, axis=1, keepdims=True)
+            std = np.nanstd(values, axis=1, keepdims=True)
+            return np.where(std > 0, (values - mean) / std, 0.0)
+
+    @staticmethod
+    def percentiles(values: np.ndarray, q: Sequence[float] = PERCENTILES) -> np.ndarray:
+        """(len(q), cities) percentiles with linear interpolation, NaN for cities without readings
+
+        Same result as np.nanpercentile, which falls back to a per-row loop when NaNs are present.
+        """
+        ordered = np.sort(values, axis=1)  # NaNs sort last
+        count = (~np.isnan(values)).sum(axis=1)
+        position = (np.maximum(count, 1) - 1)[None, :] * (np.asarray(q, dtype=float)[:, None] / 100)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, np.maximum(count - 1, 0)[None, :])
+        low_values = np.take_along_axis(ordered, lower.T, axis=1).T
+        high_values = np.take_along_axis(ordered, upper.T, axis=1).T
+        result = low_values + (high_values - low_values) * (position - lower)
+        return np.where(count[None, :] > 0, result, np.nan)
+
+    @staticmethod
+    def analyze(batch: SeriesBatch, window: int = None, alpha: float = None, z_threshold: float = None) -> List[dict]:
+        """Per-city statistics for every metric in the batch"""
+        window = window or settings.ANALYTICS_WINDOW
+        alpha = alpha or settings.ANALYTICS_EWMA_ALPHA
+        z_threshold = z_threshold or settings.ANALYTICS_ZSCORE_THRESHOLD
+
+        results = []
+        if not batch.cities:
+            return results
+        rows = np.arange(len(batch.cities))
+        last_time = np.where(np.isnan(batch.times), -np.inf, batch.times).max(axis=1)
+        for i, city in enumerate(batch.cities):
+            observed = np.isfinite(last_time[i])
+            results.append({
+                "city": city,
+                "last_observed_at": _timestamp(last_time[i]) if observed else None,
+                "metrics": {}
+            })
+
+        for metric, values in batch.values.items():
+            valid = ~np.isnan(values)
+            count = valid.sum(axis=1)
+            # Column of the newest reading per city (-1 when there is none)
+            last = np.where(count > 0, values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1), -1)
+            latest = values[rows, last]
+            rolling = AnalyticsService.rolling_mean(values, window)[rows, last]
+            smoothed = AnalyticsService.ewma(values, alpha)[rows, last]
+            slope = AnalyticsService.trend_slope(batch.times, values)
+            quantiles = AnalyticsService.percentiles(values)
+            z = AnalyticsService.zscores(values)
+            flagged = np.abs(z) > z_threshold
+
+            latest, rolling, smoothed = _to_list(latest), _to_list(rolling), _to_list(smoothed)
+            slope = _to_list(slope, 4)
+            quantiles = [_to_list(row) for row in quantiles]
+            for i, result in enumerate(results):
+                has_data = count[i] > 0
+                result["metrics"][metric] = {
+                    "count": int(count[i]),
+                    "latest": latest[i] if has_data else None,
+                    "rolling_mean": rolling[i] if has_data else None,
+                    "ewma": smoothed[i] if has_data else None,
+                    "trend_per_hour": slope[i],
+                    "percentiles": {f"p{q}": quantiles[k][i] for k, q in enumerate(PERCENTILES)},
+                    "anomalies": [
+                        {
+                            "time": _timestamp(batch.times[i, t]),
+                            "value": round(float(values[i, t]), 2),
+                            "zscore": round(float(z[i, t]), 2)
+                        }
+                        for t in np.flatnonzero(flagged[i])
+                    ],
+                }
+        return results
+
+    @staticmethod
+    async def get_analytics(
+        db: AsyncSession,
+        cities: Sequence[str],
+        hours: int = None,
+        window: int = None,
+        alpha: float = None,
+        z_threshold: float = None
+    ) -> List[dict]:
+        """Load the last `hours` of readings for `cities` and analyze them in one pass"""
+        since = datetime.now(timezone.utc) - timedelta(hours=hours or settings.ANALYTICS_DEFAULT_HOURS)
+        batch = await AnalyticsService.load_series(db, cities, since)
+        return AnalyticsService.analyze(batch, window, alpha, z_threshold)
+
+
+def _to_list(values: np.ndarray, digits: int = 2) -> List[Optional[float]]:
+    """Round a whole array at once and turn NaN into None (+ 0.0 turns -0.0 into 0.0)"""
+    return [None if math.isnan(v) else v for v in (np.round(values, digits) + 0.0).tolist()]
+
+
+def _timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).isoformat()
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.weather import WeatherData
+from src.services.weather_service import WeatherService
+from src.services.cache import response_cache
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BulkWeatherWriter:
+    """Buffers OpenWeather payloads and writes them with one INSERT per batch
+
+    A batch is flushed once `flush_size` payloads are buffered or the oldest one has
+    waited `flush_interval` seconds. Every batch goes through the same session and the
+    transaction is committed once when the writer is closed, or rolled back on error.
+    Each batch is written in a SAVEPOINT: when the database rejects it, it is retried
+    in halves down to single rows, and only the rejected rows are dropped (listed in
+    `failed`), so one bad row does not cost the others.
+
+        async with BulkWeatherWriter(db) as writer:
+            await writer.add(payload)
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        flush_size: int = settings.BULK_INSERT_FLUSH_SIZE,
+        flush_interval: float = settings.BULK_INSERT_FLUSH_INTERVAL
+    ):
+        self.db = db
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.saved: List[WeatherData] = []
+        self.failed: Dict[str, str] = {}  # Key passed to add() -> why the database rejected its row
+        self.batches = 0
+        self._buffer: List[Tuple[str, dict]] = []
+        self._oldest_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "BulkWeatherWriter":
+        if self.flush_interval and self.flush_interval > 0:
+            self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        timer_error = None
+        if self._timer:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                timer_error = e
+        if exc_type is not None or timer_error is not None:
+            await self.db.rollback()
+            if exc_type is None:
+                raise timer_error
+            return False
+        try:
+            await self.flush()
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error committing bulk weather insert: {e}")
+            raise
+        for city in {row.city for row in self.saved}:
+            response_cache.invalidate("current", city)
+        WeatherService.publish_observations(self.saved)
+        return False
+
+    async def add(self, payload: dict, key: Optional[str] = None):
+        """Buffer one payload, flushing when the batch is full
+
+        The payload is parsed here, so a malformed one raises before it joins a
+        batch. `key` identifies it in `failed` (its city name by default).
+        """
+        row = WeatherService.parse_weather_payload(payload)
+        self._buffer.append((key or row["city"], row))
+        if self._oldest_at is None:
+            self._oldest_at = time.monotonic()
+        if len(self._buffer) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        """Write the buffered payloads in a single multi-row INSERT"""
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer, self._oldest_at = self._buffer, [], None
+            await self._insert(batch)
+            self.batches += 1
+
+    async def _insert(self, batch: List[Tuple[str, dict]]):
+        try:
+            async with self.db.begin_nested():
+                saved = await WeatherService.bulk_insert_weather_rows(self.db, [row for _, row in batch])
+        except DBAPIError as e:
+            if e.connection_invalidated:
+                raise
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                await self._insert(batch[:middle])
+                await self._insert(batch[middle:])
+                return
+            key = batch[0][0]
+            self.failed[key] = f"rejected by the database: {e.orig or e}"[:500]
+            logger.warning(f"Dropped the weather row for {key}: {e.orig or e}")
+            return
+        self.saved.extend(saved)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._oldest_at is not None and time.monotonic() - self._oldest_at >= self.flush_interval:
+                await self.flush()
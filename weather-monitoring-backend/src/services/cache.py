@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    coalesced: int = 0  # Misses that waited on another request's load instead of querying
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class ResponseCache:
+    """In-process TTL + LRU cache for read endpoints, keyed by (endpoint, city)
+
+    Concurrent misses on the same key share a single load (single-flight), so a
+    cold key under load costs exactly one database query. Write paths call
+    `invalidate` after committing; local invalidations are also handed to every
+    callable in `relays` (cluster_events sends them to the other processes).
+    """
+
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._stale_loads: Set[CacheKey] = set()
+        self.relays: List[Callable[[Optional[str], Optional[str]], None]] = []
+
+    async def get_or_load(self, endpoint: str, city: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for (endpoint, city), calling `loader` once on a miss"""
+        if not self.enabled:
+            return await loader()
+
+        key = (endpoint, city)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return value
+            del self._entries[key]
+            self.stats.expirations += 1
+
+        self.stats.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The request that owned the load went away, load for ourselves
+                return await loader()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats.loads += 1
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged as lost
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # A write landed while we were loading, the value may already be stale.
+            # None means "nothing yet" and is never cached.
+            if value is not None and key not in self._stale_loads:
+                self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            self._stale_loads.discard(key)
+
+    def _store(self, key: CacheKey, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, endpoint: Optional[str] = None, city: Optional[str] = None, remote: bool = False) -> int:
+        """Drop entries matching endpoint and/or city (None matches everything)
+
+        `remote` marks an invalidation relayed from another process, which is not
+        relayed again.
+        """
+
+        def matches(key: CacheKey) -> bool:
+            return (endpoint is None or key[0] == endpoint) and (city is None or key[1] == city)
+
+        stale = [key for key in self._entries if matches(key)]
+        for key in stale:
+            del self._entries[key]
+        self._stale_loads.update(key for key in self._inflight if matches(key))
+        self.stats.invalidations += len(stale)
+        if not remote:
+            for relay in self.relays:
+                relay(endpoint, city)
+        return len(stale)
+
+    def clear(self):
+        self.invalidate()
+
+    def get_stats(self) -> dict:
+        data = asdict(self.stats)
+        lookups = self.stats.hits + self.stats.misses
+        data["hit_ratio"] = round(self.stats.hits / lookups, 4) if lookups else 0.0
+        data["size"] = len(self._entries)
+        data["max_entries"] = self.max_entries
+        data["ttl_seconds"] = self.ttl
+        return data
+
+
+response_cache = ResponseCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    ttl=settings.CACHE_TTL_SECONDS,
+    enabled=settings.CACHE_ENABLED
+)
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from typing import Dict, Optional
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CityIdCache:
+    """OpenWeather city IDs keyed by the name we query with, persisted to a JSON file
+
+    IDs are learnt from /weather responses (every payload carries its city's `id`)
+    and let those cities be fetched through /group, many per request. The file is
+    loaded on first use and rewritten atomically by save() when IDs changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ids: Dict[str, int] = {}
+        self._loaded = False
+        self._dirty = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                self._ids = {str(city): int(city_id) for city, city_id in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable city ID cache {self.path}: {e}")
+
+    def get(self, city: str) -> Optional[int]:
+        self._ensure_loaded()
+        return self._ids.get(city)
+
+    def set(self, city: str, city_id: int):
+        self._ensure_loaded()
+        if self._ids.get(city) != city_id:
+            self._ids[city] = city_id
+            self._dirty = True
+
+    def discard(self, city: str):
+        """Forget an ID OpenWeather no longer answers for; the city is resolved by name again"""
+        self._ensure_loaded()
+        if self._ids.pop(city, None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """Write the cache if it changed since it was loaded or last saved"""
+        if not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".city_ids.")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._ids, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save city ID cache to {self.path}: {e}")
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._ids)
+
+
+city_id_cache = CityIdCache(settings.CITY_ID_CACHE_PATH)
@@ -0,0 +1,40 @@
+from typing import Iterable, List
+from src.config.settings import settings
+
+
+class CityRegistry:
+    """Ordered, case-insensitive set of the cities monitored by the ingestion jobs"""
+
+    def __init__(self, cities: Iterable[str] = ()):
+        self._cities = {}
+        for city in cities:
+            self.add(city)
+
+    @classmethod
+    def from_settings(cls) -> "CityRegistry":
+        """Build the registry from CITY_NAME and MONITORED_CITIES"""
+        return cls([settings.CITY_NAME, *settings.MONITORED_CITIES.split(",")])
+
+    def add(self, city: str) -> bool:
+        """Register a city, returns False if it was already registered"""
+        name = city.strip()
+        if not name or name.casefold() in self._cities:
+            return False
+        self._cities[name.casefold()] = name
+        return True
+
+    def remove(self, city: str) -> bool:
+        """Unregister a city, returns False if it was not registered"""
+        return self._cities.pop(city.strip().casefold(), None) is not None
+
+    def list(self) -> List[str]:
+        return list(self._cities.values())
+
+    def __contains__(self, city: str) -> bool:
+        return city.strip().casefold() in self._cities
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+
+city_registry = CityRegistry.from_settings()
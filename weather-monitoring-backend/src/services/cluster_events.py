@@ -0,0 +1,193 @@
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass, asdict
+from typing import Optional
+import asyncpg
+from sqlalchemy.engine import make_url
+from src.services.alert_service import AlertRuleCache, alert_rule_cache
+from src.services.cache import ResponseCache, response_cache
+from src.services.event_bus import Event, EventBus, event_bus
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Postgres drops NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7999
+
+
+@dataclass
+class ClusterStats:
+    sent: int = 0
+    received: int = 0
+    dropped: int = 0  # Not sent: too large, outbox full or connection lost
+    connects: int = 0
+
+
+class ClusterEvents:
+    """Relays cache invalidations, rule edits and stream events between worker processes
+
+    Every process keeps its own response_cache, alert_rule_cache and event_bus,
+    but only one of them runs each ingest tick. Local changes are sent with
+    pg_notify on CLUSTER_EVENTS_CHANNEL from one dedicated connection (outside
+    the pool), and each process applies what the others sent: invalidations
+    drop the same cache entries, events are published on its bus with
+    remote=True, so its stream clients see them but its ingest dispatcher does
+    not handle them a second time.
+
+    Delivery is best effort. After a lost connection the whole response cache
+    and the rule cache are dropped, since invalidations may have been missed.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus = event_bus,
+        cache: ResponseCache = response_cache,
+        rules: AlertRuleCache = alert_rule_cache,
+        channel: str = None
+    ):
+        self.bus = bus
+        self.cache = cache
+        self.rules = rules
+        self.channel = channel or settings.CLUSTER_EVENTS_CHANNEL
+        self.origin = uuid.uuid4().hex
+        self.stats = ClusterStats()
+        self._outbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._outbox = asyncio.Queue(maxsize=settings.CLUSTER_EVENTS_QUEUE_SIZE)
+        self.bus.relays.append(self._relay_event)
+        self.cache.relays.append(self._relay_invalidation)
+        self.rules.relays.append(self._relay_rules)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self.bus.relays.remove(self._relay_event)
+        self.cache.relays.remove(self._relay_invalidation)
+        self.rules.relays.remove(self._relay_rules)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def wait_ready(self, timeout: float = None):
+        """Wait until the listener is connected"""
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    def _relay_event(self, event: Event):
+        self._send({"kind": "event", "type": event.type, "city": event.city, "data": event.data})
+
+    def _relay_invalidation(self, endpoint: Optional[str], city: Optional[str]):
+        self._send({"kind": "invalidate", "endpoint": endpoint, "city": city})
+
+    def _relay_rules(self):
+        self._send({"kind": "rules"})
+
+    def _send(self, message: dict):
+        payload = json.dumps({"origin": self.origin, **message}, default=str, separators=(",", ":"))
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            self.stats.dropped += 1
+            logger.warning(f"Not relaying a {message['kind']} message of {len(payload)} characters to other workers")
+            return
+        try:
+            self._outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+            if message.get("origin") == self.origin:
+                return
+            self.stats.received += 1
+            kind = message.get("kind")
+            if kind == "invalidate":
+                self.cache.invalidate(message["endpoint"], message["city"], remote=True)
+            elif kind == "event":
+                self.bus.publish(message["type"], message["city"], message["data"], remote=True)
+            elif kind == "rules":
+                self.rules.invalidate(remote=True)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed {channel} notification: {e}")
+
+    async def _connect(self, lost: asyncio.Event) -> asyncpg.Connection:
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        connection = await asyncpg.connect(dsn)
+        connection.add_termination_listener(lambda _: lost.set())
+        await connection.add_listener(self.channel, self._on_notify)
+        return connection
+
+    async def _next_payload(self, lost: asyncio.Event) -> Optional[str]:
+        """The next message to send, or None once the connection is lost or has been idle a while"""
+        getter = asyncio.ensure_future(self._outbox.get())
+        watcher = asyncio.ensure_future(lost.wait())
+        try:
+            await asyncio.wait({getter, watcher}, timeout=settings.CLUSTER_EVENTS_PING_SECONDS,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+            if not getter.done():
+                getter.cancel()
+        return getter.result() if getter.done() and not getter.cancelled() else None
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._connection = await self._connect(lost)
+                if self.stats.connects:
+                    # Invalidations sent while we were away are lost
+                    self.cache.invalidate(remote=True)
+                    self.rules.invalidate(remote=True)
+                    logger.info("Reconnected to cluster events, dropped local caches")
+                self.stats.connects += 1
+                self._ready.set()
+                delay = 1.0
+                while True:
+                    payload = await self._next_payload(lost)
+                    if payload is None:
+                        # Raises on a closed or silently dead connection
+                        await self._connection.execute("SELECT 1")
+                        continue
+                    try:
+                        await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+                    except Exception:
+                        self.stats.dropped += 1
+                        raise
+                    self.stats.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cluster events connection failed, retrying in {delay:.0f}s: {e}")
+            finally:
+                self._ready.clear()
+                if self._connection is not None:
+                    self._connection.terminate()
+                    self._connection = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def get_stats(self) -> dict:
+        data = asdict(self.stats)
+        data["running"] = self.running
+        data["connected"] = self._ready.is_set()
+        data["queued"] = self._outbox.qsize() if self._outbox is not None else 0
+        return data
+
+
+cluster_events = ClusterEvents()
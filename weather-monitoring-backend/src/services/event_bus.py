@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Event types whose pending entries collapse to the latest one per city
+COALESCED_TYPES = {"observation", "summary"}
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str  # observation, summary, alert
+    city: str
+    data: dict
+    published_at: float = field(default_factory=time.monotonic, compare=False)
+    remote: bool = field(default=False, compare=False)  # Published by another process, relayed here
+
+    @cached_property
+    def frame(self) -> str:
+        """SSE wire format, rendered once no matter how many subscribers receive it"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+@dataclass
+class BusStats:
+    published: int = 0
+    delivered: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+
+
+class Subscription:
+    """Bounded buffer of events for one subscriber
+
+    Never blocks the publisher. A pending observation or summary is replaced by a
+    newer one for the same city (coalesced). When the buffer is full the oldest
+    pending event is dropped and counted, so a slow client skips ahead instead of
+    holding memory.
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        cities: Optional[Set[str]],
+        maxsize: int,
+        types: Optional[Set[str]] = None,
+        include_remote: bool = True
+    ):
+        self.cities = cities
+        self.types = types
+        self.include_remote = include_remote
+        self.maxsize = max(1, maxsize)
+        self.dropped = 0
+        self._bus = bus
+        self._pending: "OrderedDict[tuple, Event]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def offer(self, event: Event):
+        if self.types is not None and event.type not in self.types:
+            return
+        if event.remote and not self.include_remote:
+            return
+        key = (event.type, event.city) if event.type in COALESCED_TYPES else (event.type, event.id)
+        if key in self._pending:
+            del self._pending[key]
+            self._bus.stats.coalesced += 1
+        elif len(self._pending) >= self.maxsize:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+            self._bus.stats.dropped += 1
+        self._pending[key] = event
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next pending event, or None if nothing arrived within `timeout` seconds"""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        _, event = self._pending.popitem(last=False)
+        self._bus.stats.delivered += 1
+        return event
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class EventBus:
+    """In-process pub/sub of new observations, summaries and alerts (stream clients, ingest dispatcher)
+
+    Local events are also handed to every callable in `relays` (cluster_events
+    sends them to the other processes, which publish them with remote=True).
+    """
+
+    def __init__(self):
+        self.stats = BusStats()
+        self.relays: List[Callable[[Event], None]] = []
+        self._by_city: Dict[str, Set[Subscription]] = {}
+        self._all_cities: Set[Subscription] = set()
+        self._subscriptions: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(
+        self,
+        cities: Optional[Iterable[str]] = None,
+        maxsize: int = None,
+        types: Optional[Iterable[str]] = None,
+        include_remote: bool = True
+    ) -> Subscription:
+        """Register a subscriber for some cities (all cities when None) and event types (all when None)"""
+        cities = set(cities) if cities else None
+        subscription = Subscription(
+            self, cities, maxsize or settings.STREAM_QUEUE_SIZE, set(types) if types else None, include_remote
+        )
+        self._subscriptions.add(subscription)
+        if cities is None:
+            self._all_cities.add(subscription)
+        else:
+            for city in cities:
+                self._by_city.setdefault(city, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+        if subscription.cities is None:
+            self._all_cities.discard(subscription)
+            return
+        for city in subscription.cities:
+            subscribers = self._by_city.get(city)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_city[city]
+
+    def publish(self, event_type: str, city: str, data: dict, remote: bool = False) -> Event:
+        """Fan an event out to every matching subscriber without awaiting any of them"""
+        event = Event(id=next(self._ids), type=event_type, city=city, data=data, remote=remote)
+        self.stats.published += 1
+        for subscription in self._all_cities:
+            subscription.offer(event)
+        for subscription in self._by_city.get(city, ()):
+            subscription.offer(event)
+        if not remote:
+            for relay in self.relays:
+                relay(event)
+        return event
+
+    def get_stats(self) -> dict:
+        data = asdict(self.stats)
+        data["subscribers"] = self.subscriber_count
+        return data
+
+
+event_bus = EventBus()
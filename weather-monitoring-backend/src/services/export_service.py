@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+from sqlalchemy import Boolean, DateTime, Float, Integer
+from src.database.connection import engine
+from src.models.weather import WeatherData
+from src.services.history_service import HistoryService, json_default
+from src.config.settings import settings
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+class CsvEncoder:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+
+    def header(self) -> bytes:
+        return self._write([self.fields])
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        return self._write(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+
+    def close(self) -> bytes:
+        return b""
+
+    @staticmethod
+    def _write(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        lines = [json.dumps(dict(zip(self.fields, row)), default=json_default) for row in rows]
+        return ("\n".join(lines) + "\n").encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Writes one row group per fetched batch, so only a batch is ever held in memory"""
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        self.schema = pyarrow.schema([(name, self._arrow_type(name)) for name in fields])
+        self._sink = _ChunkSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self.schema, compression="snappy")
+
+    @staticmethod
+    def _arrow_type(name: str):
+        column_type = WeatherData.__table__.c[name].type
+        if isinstance(column_type, DateTime):
+            return pyarrow.timestamp("us", tz="UTC")
+        if isinstance(column_type, Integer):
+            return pyarrow.int64()
+        if isinstance(column_type, Float):
+            return pyarrow.float64()
+        if isinstance(column_type, Boolean):
+            return pyarrow.bool_()
+        return pyarrow.string()
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        columns = list(zip(*rows))
+        table = pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        )
+        self._writer.write_table(table)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+EXPORT_FORMATS = {
+    "csv": CsvEncoder,
+    "ndjson": NdjsonEncoder,
+    "parquet": ParquetEncoder,
+}
+
+
+class ExportService:
+    """Stream weather_data out as CSV, NDJSON or Parquet"""
+
+    @staticmethod
+    def is_available(fmt: str) -> bool:
+        return fmt in EXPORT_FORMATS and (fmt != "parquet" or pyarrow is not None)
+
+    @staticmethod
+    def get_encoder(fmt: str, fields: List[str]):
+        return EXPORT_FORMATS[fmt](fields)
+
+    @staticmethod
+    async def stream_export(
+        encoder,
+        city: Optional[str],
+        fields: List[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> AsyncIterator[bytes]:
+        """Yield the encoded export one fetched batch at a time
+
+        Rows come off a server-side cursor in EXPORT_FETCH_BATCH sized batches
+        and each batch is encoded and sent before the next is fetched, so memory
+        use does not grow with the size of the range.
+        """
+        query = HistoryService.build_query(city, fields, start, end)
+        query = query.execution_options(yield_per=settings.EXPORT_FETCH_BATCH)
+        width = len(fields)
+
+        rows = 0
+        header = encoder.header()
+        if header:
+            yield header
+        # A plain connection: these are Core selects, the ORM loading layer only adds overhead
+        async with engine.connect() as conn:
+            result = await conn.stream(query)
+            async for batch in result.partitions():
+                # build_query appends recorded_at/id for ordering when they were not requested
+                rows += len(batch)
+                yield encoder.encode([row[:width] for row in batch])
+        tail = encoder.close()
+        if tail:
+            yield tail
+        logger.info(f"Exported {rows} rows as {encoder.extension} (city={city or 'all'})")
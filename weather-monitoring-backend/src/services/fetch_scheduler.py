@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.weather import FetchSchedule
+from src.config.settings import settings
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Change between two stored readings that counts as one unit of volatility
+TEMPERATURE_STEP = 1.0  # °C
+HUMIDITY_STEP = 10  # %
+PRESSURE_STEP = 2  # hPa
+
+SHRINK_FACTOR = 0.5  # Volatile: poll twice as often
+GROW_FACTOR = 1.5  # Stable: poll less often
+PUBLISH_MARGIN = timedelta(seconds=60)  # Poll this long after upstream is expected to publish
+MIN_RETRY = timedelta(seconds=60)
+UNCHANGED_RETRY_FRACTION = 0.25  # Polled before upstream published: retry after this share of its period
+
+
+def observed_at(payload: dict) -> Optional[datetime]:
+    """Upstream measurement time of an OpenWeather payload"""
+    if "dt" not in payload:
+        return None
+    return datetime.fromtimestamp(payload["dt"], tz=timezone.utc)
+
+
+def volatility(schedule: FetchSchedule, payload: dict) -> float:
+    """How far a new reading moved from the last stored one, in units of the steps above"""
+    if schedule.last_observed_at is None:
+        return 1.0
+    main = payload["main"]
+    score = max(
+        abs(main["temp"] - schedule.last_temperature) / TEMPERATURE_STEP,
+        abs(main["humidity"] - schedule.last_humidity) / HUMIDITY_STEP,
+        abs(main["pressure"] - schedule.last_pressure) / PRESSURE_STEP,
+    )
+    if payload["weather"][0]["main"] != schedule.last_weather_main:
+        score = max(score, 1.0)
+    return score
+
+
+def upstream_period(previous: Optional[float], gap: float) -> float:
+    """Update the estimated upstream publish period with the gap between two stored dt values
+
+    Polls can skip updates, so gaps are usually multiples of the period and the
+    smallest consistent one is kept; a gap that fits no multiple starts over.
+    """
+    if gap <= 0:
+        return previous
+    if previous is None:
+        return gap
+    ratio = gap / previous
+    if ratio < 1 or abs(ratio - round(ratio)) > 0.2:
+        return gap
+    return previous
+
+
+def next_poll(
+    now: datetime,
+    interval: float,
+    observed: Optional[datetime],
+    period: Optional[float],
+    max_interval: float = None
+) -> datetime:
+    """Latest expected upstream update within `interval`, or the first one after now; plain interval if unknown
+
+    `max_interval` (FETCH_MAX_INTERVAL_SECONDS) bounds both the wait from now and
+    the age the stored reading (observed) may reach before it is polled again.
+    A station publishing less often than that is polled just after its next update.
+    """
+    max_interval = timedelta(seconds=max_interval or settings.FETCH_MAX_INTERVAL_SECONDS)
+    target = now + timedelta(seconds=interval)
+    if observed is not None:
+        target = min(target, observed + max_interval)
+    if observed is None or not period:
+        return min(max(target, now + MIN_RETRY), now + max_interval)
+    steps = math.floor((target - PUBLISH_MARGIN - observed).total_seconds() / period)
+    aligned = observed + timedelta(seconds=steps * period) + PUBLISH_MARGIN
+    if aligned <= now:
+        steps = math.floor((now - PUBLISH_MARGIN - observed).total_seconds() / period) + 1
+        aligned = observed + timedelta(seconds=steps * period) + PUBLISH_MARGIN
+    return min(max(aligned, now + MIN_RETRY), now + max_interval)
+
+
+class FetchScheduler:
+    """Per-city adaptive polling of OpenWeather, driven by how fresh and how volatile its data is
+
+    Each city has its own interval between `FETCH_MIN_INTERVAL_SECONDS` and
+    `FETCH_MAX_INTERVAL_SECONDS` (the freshness target): readings that moved a lot
+    halve it, steady ones grow it. Polls are placed just after the station's next
+    expected update, learnt from the spacing of upstream `dt` values, so each call
+    finds the newest reading. Whatever the interval, a city is polled again before
+    its stored reading is older than the freshness target, and never waits longer
+    than it. A reading whose `dt` has not moved since the last stored one is not
+    stored again and the city is retried shortly. The fetch job runs every minute
+    and only requests cities that are due. Failed calls count as polls.
+    """
+
+    @staticmethod
+    def new_schedule(city: str, now: datetime) -> FetchSchedule:
+        return FetchSchedule(
+            city=city,
+            interval_seconds=settings.FETCH_INITIAL_INTERVAL_SECONDS,
+            next_fetch_at=now,
+            polls=0,
+            unchanged_polls=0,
+            failed_polls=0,
+            created_at=now
+        )
+
+    @staticmethod
+    async def load(db: AsyncSession, cities: List[str], now: datetime) -> Dict[str, FetchSchedule]:
+        """Schedules for `cities`, adding a due-now row for cities seen for the first time"""
+        result = await db.execute(select(FetchSchedule).where(FetchSchedule.city.in_(cities)))
+        schedules = {schedule.city: schedule for schedule in result.scalars()}
+        for city in cities:
+            if city not in schedules:
+                schedules[city] = FetchScheduler.new_schedule(city, now)
+                db.add(schedules[city])
+        return schedules
+
+    @staticmethod
+    def due(schedules: Dict[str, FetchSchedule], now: datetime) -> List[str]:
+        return sorted(city for city, schedule in schedules.items() if schedule.next_fetch_at <= now)
+
+    @staticmethod
+    def is_unchanged(schedule: FetchSchedule, payload: dict) -> bool:
+        """True when upstream has not published a newer reading than the one already stored"""
+        observed = observed_at(payload)
+        return observed is not None and schedule.last_observed_at is not None and observed <= schedule.last_observed_at
+
+    @staticmethod
+    def record(schedule: FetchSchedule, payload: Optional[dict], now: datetime):
+        """Update a city's schedule after a poll; `payload` is None when the fetch failed"""
+        interval = schedule.interval_seconds
+        max_wait = timedelta(seconds=settings.FETCH_MAX_INTERVAL_SECONDS)
+        # Failed calls count too: they cost quota like any other
+        schedule.polls = (schedule.polls or 0) + 1
+        if payload is None:
+            # Retry soon without letting an outage reshape the interval
+            schedule.failed_polls = (schedule.failed_polls or 0) + 1
+            schedule.next_fetch_at = now + min(timedelta(seconds=settings.FETCH_MIN_INTERVAL_SECONDS), max_wait)
+            return
+
+        schedule.last_fetched_at = now
+        if FetchScheduler.is_unchanged(schedule, payload):
+            schedule.unchanged_polls = (schedule.unchanged_polls or 0) + 1
+            period = schedule.upstream_period_seconds or interval
+            retry = now + max(MIN_RETRY, timedelta(seconds=period * UNCHANGED_RETRY_FRACTION))
+            if schedule.upstream_period_seconds and schedule.last_observed_at is not None:
+                # The expected update may still be close, don't sleep past it
+                retry = min(retry, next_poll(now, 0, schedule.last_observed_at, schedule.upstream_period_seconds))
+            schedule.next_fetch_at = min(retry, now + max_wait)
+            return
+
+        score = volatility(schedule, payload)
+        if score >= 1.0:
+            interval *= SHRINK_FACTOR
+        elif score < 0.5:
+            interval *= GROW_FACTOR
+        interval = min(max(interval, settings.FETCH_MIN_INTERVAL_SECONDS), settings.FETCH_MAX_INTERVAL_SECONDS)
+
+        observed = observed_at(payload)
+        if observed is not None and schedule.last_observed_at is not None:
+            schedule.upstream_period_seconds = upstream_period(
+                schedule.upstream_period_seconds, (observed - schedule.last_observed_at).total_seconds()
+            )
+        main = payload["main"]
+        schedule.last_observed_at = observed
+        schedule.last_temperature = main["temp"]
+        schedule.last_humidity = main["humidity"]
+        schedule.last_pressure = main["pressure"]
+        schedule.last_weather_main = payload["weather"][0]["main"]
+        schedule.interval_seconds = interval
+        schedule.next_fetch_at = next_poll(now, interval, observed, schedule.upstream_period_seconds)
+
+    @staticmethod
+    async def get_stats(db: AsyncSession) -> dict:
+        """Calls made and saved against the fixed-cadence baseline, plus per-city state"""
+        now = datetime.now(timezone.utc)
+        schedules = (await db.scalars(select(FetchSchedule).order_by(FetchSchedule.city))).all()
+        baseline = settings.FETCH_BASELINE_INTERVAL_SECONDS
+        baseline_polls = sum(int((now - s.created_at).total_seconds() // baseline) + 1 for s in schedules)
+        polls = sum(s.polls for s in schedules)
+        unchanged = sum(s.unchanged_polls for s in schedules)
+        failed = sum(s.failed_polls for s in schedules)
+        ages = [(now - s.last_observed_at).total_seconds() for s in schedules if s.last_observed_at is not None]
+        return {
+            "cities": len(schedules),
+            "polls": polls,
+            "stored": polls - unchanged - failed,
+            "unchanged_polls": unchanged,
+            "failed_polls": failed,
+            "baseline_polls": baseline_polls,
+            "saved_polls": baseline_polls - polls,
+            "saved_pct": round(100 * (baseline_polls - polls) / baseline_polls, 1) if baseline_polls else None,
+            "max_data_age_seconds": round(max(ages)) if ages else None,
+            "freshness_target_seconds": settings.FETCH_MAX_INTERVAL_SECONDS,
+            "schedule": [
+                {
+                    "city": s.city,
+                    "interval_seconds": round(s.interval_seconds),
+                    "next_fetch_at": s.next_fetch_at,
+                    "last_observed_at": s.last_observed_at,
+                    "polls": s.polls,
+                    "unchanged_polls": s.unchanged_polls,
+                    "failed_polls": s.failed_polls,
+                }
+                for s in schedules
+            ],
+        }
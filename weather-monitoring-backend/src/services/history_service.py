@@ -0,0 +1,151 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from src.database.connection import engine
+from src.models.weather import WeatherData
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns a client may project; id and recorded_at are always selected for the cursor
+HISTORY_FIELDS = [
+    column.name for column in WeatherData.__table__.columns if column.name != "is_deleted"
+]
+
+Cursor = Tuple[datetime, int]
+
+
+class HistoryService:
+    """Keyset-paginated, streamed reads over weather_data"""
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> List[str]:
+        """Validate a comma-separated projection, all fields when empty"""
+        if not fields:
+            return list(HISTORY_FIELDS)
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(HISTORY_FIELDS)}")
+        return list(dict.fromkeys(requested))
+
+    @staticmethod
+    def encode_cursor(recorded_at: datetime, row_id: int) -> str:
+        raw = json.dumps([recorded_at.isoformat(), row_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Cursor:
+        """Inverse of encode_cursor, raises ValueError on anything malformed"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            recorded_at, row_id = json.loads(raw)
+            return datetime.fromisoformat(recorded_at), int(row_id)
+        except Exception as e:
+            raise ValueError("Invalid cursor") from e
+
+    @staticmethod
+    def build_query(
+        city: Optional[str],
+        fields: List[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Cursor] = None,
+        limit: int = None
+    ):
+        """SELECT only the projected columns, ordered by (recorded_at, id) and seeking past `after`
+
+        `city` None reads every city.
+        """
+        names = list(dict.fromkeys([*fields, "recorded_at", "id"]))
+        query = (
+            select(*(WeatherData.__table__.c[name] for name in names))
+            .where(WeatherData.is_deleted == False)
+            .order_by(WeatherData.recorded_at, WeatherData.id)
+        )
+        if city is not None:
+            query = query.where(WeatherData.city == city)
+        if start is not None:
+            query = query.where(WeatherData.recorded_at >= start)
+        if end is not None:
+            query = query.where(WeatherData.recorded_at < end)
+        if after is not None:
+            # The plain recorded_at bound lets the planner use it as an index (and partition) bound
+            query = query.where(
+                WeatherData.recorded_at >= after[0],
+                tuple_(WeatherData.recorded_at, WeatherData.id) > tuple_(*after)
+            )
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    @staticmethod
+    async def stream_history(
+        city: str,
+        fields: List[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Cursor] = None,
+        limit: int = None
+    ) -> AsyncIterator[bytes]:
+        """Yield one page as a JSON document, a batch of rows at a time
+
+        Rows come off a server-side cursor, so memory stays flat however large
+        the page is. The connection is opened here rather than taken from the
+        request because the response body is produced after the endpoint returns.
+        
+        The status line is sent before the first row is read, so a database error
+        cannot turn into a 500 anymore. The document is closed instead with an
+        "error" member, and its "next_cursor" resumes after the last row sent
+        (null when none was and the request had no cursor). Only a document with
+        no "error" is a complete page.
+        """
+        limit = limit or settings.HISTORY_PAGE_SIZE
+        # One extra row tells us whether there is a next page
+        query = HistoryService.build_query(city, fields, start, end, after, limit + 1)
+        query = query.execution_options(yield_per=settings.HISTORY_FETCH_BATCH)
+
+        header = {"city": city, "fields": fields}
+        yield json.dumps(header)[:-1].encode() + b',"data":['
+
+        count = 0
+        last = None
+        has_more = False
+        try:
+            # A plain connection: these are Core selects, the ORM loading layer only adds overhead
+            async with engine.connect() as conn:
+                result = await conn.stream(query)
+                async for batch in result.mappings().partitions():
+                    chunk = []
+                    for row in batch:
+                        if count == limit:
+                            has_more = True
+                            break
+                        chunk.append(json.dumps({name: row[name] for name in fields}, default=json_default))
+                        last = (row["recorded_at"], row["id"])
+                        count += 1
+                    if chunk:
+                        yield (b"," if count > len(chunk) else b"") + ",".join(chunk).encode()
+                    if has_more:
+                        break
+                await result.close()
+        except Exception as e:
+            logger.error(f"History stream for {city} failed after {count} rows: {e}")
+            resume = last or after
+            next_cursor = HistoryService.encode_cursor(*resume) if resume else None
+            error = f"Failed to read history: {e.__class__.__name__}"
+            yield f'],"count":{count},"next_cursor":{json.dumps(next_cursor)},"error":{json.dumps(error)}}}'.encode()
+            return
+
+        next_cursor = HistoryService.encode_cursor(*last) if has_more else None
+        yield f'],"count":{count},"next_cursor":{json.dumps(next_cursor)}}}'.encode()
+
+
+def json_default(value):
+    """json.dumps hook for the datetimes in weather_data rows"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
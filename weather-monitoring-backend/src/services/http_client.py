@@ -0,0 +1,161 @@
+import asyncio
+import importlib.util
+import random
+import time
+from urllib.parse import urlparse
+from dataclasses import dataclass, asdict
+from typing import Optional
+import httpx
+from src.config.settings import settings
+from src.utils.rate_limiter import TokenBucket
+from src.utils.metrics import UPSTREAM_DURATION, UPSTREAM_RESPONSES
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    new_connections: int = 0
+    tls_handshakes: int = 0
+    retries: int = 0
+
+    @property
+    def reused_connections(self) -> int:
+        return max(0, self.requests - self.new_connections)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["reused_connections"] = self.reused_connections
+        data["reuse_ratio"] = round(self.reused_connections / self.requests, 4) if self.requests else 0.0
+        return data
+
+
+_client: Optional[httpx.AsyncClient] = None
+stats = ConnectionStats()
+
+
+async def _trace(event_name: str, info: dict):
+    """httpcore trace hook, fires only when the pool opens a brand new connection"""
+    if event_name == "connection.connect_tcp.complete":
+        stats.new_connections += 1
+    elif event_name == "connection.start_tls.complete":
+        stats.tls_handshakes += 1
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = settings.HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is missing, falling back to HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+    return httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT, limits=limits, http2=http2)
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Create the application-scoped client, called from the FastAPI lifespan"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("HTTP client pool started")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client and release pooled connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("HTTP client pool closed")
+    _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside of the app lifespan (scripts, benchmarks)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Whether an error means the upstream is unhealthy, as opposed to rejecting this request"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), settings.HTTP_RETRY_BACKOFF_MAX)
+    cap = min(settings.HTTP_RETRY_BACKOFF_MAX, settings.HTTP_RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+async def request_with_retry(
+    method: str,
+    url: str,
+    rate_limit: Optional[TokenBucket] = None,
+    prepaid: bool = False,
+    **kwargs
+) -> httpx.Response:
+    """Send a request on the shared client, retrying transport errors and 429/5xx responses
+
+    A token is taken from `rate_limit` (anything with an async acquire()) before
+    every attempt, so retries count against an upstream quota too. With `prepaid`
+    the caller already took the first attempt's token.
+    """
+    client = get_http_client()
+    extensions = {**kwargs.pop("extensions", {}), "trace": _trace}
+    parsed = urlparse(url)
+
+    for attempt in range(settings.HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == settings.HTTP_MAX_RETRIES
+        if rate_limit is not None and not (prepaid and attempt == 0):
+            await rate_limit.acquire()
+        stats.requests += 1
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, extensions=extensions, **kwargs)
+        except httpx.TransportError as e:
+            _observe_upstream(parsed.netloc, parsed.path, e.__class__.__name__, started)
+            if last_attempt:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(f"{method} {url} failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+        else:
+            _observe_upstream(parsed.netloc, parsed.path, str(response.status_code), started)
+            if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                response.raise_for_status()
+                return response
+            delay = _backoff_delay(attempt, response)
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+        stats.retries += 1
+        await asyncio.sleep(delay)
+
+
+def _observe_upstream(host: str, path: str, status: str, started: float):
+    if settings.METRICS_ENABLED:
+        UPSTREAM_DURATION.labels(host, path).observe(time.perf_counter() - started)
+        UPSTREAM_RESPONSES.labels(host, path, status).inc()
+
+
+def get_http_client_stats() -> dict:
+    """Connection reuse counters for the shared client"""
+    return stats.to_dict()
+
+
+def reset_http_client_stats():
+    global stats
+    stats = ConnectionStats()
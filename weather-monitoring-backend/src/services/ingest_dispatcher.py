@@ -0,0 +1,139 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional
+from src.database.connection import AsyncSessionLocal
+from src.services.event_bus import EventBus, Subscription, event_bus
+from src.services.alert_service import AlertService
+from src.services.alert_delivery import AlertDeliveryWorker, build_sinks
+from src.services.weather_service import WeatherService
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DispatchStats:
+    dispatches: int = 0
+    cities: int = 0
+    alerts: int = 0
+    delivered: int = 0
+    errors: int = 0
+    lag: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))  # Seconds from publish to evaluated
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.lag)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) if ordered else None
+        return {
+            "dispatches": self.dispatches,
+            "cities": self.cities,
+            "alerts": self.alerts,
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "lag_p50_ms": pick(0.5),
+            "lag_p95_ms": pick(0.95),
+        }
+
+
+class IngestDispatcher:
+    """Evaluate alerts and refresh dashboard summaries as soon as observations are committed
+
+    Subscribes to "observation" events on the event bus. Pending observations are
+    coalesced per city, so everything saved by one ingestion tick is handled by
+    one alert check and one summary refresh for exactly the cities that changed.
+    New alerts are handed to a background delivery task when sinks are configured,
+    so a slow sink does not hold up the next dispatch. The alert cron
+    job remains as an hourly reconciliation sweep for anything missed here (events
+    dropped from a full queue, errors, other app instances).
+    """
+
+    def __init__(self, bus: EventBus = event_bus):
+        self.bus = bus
+        self.stats = DispatchStats()
+        self._subscription: Optional[Subscription] = None
+        self._task: Optional[asyncio.Task] = None
+        self._delivery: Optional[asyncio.Task] = None
+        self._redeliver = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        # Observations relayed from other processes are dispatched by the process that saved them
+        self._subscription = self.bus.subscribe(
+            types={"observation"}, maxsize=settings.INGEST_DISPATCH_QUEUE_SIZE, include_remote=False
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._delivery):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._delivery = None
+        if self._subscription is not None:
+            self.bus.unsubscribe(self._subscription)
+            self._subscription = None
+
+    async def _run(self):
+        while True:
+            events = [await self._subscription.get()]
+            while len(self._subscription):
+                events.append(await self._subscription.get())
+            cities = sorted({event.city for event in events})
+            try:
+                await self.dispatch(cities)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Ingest dispatch failed for {len(cities)} cities: {e}")
+                continue
+            now = time.monotonic()
+            self.stats.lag.extend(now - event.published_at for event in events)
+
+    async def dispatch(self, cities: List[str]):
+        """Alert check, summary refresh and alert delivery for freshly observed cities"""
+        async with AsyncSessionLocal() as db:
+            alerts = await AlertService.check_weather_alerts(db, cities)
+            await WeatherService.compute_dashboard_summaries(db, cities)
+        self.stats.dispatches += 1
+        self.stats.cities += len(cities)
+        self.stats.alerts += len(alerts)
+        if alerts and settings.ALERT_SINKS:
+            self.schedule_delivery()
+
+    def schedule_delivery(self):
+        """Start a delivery run in the background, or ask the running one for another pass"""
+        if self._delivery is not None and not self._delivery.done():
+            self._redeliver = True
+            return
+        self._delivery = asyncio.create_task(self._deliver())
+
+    async def _deliver(self):
+        while True:
+            self._redeliver = False
+            try:
+                self.stats.delivered += await AlertDeliveryWorker(build_sinks()).run()
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Alert delivery after ingest failed: {e}")
+            if not self._redeliver:
+                return
+
+    def get_stats(self) -> dict:
+        data = self.stats.to_dict()
+        data["running"] = self.running
+        data["delivering"] = self._delivery is not None and not self._delivery.done()
+        data["queued"] = len(self._subscription) if self._subscription is not None else 0
+        return data
+
+
+ingest_dispatcher = IngestDispatcher()
@@ -0,0 +1,198 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.services.weather_service import WeatherService
+from src.services.bulk_writer import BulkWeatherWriter
+from src.services.city_registry import city_registry
+from src.services.city_ids import city_id_cache
+from src.services.fetch_scheduler import FetchScheduler
+from src.utils.rate_limiter import HostRateLimiter
+from src.utils.circuit_breaker import CircuitOpenError
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shared across ticks so the per-host budget holds between overlapping runs
+host_rate_limiter = HostRateLimiter(settings.FETCH_RATE_LIMIT_PER_HOST)
+
+
+@dataclass
+class IngestionResult:
+    total: int = 0
+    payloads: List[dict] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    rejected: List[str] = field(default_factory=list)  # Failed fast: the OpenWeather circuit was open
+    requests: int = 0  # Upstream requests made (one per city, or one per /group batch)
+    saved: int = 0
+    unchanged: int = 0  # Upstream had nothing newer than the stored reading
+    not_due: int = 0  # Cities the adaptive schedule did not poll this tick
+    duration: float = 0.0
+
+
+class IngestionService:
+
+    @staticmethod
+    async def fetch_cities(
+        cities: List[str],
+        concurrency: int = settings.FETCH_CONCURRENCY,
+        city_timeout: float = settings.FETCH_CITY_TIMEOUT,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        on_payload: Optional[Callable[[str, dict], Awaitable[None]]] = None
+    ) -> IngestionResult:
+        """Fetch weather for many cities with bounded concurrency and per-host rate limiting
+
+        Cities whose OpenWeather ID is cached are fetched through /group,
+        `FETCH_GROUP_SIZE` per request; the rest by name, which also learns their ID
+        for the next run. `on_payload(city, payload)` is awaited for each successful
+        fetch as soon as it arrives, so writes can overlap with the remaining fetches.
+        """
+        limiter = rate_limiter or host_rate_limiter
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        url = f"{settings.OPENWEATHER_BASE_URL}/weather"
+        group_url = f"{settings.OPENWEATHER_BASE_URL}/group"
+        result = IngestionResult(total=len(cities))
+        started = time.perf_counter()
+
+        async def deliver(city: str, payload: dict):
+            # A payload that cannot be mapped onto a row fails its city only
+            try:
+                WeatherService.parse_weather_payload(payload)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                result.failed[city] = f"malformed payload: {e.__class__.__name__}: {e}"
+                return
+            result.payloads.append(payload)
+            if on_payload is not None:
+                await on_payload(city, payload)
+
+        async def fetch_one(city: str):
+            async with semaphore:
+                await limiter.acquire(url)
+                result.requests += 1
+                try:
+                    # The timeout covers the fetch, not the waits for a slot and for the API quota
+                    await WeatherService.acquire_quota()
+                    payload = await asyncio.wait_for(
+                        WeatherService.fetch_weather_from_api(city, prepaid=True), timeout=city_timeout
+                    )
+                except asyncio.TimeoutError:
+                    result.failed[city] = f"timed out after {city_timeout}s"
+                    return
+                except CircuitOpenError as e:
+                    result.failed[city] = str(e)
+                    result.rejected.append(city)
+                    return
+                except Exception as e:
+                    result.failed[city] = str(e) or e.__class__.__name__
+                    return
+            if "id" in payload:
+                city_id_cache.set(city, payload["id"])
+            await deliver(city, payload)
+
+        async def fetch_group(batch: List[str]):
+            async with semaphore:
+                await limiter.acquire(group_url)
+                result.requests += 1
+                try:
+                    await WeatherService.acquire_quota()
+                    payloads = await asyncio.wait_for(
+                        WeatherService.fetch_weather_group([city_id_cache.get(city) for city in batch], prepaid=True),
+                        timeout=city_timeout
+                    )
+                except asyncio.TimeoutError:
+                    result.failed.update(dict.fromkeys(batch, f"timed out after {city_timeout}s"))
+                    return
+                except CircuitOpenError as e:
+                    result.failed.update(dict.fromkeys(batch, str(e)))
+                    result.rejected.extend(batch)
+                    return
+                except Exception as e:
+                    result.failed.update(dict.fromkeys(batch, str(e) or e.__class__.__name__))
+                    return
+            by_id = {payload.get("id"): payload for payload in payloads}
+            for city in batch:
+                payload = by_id.get(city_id_cache.get(city))
+                if payload is None:
+                    result.failed[city] = "missing from /group response"
+                    city_id_cache.discard(city)
+                    continue
+                await deliver(city, payload)
+
+        grouped, by_name = [], []
+        for city in cities:
+            known = settings.FETCH_GROUP_ENABLED and city_id_cache.get(city) is not None
+            (grouped if known else by_name).append(city)
+        size = max(1, settings.FETCH_GROUP_SIZE)
+        batches = [grouped[i:i + size] for i in range(0, len(grouped), size)]
+        tasks = [asyncio.ensure_future(fetch_group(batch)) for batch in batches]
+        tasks += [asyncio.ensure_future(fetch_one(city)) for city in by_name]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # on_payload failed beyond one city (e.g. the writer lost its connection): stop the
+            # other fetches before the caller rolls back, so none keeps using its session
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        city_id_cache.save()
+        result.duration = time.perf_counter() - started
+        return result
+
+    @staticmethod
+    async def ingest(db: AsyncSession, cities: Optional[List[str]] = None) -> IngestionResult:
+        """Fetch all monitored cities and persist the successful observations in one transaction"""
+        started = time.perf_counter()
+        async with BulkWeatherWriter(db) as writer:
+            result = await IngestionService.fetch_cities(
+                cities if cities is not None else city_registry.list(),
+                on_payload=lambda city, payload: writer.add(payload, key=city)
+            )
+        result.failed.update(writer.failed)
+        result.saved = len(writer.saved)
+
+        result.duration = time.perf_counter() - started
+        if result.failed:
+            logger.warning(f"Ingestion failed for {len(result.failed)}/{result.total} cities: {result.failed}")
+        return result
+
+    @staticmethod
+    async def ingest_due(db: AsyncSession, now: Optional[datetime] = None) -> IngestionResult:
+        """Fetch only the cities the adaptive schedule says are due, storing readings upstream has updated"""
+        started = time.perf_counter()
+        now = now or datetime.now(timezone.utc)
+        schedules = await FetchScheduler.load(db, city_registry.list(), now)
+        due = FetchScheduler.due(schedules, now)
+        fetched: Dict[str, dict] = {}
+        unchanged = 0
+
+        async def on_payload(city: str, payload: dict):
+            nonlocal unchanged
+            fetched[city] = payload
+            if FetchScheduler.is_unchanged(schedules[city], payload):
+                unchanged += 1
+                return
+            await writer.add(payload, key=city)
+
+        # Schedule updates ride in the writer's transaction, so they commit with the readings
+        async with BulkWeatherWriter(db) as writer:
+            result = await IngestionService.fetch_cities(due, on_payload=on_payload) if due else IngestionResult()
+            await writer.flush()
+            result.failed.update(writer.failed)
+            rejected = set(result.rejected)
+            for city in due:
+                # Cities the circuit breaker turned away stay due for the next tick; a row the
+                # database refused counts as a failed poll, not as the city's latest reading
+                if city not in rejected:
+                    FetchScheduler.record(schedules[city], None if city in writer.failed else fetched.get(city), now)
+        result.saved = len(writer.saved)
+        result.unchanged = unchanged
+        result.not_due = len(schedules) - len(due)
+
+        result.duration = time.perf_counter() - started
+        if result.failed:
+            logger.warning(f"Ingestion failed for {len(result.failed)}/{result.total} cities: {result.failed}")
+        return result
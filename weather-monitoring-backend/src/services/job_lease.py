@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, List
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.connection import AsyncSessionLocal
+from src.models.weather import JobLease
+from src.utils.metrics import JOB_SKIPPED
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in job_leases
+HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+MAX_RENEW_INTERVAL = timedelta(seconds=60)
+
+
+class JobLeaseService:
+    """Time-limited, database-held leases that let one process run a job tick
+
+    Expiry is compared with the database clock, so worker clocks need not agree.
+    A lease is kept until it expires rather than released when the job finishes:
+    the other workers fire the same tick a moment later and must still find it
+    taken. The TTL therefore has to be shorter than the job's interval. If the
+    holder dies, its lease lapses and the next tick runs elsewhere.
+    """
+
+    @staticmethod
+    async def acquire(db: AsyncSession, job_id: str, ttl: timedelta, holder: str = HOLDER) -> bool:
+        """Take the lease if it is free or expired"""
+        stmt = insert(JobLease).values(
+            job_id=job_id, holder=holder, acquired_at=func.now(), expires_at=func.now() + ttl
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["job_id"],
+            set_={
+                "holder": stmt.excluded.holder,
+                "acquired_at": stmt.excluded.acquired_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=JobLease.expires_at <= func.now()
+        ).returning(JobLease.holder)
+        acquired = (await db.execute(stmt)).scalar_one_or_none() is not None
+        await db.commit()
+        return acquired
+
+    @staticmethod
+    async def renew(db: AsyncSession, job_id: str, extension: timedelta, holder: str = HOLDER) -> bool:
+        """Keep a lease this process holds valid for at least `extension` more; False if it was lost"""
+        result = await db.execute(
+            update(JobLease)
+            .where(JobLease.job_id == job_id, JobLease.holder == holder)
+            .values(expires_at=func.greatest(JobLease.expires_at, func.now() + extension))
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    async def list_leases(db: AsyncSession) -> List[dict]:
+        result = await db.execute(
+            select(JobLease, (JobLease.expires_at > func.now()).label("active")).order_by(JobLease.job_id)
+        )
+        return [
+            {
+                "job_id": lease.job_id,
+                "holder": lease.holder,
+                "held_by_this_worker": lease.holder == HOLDER,
+                "active": active,
+                "acquired_at": lease.acquired_at,
+                "expires_at": lease.expires_at,
+            }
+            for lease, active in result
+        ]
+
+
+def leased(job_id: str, ttl: timedelta):
+    """Run the decorated job only in the process that wins `job_id`'s lease for this tick
+
+    Returns JOB_SKIPPED when another worker holds the lease. While the job runs
+    the lease is extended in short steps (at most a minute), so a long run is not
+    taken over halfway and the lease still lapses soon after the run ends.
+    """
+    def decorator(job: Callable[..., Awaitable]):
+        @functools.wraps(job)
+        async def wrapper(*args, **kwargs):
+            if not settings.JOB_LEASES_ENABLED:
+                return await job(*args, **kwargs)
+            try:
+                async with AsyncSessionLocal() as db:
+                    acquired = await JobLeaseService.acquire(db, job_id, ttl)
+            except Exception as e:
+                logger.error(f"Could not acquire lease for {job_id}, skipping this run: {e}")
+                return JOB_SKIPPED
+            if not acquired:
+                logger.info(f"⏭️ {job_id} is running on another worker, skipping")
+                return JOB_SKIPPED
+
+            renewer = asyncio.create_task(_renew_periodically(job_id, ttl))
+            try:
+                return await job(*args, **kwargs)
+            finally:
+                renewer.cancel()
+        return wrapper
+    return decorator
+
+
+async def _renew_periodically(job_id: str, ttl: timedelta):
+    interval = min(ttl / 2, MAX_RENEW_INTERVAL)
+    while True:
+        await asyncio.sleep(interval.total_seconds())
+        try:
+            async with AsyncSessionLocal() as db:
+                if not await JobLeaseService.renew(db, job_id, interval * 2):
+                    logger.warning(f"Lost the lease for {job_id} while it was running")
+                    return
+        except Exception as e:
+            logger.warning(f"Could not renew lease for {job_id}: {e}")
@@ -0,0 +1,169 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "weather_data"
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+INTERVALS = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+@dataclass
+class Partition:
+    name: str
+    lower: datetime
+    upper: datetime
+    estimated_rows: int
+
+
+class PartitionService:
+    """Maintains the time partitions of weather_data (see alembic revision 0003)"""
+
+    _is_partitioned: Optional[bool] = None
+
+    @staticmethod
+    async def is_partitioned(db: AsyncSession) -> bool:
+        """Whether weather_data is a partitioned table (cached per process)"""
+        if PartitionService._is_partitioned is None:
+            result = await db.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+            ), {"table": PARENT_TABLE})
+            PartitionService._is_partitioned = bool(result.scalar())
+        return PartitionService._is_partitioned
+
+    @staticmethod
+    def partition_start(moment: datetime, interval: str = None) -> datetime:
+        """Lower bound (UTC midnight, Monday for weekly) of the partition holding `moment`"""
+        interval = interval or settings.WEATHER_DATA_PARTITION_INTERVAL
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported partition interval: {interval}")
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        start = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if interval == "week":
+            start -= timedelta(days=start.weekday())
+        return start
+
+    @staticmethod
+    async def list_partitions(db: AsyncSession) -> List[Partition]:
+        """Ranged partitions currently attached to weather_data, oldest first (DEFAULT excluded)"""
+        result = await db.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound, c.reltuples "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {"table": PARENT_TABLE})
+
+        partitions = []
+        for name, bound, reltuples in result:
+            match = BOUND_PATTERN.search(bound)
+            if not match:
+                continue
+            partitions.append(Partition(
+                name=name,
+                lower=datetime.fromisoformat(match.group(1)),
+                upper=datetime.fromisoformat(match.group(2)),
+                # reltuples is -1 until the partition has been analyzed
+                estimated_rows=max(0, int(reltuples))
+            ))
+        return sorted(partitions, key=lambda p: p.lower)
+
+    @staticmethod
+    async def ensure_partitions(db: AsyncSession, ahead: int = None, interval: str = None) -> List[str]:
+        """Create the current partition and `ahead` future ones, skipping ranges already covered"""
+        ahead = settings.WEATHER_DATA_PARTITIONS_AHEAD if ahead is None else ahead
+        interval = interval or settings.WEATHER_DATA_PARTITION_INTERVAL
+        if not await PartitionService.is_partitioned(db):
+            return []
+
+        existing = await PartitionService.list_partitions(db)
+        step = INTERVALS[interval]
+        lower = PartitionService.partition_start(datetime.now(timezone.utc), interval)
+        created = []
+
+        for _ in range(ahead + 1):
+            upper = lower + step
+            overlaps = any(p.lower < upper and lower < p.upper for p in existing)
+            if not overlaps:
+                name = f"{PARENT_TABLE}_p{lower:%Y%m%d}"
+                try:
+                    # Savepoint so a race with another worker only skips this partition
+                    async with db.begin_nested():
+                        await db.execute(text(
+                            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+                            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                        ))
+                    created.append(name)
+                except Exception as e:
+                    logger.warning(f"Could not create partition {name}: {e}")
+            lower = upper
+
+        await db.commit()
+        if created:
+            logger.info(f"Created {len(created)} weather_data partitions: {', '.join(created)}")
+        return created
+
+    @staticmethod
+    async def drop_expired_partitions(db: AsyncSession, cutoff: datetime, drop: bool = True) -> int:
+        """Detach every partition that ends before `cutoff` and drop it unless `drop` is False
+
+        Partitions detached without `drop` stay behind as standalone archive tables
+        (weather_data_pYYYYMMDD) until they are dropped by hand. Cost is one catalog
+        operation per partition, whatever its size: rows are not counted, the
+        planner's reltuples estimate is used instead (the partition is ANALYZEd
+        first if it never was, which samples rather than scans). DETACH and DROP take an
+        ACCESS EXCLUSIVE lock on weather_data itself (DETACH ... CONCURRENTLY is not
+        allowed while it has a DEFAULT partition), so reads and writes of every
+        partition wait for it. Each partition is therefore removed in its own short
+        transaction, committed here (call it with no pending changes), and waits at
+        most WEATHER_DATA_PARTITION_LOCK_TIMEOUT for the lock: a partition it cannot
+        lock in time is left for the next run. Returns the estimated number of rows
+        removed from weather_data.
+        """
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=timezone.utc)
+
+        lock_timeout_ms = max(1, int(settings.WEATHER_DATA_PARTITION_LOCK_TIMEOUT * 1000))
+        removed, partitions = 0, 0
+        for partition in await PartitionService.list_partitions(db):
+            if partition.upper > cutoff:
+                break
+            try:
+                await db.execute(text(f"SET LOCAL lock_timeout = {lock_timeout_ms}"))
+                rows = await PartitionService._estimate_rows(db, partition.name)
+                await db.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{partition.name}"'))
+                if drop:
+                    await db.execute(text(f'DROP TABLE "{partition.name}"'))
+                await db.commit()
+            except DBAPIError as e:
+                await db.rollback()
+                if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                    raise
+                logger.warning(f"Partition {partition.name} is busy, leaving it for the next cleanup")
+                continue
+            removed += rows
+            partitions += 1
+            logger.info(f"{'Dropped' if drop else 'Archived'} partition {partition.name} (~{rows} rows)")
+        if partitions:
+            logger.info(f"{'Dropped' if drop else 'Archived'} {partitions} weather_data partitions (~{removed} rows)")
+        return removed
+
+    @staticmethod
+    async def _estimate_rows(db: AsyncSession, name: str) -> int:
+        """reltuples of a partition, analyzing it first if it has never been analyzed"""
+        query = text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)")
+        reltuples = (await db.execute(query, {"name": f'"{name}"'})).scalar()
+        if reltuples is not None and reltuples < 0:
+            await db.execute(text(f'ANALYZE "{name}"'))
+            reltuples = (await db.execute(query, {"name": f'"{name}"'})).scalar()
+        return max(0, int(reltuples or 0))
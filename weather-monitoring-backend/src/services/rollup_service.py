@@ -0,0 +1,130 @@
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.weather import WeatherData, WeatherHourly, WeatherDaily, ROLLUP_METRICS
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MODELS = {"hourly": WeatherHourly, "daily": WeatherDaily}
+
+
+class RollupService:
+    """Maintain and read the weather_hourly / weather_daily rollups
+
+    Rollups only ever add observations: soft deletes, hard deletes and dropped
+    partitions do not subtract from them, so they outlive the raw rows.
+    """
+
+    @staticmethod
+    def bucket_start(moment: datetime, granularity: str) -> datetime:
+        """Start of the UTC hour or day containing `moment`"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        if granularity == "daily":
+            return moment.replace(hour=0)
+        if granularity == "hourly":
+            return moment
+        raise ValueError(f"Unsupported rollup granularity: {granularity}")
+
+    @staticmethod
+    def aggregate(rows: Iterable[WeatherData], granularity: str) -> List[dict]:
+        """Fold observations into one partial aggregate per (city, bucket), sorted by key"""
+        partials: Dict[Tuple[str, datetime], dict] = {}
+        for row in rows:
+            key = (row.city, RollupService.bucket_start(row.recorded_at, granularity))
+            partial = partials.get(key)
+            if partial is None:
+                partial = {"city": key[0], "bucket": key[1], "observations": 0}
+                for metric in ROLLUP_METRICS:
+                    partial.update({
+                        f"{metric}_count": 0, f"{metric}_sum": 0.0, f"{metric}_sumsq": 0.0,
+                        f"{metric}_min": None, f"{metric}_max": None
+                    })
+                partials[key] = partial
+            partial["observations"] += 1
+            for metric in ROLLUP_METRICS:
+                value = getattr(row, metric)
+                if value is None:
+                    continue
+                partial[f"{metric}_count"] += 1
+                partial[f"{metric}_sum"] += value
+                partial[f"{metric}_sumsq"] += value * value
+                current_min = partial[f"{metric}_min"]
+                current_max = partial[f"{metric}_max"]
+                partial[f"{metric}_min"] = value if current_min is None else min(current_min, value)
+                partial[f"{metric}_max"] = value if current_max is None else max(current_max, value)
+        # A fixed key order keeps concurrent upserts locking rows in the same order
+        return [partials[key] for key in sorted(partials)]
+
+    @staticmethod
+    async def apply(db: AsyncSession, rows: List[WeatherData]):
+        """Fold newly saved observations into both rollups (caller commits)
+
+        Runs in the caller's transaction, so the rollups and the raw rows commit
+        or roll back together.
+        """
+        rows = [row for row in rows if row.city is not None]
+        if not rows:
+            return
+        for granularity, model in ROLLUP_MODELS.items():
+            values = RollupService.aggregate(rows, granularity)
+            stmt = insert(model).values(values)
+            table, excluded = model.__table__.c, stmt.excluded
+            merge = {"observations": table.observations + excluded.observations, "updated_at": func.now()}
+            for metric in ROLLUP_METRICS:
+                for part in ("count", "sum", "sumsq"):
+                    column = f"{metric}_{part}"
+                    merge[column] = table[column] + excluded[column]
+                # least/greatest ignore NULLs
+                merge[f"{metric}_min"] = func.least(table[f"{metric}_min"], excluded[f"{metric}_min"])
+                merge[f"{metric}_max"] = func.greatest(table[f"{metric}_max"], excluded[f"{metric}_max"])
+            await db.execute(stmt.on_conflict_do_update(index_elements=["city", "bucket"], set_=merge))
+
+    @staticmethod
+    async def get_rollups(
+        db: AsyncSession,
+        city: Optional[str],
+        granularity: str = "hourly",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List:
+        """Rollup rows in [start, end), oldest first (all cities when city is None)"""
+        model = ROLLUP_MODELS[granularity]
+        query = select(model).order_by(model.city, model.bucket)
+        if city is not None:
+            query = query.where(model.city == city)
+        if start is not None:
+            query = query.where(model.bucket >= RollupService.bucket_start(start, granularity))
+        if end is not None:
+            query = query.where(model.bucket < end)
+        result = await db.scalars(query)
+        return result.all()
+
+    @staticmethod
+    def metric_stats(row, metric: str) -> dict:
+        """count / mean / min / max / population stddev of one metric in a rollup row"""
+        count = getattr(row, f"{metric}_count")
+        if not count:
+            return {"count": 0, "mean": None, "min": None, "max": None, "stddev": None}
+        mean = getattr(row, f"{metric}_sum") / count
+        # Clamp the rounding error of sumsq / n - mean² for near-constant series
+        variance = max(getattr(row, f"{metric}_sumsq") / count - mean * mean, 0.0)
+        return {
+            "count": count,
+            "mean": round(mean, 2),
+            "min": getattr(row, f"{metric}_min"),
+            "max": getattr(row, f"{metric}_max"),
+            "stddev": round(math.sqrt(variance), 2),
+        }
+
+    @staticmethod
+    def to_response(row) -> dict:
+        data = {"city": row.city, "bucket": row.bucket, "observations": row.observations}
+        for metric in ROLLUP_METRICS:
+            data[metric] = RollupService.metric_stats(row, metric)
+        return data
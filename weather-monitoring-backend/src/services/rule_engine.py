@@ -0,0 +1,256 @@
+"""Declarative alert rules compiled into Python closures
+
+A condition is JSON:
+
+    {"metric": "temperature", "op": ">", "value": 35}
+    {"metric": "weather_main", "op": "in", "value": ["Thunderstorm", "Tornado"]}
+    {"rate": "pressure", "op": "<", "value": -3}       change per hour since the previous reading
+    {"all": [cond, ...]}   {"any": [cond, ...]}   {"not": cond}
+
+The comparison that made a condition hold supplies the alert's actual/threshold
+values: the branch that matched in an "any", the first numeric comparison in an
+"all". Text comparisons and "not" have no numeric reading to report (None).
+A rule may also have a clear condition (hysteresis): once it has fired it stays
+active until the clear condition holds, instead of until the trigger stops holding.
+"""
+import operator
+import string
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Observation = Dict[str, Any]
+Predicate = Callable[[Observation], bool]
+ValueGetter = Callable[[Observation], Optional[float]]
+Reading = Tuple[Optional[float], Optional[float]]  # (actual, threshold) of the comparison that held
+# The Reading behind a condition that holds, None when it does not hold
+Witness = Callable[[Observation], Optional[Reading]]
+
+NO_READING: Reading = (None, None)
+
+NUMERIC_METRICS = {
+    "temperature", "feels_like", "temp_min", "temp_max", "humidity", "pressure", "wind_speed", "clouds"
+}
+TEXT_METRICS = {"weather_main", "weather_description"}
+OBSERVATION_FIELDS = NUMERIC_METRICS | TEXT_METRICS | {"id", "city", "recorded_at"}
+MESSAGE_FIELDS = OBSERVATION_FIELDS | {"actual", "threshold", "alert_type"}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda actual, expected: actual in expected,
+    "not_in": lambda actual, expected: actual not in expected,
+}
+
+
+class RuleError(ValueError):
+    """Raised for a condition or message template that does not compile"""
+
+
+@dataclass
+class _Compiled:
+    predicate: Predicate
+    witness: Witness
+    rate_metrics: Set[str]
+
+
+def _rate_getter(metric: str) -> ValueGetter:
+    previous_key = f"prev_{metric}"
+
+    def rate(observation: Observation) -> Optional[float]:
+        current, previous = observation[metric], observation.get(previous_key)
+        now, before = observation["recorded_at"], observation.get("prev_recorded_at")
+        if current is None or previous is None or before is None:
+            return None
+        hours = (now - before).total_seconds() / 3600
+        return (current - previous) / hours if hours > 0 else None
+
+    return rate
+
+
+def _compile_comparison(node: dict) -> _Compiled:
+    op = node.get("op")
+    if op not in OPERATORS:
+        raise RuleError(f"Unknown operator {op!r}, expected one of {sorted(OPERATORS)}")
+    if "value" not in node:
+        raise RuleError("A comparison needs a 'value'")
+    expected = node["value"]
+
+    if "rate" in node:
+        metric = node["rate"]
+        if metric not in NUMERIC_METRICS:
+            raise RuleError(f"Rate of change needs a numeric metric, got {metric!r}")
+        getter = _rate_getter(metric)
+        rate_metrics = {metric}
+    else:
+        metric = node.get("metric")
+        if metric not in NUMERIC_METRICS | TEXT_METRICS:
+            raise RuleError(f"Unknown metric {metric!r}")
+        getter = operator.itemgetter(metric)
+        rate_metrics = set()
+
+    if op in ("in", "not_in"):
+        if not isinstance(expected, list):
+            raise RuleError(f"'{op}' needs a list value")
+        expected = frozenset(expected)
+    elif metric in NUMERIC_METRICS and (isinstance(expected, bool) or not isinstance(expected, (int, float))):
+        raise RuleError(f"{metric} compares against a number, got {expected!r}")
+
+    compare = OPERATORS[op]
+
+    def predicate(observation: Observation) -> bool:
+        actual = getter(observation)
+        return actual is not None and compare(actual, expected)
+
+    if metric in NUMERIC_METRICS:
+        threshold = float(expected) if op not in ("in", "not_in") else None
+
+        def witness(observation: Observation) -> Optional[Reading]:
+            actual = getter(observation)
+            if actual is None or not compare(actual, expected):
+                return None
+            return float(actual), threshold
+    else:
+        # Text conditions have no numeric reading to report
+        def witness(observation: Observation) -> Optional[Reading]:
+            return NO_READING if predicate(observation) else None
+    return _Compiled(predicate, witness, rate_metrics)
+
+
+def _compile(node: Any) -> _Compiled:
+    if not isinstance(node, dict):
+        raise RuleError(f"A condition must be an object, got {node!r}")
+    for combinator in ("all", "any"):
+        if combinator in node:
+            children = node[combinator]
+            if not isinstance(children, list) or not children:
+                raise RuleError(f"'{combinator}' needs a non-empty list of conditions")
+            parts = [_compile(child) for child in children]
+            predicates = tuple(part.predicate for part in parts)
+            witnesses = tuple(part.witness for part in parts)
+            if combinator == "all":
+                predicate = lambda observation: all(p(observation) for p in predicates)
+
+                def witness(observation: Observation) -> Optional[Reading]:
+                    readings = []
+                    for w in witnesses:
+                        reading = w(observation)
+                        if reading is None:
+                            return None
+                        readings.append(reading)
+                    return next((r for r in readings if r[0] is not None), NO_READING)
+            else:
+                predicate = lambda observation: any(p(observation) for p in predicates)
+
+                def witness(observation: Observation) -> Optional[Reading]:
+                    return next((r for r in (w(observation) for w in witnesses) if r is not None), None)
+            return _Compiled(predicate, witness, set().union(*(part.rate_metrics for part in parts)))
+    if "not" in node:
+        inner = _compile(node["not"])
+        predicate = lambda observation: not inner.predicate(observation)
+        return _Compiled(
+            predicate, lambda observation: NO_READING if predicate(observation) else None, inner.rate_metrics
+        )
+    return _compile_comparison(node)
+
+
+def _check_template(template: str):
+    try:
+        fields = {name for _, name, _, _ in string.Formatter().parse(template) if name is not None}
+    except ValueError as e:
+        raise RuleError(f"Invalid message template: {e}") from e
+    unknown = fields - MESSAGE_FIELDS
+    if unknown:
+        raise RuleError(f"Unknown message fields: {', '.join(sorted(unknown))}")
+
+
+@dataclass
+class CompiledRule:
+    id: Optional[int]
+    alert_type: str
+    city: Optional[str]
+    predicate: Predicate
+    witness: Witness
+    rate_metrics: Set[str]
+    message: str
+    clear: Optional[Predicate] = None  # None clears as soon as the trigger stops holding
+    cooldown: Optional[timedelta] = None  # None uses ALERT_COOLDOWN_MINUTES
+
+    @classmethod
+    def compile(cls, alert_type: str, condition: dict, message: Optional[str] = None,
+                city: Optional[str] = None, rule_id: Optional[int] = None,
+                clear_condition: Optional[dict] = None, cooldown_minutes: Optional[int] = None) -> "CompiledRule":
+        compiled = _compile(condition)
+        message = message or "{alert_type} alert for {city}! Current: {actual}, Threshold: {threshold}"
+        _check_template(message)
+        rate_metrics = set(compiled.rate_metrics)
+        clear = None
+        if clear_condition is not None:
+            compiled_clear = _compile(clear_condition)
+            clear = compiled_clear.predicate
+            rate_metrics |= compiled_clear.rate_metrics
+        if cooldown_minutes is not None and cooldown_minutes < 0:
+            raise RuleError("cooldown_minutes cannot be negative")
+        cooldown = timedelta(minutes=cooldown_minutes) if cooldown_minutes is not None else None
+        return cls(rule_id, alert_type, city, compiled.predicate, compiled.witness, rate_metrics, message, clear, cooldown)
+
+    def clears(self, observation: Observation) -> bool:
+        """True when an active alert should reset"""
+        if self.clear is not None:
+            return self.clear(observation)
+        return not self.predicate(observation)
+
+    def evaluate(self, observation: Observation) -> Optional[dict]:
+        """WeatherAlert column values when the rule fires, else None"""
+        reading = self.witness(observation)
+        if reading is None:
+            return None
+        actual, threshold = reading
+        actual = round(actual, 2) if actual is not None else None
+        try:
+            message = self.message.format_map(
+                {**observation, "actual": actual, "threshold": threshold, "alert_type": self.alert_type}
+            )
+        except (TypeError, ValueError):
+            # e.g. a format spec applied to a missing (None) reading
+            message = f"{self.alert_type} alert for {observation['city']}"
+        return {
+            "city": observation["city"],
+            "alert_type": self.alert_type,
+            "message": message,
+            "threshold_value": threshold,
+            "actual_value": actual,
+            "is_sent": False,
+        }
+
+
+class RuleSet:
+    """Compiled rules indexed for evaluation; a city-specific rule replaces the global rule of the same type"""
+
+    def __init__(self, rules: Iterable[CompiledRule] = ()):
+        self.global_rules: Dict[str, CompiledRule] = {}
+        self.city_rules: Dict[str, Dict[str, CompiledRule]] = {}
+        for rule in rules:
+            if rule.city is None:
+                self.global_rules[rule.alert_type] = rule
+            else:
+                self.city_rules.setdefault(rule.city, {})[rule.alert_type] = rule
+        self.rate_metrics = set().union(
+            *(rule.rate_metrics for rule in self.global_rules.values()),
+            *(rule.rate_metrics for rules in self.city_rules.values() for rule in rules.values())
+        )
+        self._resolved: Dict[str, List[CompiledRule]] = {}
+
+    def rules_for(self, city: str) -> List[CompiledRule]:
+        rules = self._resolved.get(city)
+        if rules is None:
+            rules = list({**self.global_rules, **self.city_rules.get(city, {})}.values())
+            self._resolved[city] = rules
+        return rules
+
+    def __len__(self) -> int:
+        return len(self.global_rules) + sum(len(rules) for rules in self.city_rules.values())
@@ -0,0 +1,50 @@
+import asyncio
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from src.database.connection import AsyncSessionLocal
+from src.models.weather import RateLimit
+from src.utils.rate_limiter import TokenBucket
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SharedRateLimit:
+    """Paces calls to `rate` per second across every worker process through a rate_limits row
+
+    Each acquire reserves the next free slot with one atomic upsert (the row holds
+    when the next call may go, in database time) and then sleeps until its slot,
+    so no lock is held while waiting. Slots are spaced 1 / rate apart, like a
+    token bucket with a burst of one. A reserved slot is spent even when the
+    caller gives up. While the database cannot be reached, calls are paced by a
+    per-process bucket instead.
+    """
+
+    def __init__(self, name: str, rate: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.name = name
+        self.rate = rate
+        self.fallback = TokenBucket(rate, capacity=1)
+
+    def _reserve_query(self):
+        now = func.clock_timestamp()
+        spacing = func.make_interval(0, 0, 0, 0, 0, 0, 1 / self.rate)
+        return insert(RateLimit).values(name=self.name, next_slot_at=now + spacing).on_conflict_do_update(
+            index_elements=[RateLimit.name],
+            set_={"next_slot_at": func.greatest(RateLimit.next_slot_at, now) + spacing}
+        ).returning(func.extract("epoch", RateLimit.next_slot_at - spacing - now))
+
+    async def acquire(self):
+        """Wait for this caller's slot"""
+        try:
+            async with AsyncSessionLocal() as db:
+                delay = await db.scalar(self._reserve_query())
+                await db.commit()
+        except (DBAPIError, OSError) as e:
+            logger.warning(f"Rate limit {self.name} unavailable, pacing this worker on its own: {e}")
+            await self.fallback.acquire()
+            return
+        if delay > 0:
+            await asyncio.sleep(float(delay))
@@ -1,18 +1,68 @@
+import asyncio
 import httpx
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, and_, func
-from src.models.weather import WeatherData, DashboardSummary
+from sqlalchemy import select, delete, insert, update, and_, tuple_
+from typing import Callable, List, Optional
+from src.models.weather import WeatherData, DashboardSummary, WeatherHourly
+from src.services.http_client import is_upstream_failure, request_with_retry
+from src.services.partition_service import PartitionService
+from src.services.rollup_service import RollupService
+from src.services.cache import response_cache
+from src.services.event_bus import event_bus
+from src.schemas.weather import WeatherDataResponse, DashboardSummaryResponse
+from src.services.shared_rate_limit import SharedRateLimit
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from src.utils.metrics import UPSTREAM_CIRCUIT_STATE
 from src.config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Hourly rollups the dashboard summary is computed from
+SUMMARY_WINDOW = timedelta(hours=24)
+
+# Global OpenWeather quota: one call every 60 / (plan - 1) seconds keeps any 60 second window
+# within the plan's calls per minute, across all callers of every worker process
+openweather_quota = SharedRateLimit("openweather", rate=max(1, settings.OPENWEATHER_CALLS_PER_MINUTE - 1) / 60)
+
+# Fails OpenWeather calls fast during an outage instead of waiting out timeouts (per process)
+openweather_breaker = CircuitBreaker(
+    "openweather",
+    failure_threshold=settings.OPENWEATHER_BREAKER_FAILURES,
+    reset_timeout=settings.OPENWEATHER_BREAKER_RESET_SECONDS,
+    is_failure=is_upstream_failure,
+    on_state_change=lambda state: UPSTREAM_CIRCUIT_STATE.set({CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[state])
+)
+UPSTREAM_CIRCUIT_STATE.set(0)
+
+# Share of FETCH_CITY_TIMEOUT an OpenWeather call may take, so it fails inside the breaker first
+UPSTREAM_DEADLINE_SHARE = 0.9
+
+
+def upstream_deadline() -> float:
+    """Seconds one OpenWeather call may take, retries included
+
+    Enforced inside the circuit breaker: a hanging upstream then ends in a
+    TimeoutError the breaker counts as a failure, instead of in the caller's
+    FETCH_CITY_TIMEOUT cancelling the call, which gives the breaker no verdict.
+    """
+    attempts = settings.HTTP_MAX_RETRIES + 1
+    return min(settings.HTTP_TIMEOUT * attempts, settings.FETCH_CITY_TIMEOUT * UPSTREAM_DEADLINE_SHARE)
+
+
 class WeatherService:
     
     @staticmethod
-    async def fetch_weather_from_api(city: str = settings.CITY_NAME) -> dict:
-        """Fetch weather data from OpenWeatherMap API"""
+    async def acquire_quota():
+        """Wait for an OpenWeather call slot; raises CircuitOpenError instead while the circuit is open"""
+        if openweather_breaker.is_open:
+            raise CircuitOpenError(openweather_breaker.name, openweather_breaker.retry_after)
+        await openweather_quota.acquire()
+    
+    @staticmethod
+    async def fetch_weather_from_api(city: str = settings.CITY_NAME, prepaid: bool = False) -> dict:
+        """Fetch weather data from OpenWeatherMap API (`prepaid`: acquire_quota was already awaited)"""
         try:
             url = f"{settings.OPENWEATHER_BASE_URL}/weather"
             params = {
@@ -21,42 +71,99 @@ class WeatherService:
                 "units": "metric"  # Get temperature in Celsius
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
+            async with openweather_breaker:
+                response = await asyncio.wait_for(
+                    request_with_retry("GET", url, rate_limit=openweather_quota, prepaid=prepaid, params=params),
+                    timeout=upstream_deadline()
+                )
+            return response.json()
         except httpx.HTTPError as e:
             logger.error(f"Error fetching weather data: {e}")
             raise
     
+    @staticmethod
+    async def fetch_weather_group(city_ids: List[int], prepaid: bool = False) -> List[dict]:
+        """Fetch weather for several OpenWeatherMap city IDs (up to 20) in one /group request"""
+        try:
+            url = f"{settings.OPENWEATHER_BASE_URL}/group"
+            params = {
+                "id": ",".join(str(city_id) for city_id in city_ids),
+                "appid": settings.OPENWEATHER_API_KEY,
+                "units": "metric"
+            }
+            
+            async with openweather_breaker:
+                response = await asyncio.wait_for(
+                    request_with_retry("GET", url, rate_limit=openweather_quota, prepaid=prepaid, params=params),
+                    timeout=upstream_deadline()
+                )
+            return response.json().get("list", [])
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching weather data for {len(city_ids)} city IDs: {e}")
+            raise
+    
+    @staticmethod
+    def parse_weather_payload(weather_data: dict) -> dict:
+        """Map an OpenWeatherMap payload onto WeatherData column values"""
+        return {
+            "city": weather_data["name"],
+            "temperature": weather_data["main"]["temp"],
+            "feels_like": weather_data["main"]["feels_like"],
+            "temp_min": weather_data["main"]["temp_min"],
+            "temp_max": weather_data["main"]["temp_max"],
+            "humidity": weather_data["main"]["humidity"],
+            "pressure": weather_data["main"]["pressure"],
+            "weather_main": weather_data["weather"][0]["main"],
+            "weather_description": weather_data["weather"][0]["description"],
+            "wind_speed": weather_data["wind"]["speed"],
+            "clouds": weather_data["clouds"]["all"],
+            "observed_at": datetime.fromtimestamp(weather_data["dt"], tz=timezone.utc) if "dt" in weather_data else None,
+            "is_deleted": False
+        }
+    
     @staticmethod
     async def save_weather_data(db: AsyncSession, weather_data: dict) -> WeatherData:
         """Save weather data to database"""
         try:
-            db_weather = WeatherData(
-                city=weather_data["name"],
-                temperature=weather_data["main"]["temp"],
-                feels_like=weather_data["main"]["feels_like"],
-                temp_min=weather_data["main"]["temp_min"],
-                temp_max=weather_data["main"]["temp_max"],
-                humidity=weather_data["main"]["humidity"],
-                pressure=weather_data["main"]["pressure"],
-                weather_main=weather_data["weather"][0]["main"],
-                weather_description=weather_data["weather"][0]["description"],
-                wind_speed=weather_data["wind"]["speed"],
-                clouds=weather_data["clouds"]["all"],
-                is_deleted=False
-            )
+            db_weather = WeatherData(**WeatherService.parse_weather_payload(weather_data))
             
             db.add(db_weather)
+            await db.flush()
+            await RollupService.apply(db, [db_weather])
             await db.commit()
             await db.refresh(db_weather)
+            response_cache.invalidate("current", db_weather.city)
+            WeatherService.publish_observations([db_weather])
             return db_weather
         except Exception as e:
             await db.rollback()
             logger.error(f"Error saving weather data: {e}")
             raise
     
+    @staticmethod
+    async def bulk_save_weather_data(db: AsyncSession, payloads: List[dict]) -> List[WeatherData]:
+        """Insert many weather payloads with multi-row INSERT ... RETURNING (caller commits)"""
+        return await WeatherService.bulk_insert_weather_rows(
+            db, [WeatherService.parse_weather_payload(p) for p in payloads]
+        )
+
+    @staticmethod
+    async def bulk_insert_weather_rows(db: AsyncSession, rows: List[dict]) -> List[WeatherData]:
+        """Insert rows already mapped by parse_weather_payload and update the rollups (caller commits)"""
+        if not rows:
+            return []
+        # SQLAlchemy batches the parameter list into multi-row VALUES statements
+        result = await db.scalars(insert(WeatherData).returning(WeatherData), rows)
+        saved = result.all()
+        await RollupService.apply(db, saved)
+        return saved
+    
+    @staticmethod
+    def publish_observations(rows: List[WeatherData]):
+        """Push committed observations to stream subscribers"""
+        for row in rows:
+            event_bus.publish("observation", row.city, WeatherDataResponse.model_validate(row).model_dump(mode="json"))
+    
     @staticmethod
     async def get_latest_weather(db: AsyncSession, city: str = settings.CITY_NAME):
         """Get latest weather data for a city"""
@@ -73,57 +180,67 @@ class WeatherService:
     @staticmethod
     async def compute_dashboard_summary(db: AsyncSession, city: str = settings.CITY_NAME):
         """Compute summary data for dashboard"""
+        summaries = await WeatherService.compute_dashboard_summaries(db, cities=[city])
+        if not summaries:
+            logger.warning("No weather records found for dashboard summary")
+            return None
+        return summaries[0]
+    
+    @staticmethod
+    async def compute_dashboard_summaries(db: AsyncSession, cities: Optional[List[str]] = None) -> List[DashboardSummary]:
+        """Compute dashboard summaries for many cities (all cities with data when None)
+        
+        Reads the last 24 weather_hourly buckets per city instead of raw rows, so the
+        cost does not depend on how many observations were taken.
+        """
         try:
-            # Get weather data from last 24 hours
-            one_hour_ago = datetime.utcnow() - timedelta(hours=24)
-            
-            query = select(WeatherData).where(
-                and_(
-                    WeatherData.city == city,
-                    WeatherData.recorded_at >= one_hour_ago,
-                    WeatherData.is_deleted == False
-                )
-            )
+            since = RollupService.bucket_start(datetime.now(timezone.utc) - SUMMARY_WINDOW, "hourly")
             
-            result = await db.execute(query)
-            weather_records = result.scalars().all()
+            query = select(WeatherHourly).where(
+                WeatherHourly.bucket >= since,
+                WeatherHourly.temperature_count > 0
+            ).order_by(WeatherHourly.city, WeatherHourly.bucket)
+            if cities is not None:
+                query = query.where(WeatherHourly.city.in_(cities))
             
-            if not weather_records:
-                logger.warning("No weather records found for dashboard summary")
-                return None
+            hourly = {}
+            for row in await db.scalars(query):
+                hourly.setdefault(row.city, []).append(row)
             
-            # Calculate averages
-            avg_temp = sum(w.temperature for w in weather_records) / len(weather_records)
-            max_temp = max(w.temperature for w in weather_records)
-            min_temp = min(w.temperature for w in weather_records)
-            avg_humidity = sum(w.humidity for w in weather_records) / len(weather_records)
+            summaries = []
+            for city, buckets in hourly.items():
+                temperature_count = sum(h.temperature_count for h in buckets)
+                humidity_count = sum(h.humidity_count for h in buckets)
+                # Create trend data (hourly)
+                trend_data = {
+                    "hourly_temps": [
+                        {
+                            "time": h.bucket.isoformat(),
+                            "temperature": round(h.temperature_sum / h.temperature_count, 2),
+                            "humidity": round(h.humidity_sum / h.humidity_count, 2) if h.humidity_count else None
+                        }
+                        for h in buckets[-12:]  # Last 12 hours
+                    ]
+                }
+                summaries.append(DashboardSummary(
+                    city=city,
+                    avg_temperature=round(sum(h.temperature_sum for h in buckets) / temperature_count, 2),
+                    max_temperature=round(max(h.temperature_max for h in buckets), 2),
+                    min_temperature=round(min(h.temperature_min for h in buckets), 2),
+                    avg_humidity=round(sum(h.humidity_sum for h in buckets) / humidity_count, 2) if humidity_count else 0.0,
+                    trend_data=trend_data
+                ))
             
-            # Create trend data (hourly)
-            trend_data = {
-                "hourly_temps": [
-                    {
-                        "time": w.recorded_at.isoformat(),
-                        "temperature": w.temperature,
-                        "humidity": w.humidity
-                    }
-                    for w in weather_records[-12:]  # Last 12 records
-                ]
-            }
-            
-            # Save summary
-            summary = DashboardSummary(
-                city=city,
-                avg_temperature=round(avg_temp, 2),
-                max_temperature=round(max_temp, 2),
-                min_temperature=round(min_temp, 2),
-                avg_humidity=round(avg_humidity, 2),
-                trend_data=trend_data
-            )
-            
-            db.add(summary)
-            await db.commit()
-            await db.refresh(summary)
-            return summary
+            if summaries:
+                db.add_all(summaries)
+                await db.commit()
+                for summary in summaries:
+                    response_cache.invalidate("dashboard", summary.city)
+                    event_bus.publish(
+                        "summary", summary.city,
+                        DashboardSummaryResponse.model_validate(summary).model_dump(mode="json")
+                    )
+            return summaries
             
         except Exception as e:
             await db.rollback()
@@ -131,10 +248,39 @@ class WeatherService:
             raise
     
     @staticmethod
-    async def cleanup_old_data(db: AsyncSession, days: int = 2, hard_delete: bool = False):
-        """Delete or archive weather records older than specified days"""
+    async def cleanup_old_data(db: AsyncSession, days: int = 2, hard_delete: bool = False, archive: bool = False):
+        """Delete, archive or soft delete weather records older than specified days
+        
+        Soft delete marks the rows is_deleted and leaves them in weather_data. On a
+        partitioned weather_data, whole partitions older than the cutoff are dropped
+        (hard delete) or, only when `archive` is asked for, detached into archive
+        tables that are kept until dropped by hand; the cost does not depend on row
+        count. Rows in the partition straddling the cutoff go through the row-level
+        path below. Returns the number of rows deleted, archived or hidden; rows in
+        whole partitions are counted from table statistics, so that part is an estimate.
+        
+        Nothing here is one transaction: each partition is removed and committed
+        first, then soft delete commits chunk by chunk. An error rolls back only
+        the step that failed, and running the cleanup again finishes the job.
+        
+        The rollups keep counting removed rows (they are the long-term record, kept
+        after the raw rows expire), so a cutoff inside the dashboard summary window
+        would leave the summary counting rows that are gone: it raises ValueError.
+        """
+        now = datetime.now(timezone.utc)
+        cutoff_date = now - timedelta(days=days)
+        if cutoff_date >= RollupService.bucket_start(now - SUMMARY_WINDOW, "hourly"):
+            raise ValueError(
+                f"days={days} reaches into the hourly rollups the dashboard summary is computed from, "
+                f"which do not subtract deleted rows"
+            )
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            deleted_count = 0
+            
+            if (hard_delete or archive) and await PartitionService.is_partitioned(db):
+                deleted_count += await PartitionService.drop_expired_partitions(
+                    db, cutoff_date, drop=hard_delete
+                )
             
             if hard_delete:
                 # Hard delete
@@ -142,24 +288,14 @@ class WeatherService:
                     WeatherData.recorded_at < cutoff_date
                 )
                 result = await db.execute(query)
-                deleted_count = result.rowcount
+                deleted_count += result.rowcount
             else:
                 # Soft delete
-                query = select(WeatherData).where(
-                    and_(
-                        WeatherData.recorded_at < cutoff_date,
-                        WeatherData.is_deleted == False
-                    )
-                )
-                result = await db.execute(query)
-                records = result.scalars().all()
-                
-                for record in records:
-                    record.is_deleted = True
-                
-                deleted_count = len(records)
+                deleted_count += await WeatherService.soft_delete_before(db, cutoff_date)
             
             await db.commit()
+            if deleted_count:
+                response_cache.invalidate("current")
             logger.info(f"Cleaned up {deleted_count} weather records")
             return deleted_count
             
@@ -168,6 +304,42 @@ class WeatherService:
             logger.error(f"Error during data cleanup: {e}")
             raise
     
+    @staticmethod
+    async def soft_delete_before(
+        db: AsyncSession,
+        cutoff_date: datetime,
+        batch_size: int = settings.CLEANUP_BATCH_SIZE,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """Mark live records older than cutoff_date as deleted with set-based UPDATEs
+        
+        Each chunk is one UPDATE of at most batch_size rows committed on its own, so
+        locks and transaction size stay bounded however large the backlog is. The
+        first commit would take anything pending in `db` with it: call it with no
+        uncommitted changes. Returns the total rowcount.
+        """
+        live_before_cutoff = and_(
+            WeatherData.recorded_at < cutoff_date,
+            WeatherData.is_deleted == False
+        )
+        total = 0
+        while True:
+            chunk = select(WeatherData.id, WeatherData.recorded_at).where(live_before_cutoff).limit(batch_size)
+            query = update(WeatherData).where(
+                tuple_(WeatherData.id, WeatherData.recorded_at).in_(chunk)
+            ).values(is_deleted=True).execution_options(synchronize_session=False)
+            
+            result = await db.execute(query)
+            await db.commit()
+            total += result.rowcount
+            
+            if result.rowcount:
+                logger.info(f"Soft-deleted {total} weather records so far...")
+                if on_progress is not None:
+                    on_progress(total)
+            if result.rowcount < batch_size:
+                return total
+    
     @staticmethod
     async def get_dashboard_summary(db: AsyncSession, city: str = settings.CITY_NAME):
         """Get latest dashboard summary"""
@@ -0,0 +1,129 @@
+import time
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fail fast while an upstream is down, probing it once in a while to notice recovery
+
+    After `failure_threshold` consecutive failed calls the circuit opens and every
+    call raises CircuitOpenError at once. When `reset_timeout` seconds have passed,
+    one call at a time is let through as a probe (half-open): success closes the
+    circuit, failure opens it again. `is_failure` decides which exceptions mean the
+    upstream is unhealthy; the others (e.g. an unknown city) count as successes.
+    `on_state_change(state)` is called on every transition (an open circuit turns
+    half-open when the probe is let through, not when reset_timeout passes).
+
+        async with breaker:
+            response = await client.get(url)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+        on_state_change: Optional[Callable[[str], None]] = None
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda exc: isinstance(exc, Exception))
+        self.on_state_change = on_state_change
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self.probes = 0
+        self._probing = False
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected without reaching the upstream"""
+        if self.state == OPEN:
+            return self.retry_after > 0
+        return self.state == HALF_OPEN and self._probing
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        if self.state == OPEN and self.retry_after <= 0:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            self.probes += 1
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.name, self.retry_after or self.reset_timeout)
+
+    def record_success(self):
+        self._probing = False
+        self.consecutive_failures = 0
+        self._set_state(CLOSED)
+        self.opened_at = None
+
+    def record_failure(self):
+        self._probing = False
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self._set_state(OPEN)
+            self.opened_at = time.monotonic()
+
+    def _set_state(self, state: str):
+        changed = state != self.state
+        self.state = state
+        if changed and self.on_state_change is not None:
+            self.on_state_change(state)
+
+    async def __aenter__(self) -> "CircuitBreaker":
+        self.before_call()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is None:
+            self.record_success()
+        elif isinstance(exc, Exception) and self.is_failure(exc):
+            self.record_failure()
+        elif isinstance(exc, Exception):
+            self.record_success()
+        else:
+            # Cancelled (e.g. a caller's timeout): no verdict, but free the probe slot
+            self._probing = False
+        return False
+
+    def get_stats(self) -> dict:
+        state = self.state
+        if state == OPEN and self.retry_after <= 0:
+            state = HALF_OPEN  # The next call will be the probe
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after, 1),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "probes": self.probes,
+        }
@@ -0,0 +1,168 @@
+import functools
+import time
+from typing import Awaitable, Callable
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.utils.profiler import profiler
+from src.utils.slow_log import Origin, current_origin
+from src.config.settings import settings
+
+# Returned by a job wrapper (the job lease) that decided not to run this tick
+JOB_SKIPPED = object()
+
+HTTP_REQUEST_DURATION = Histogram(
+    "weather_http_request_duration_seconds",
+    "Time from request to response headers, per route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+JOB_DURATION = Histogram(
+    "weather_job_duration_seconds",
+    "Scheduled job run time (ticks that ran on this worker)",
+    ["job"],
+    buckets=(0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0)
+)
+JOB_RUNS = Counter(
+    "weather_job_runs_total",
+    "Scheduled job ticks by outcome: success, error, or skipped (lease held by another worker)",
+    ["job", "outcome"]
+)
+
+UPSTREAM_DURATION = Histogram(
+    "weather_upstream_request_duration_seconds",
+    "Upstream HTTP attempt latency (each retry counts)",
+    ["host", "path"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+UPSTREAM_RESPONSES = Counter(
+    "weather_upstream_responses_total",
+    "Upstream HTTP attempts by status code, or the error class when no response arrived",
+    ["host", "path", "status"]
+)
+# Gauges are set as things change, never read at scrape time (Gauge.set_function), since
+# PROMETHEUS_MULTIPROC_DIR cannot export callbacks; multiprocess_mode says how workers combine
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "weather_upstream_circuit_state",
+    "OpenWeather circuit breaker state: 0 closed, 1 half-open, 2 open (worst worker)",
+    multiprocess_mode="livemax"
+)
+
+DB_POOL_WAIT = Histogram(
+    "weather_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "weather_db_pool_checked_out",
+    "Database connections currently checked out (all workers)",
+    multiprocess_mode="livesum"
+)
+DB_POOL_SATURATION = Gauge(
+    "weather_db_pool_saturation",
+    "Checked-out connections as a fraction of pool_size + max_overflow (busiest worker)",
+    multiprocess_mode="livemax"
+)
+DB_QUERY_DURATION = Histogram(
+    "weather_db_query_duration_seconds",
+    "Statement execution time by SQL operation",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+)
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE", "ALTER", "DROP", "LOCK", "ANALYZE"}
+
+
+def sql_operation(statement: str) -> str:
+    """First keyword of a statement, for a low-cardinality label"""
+    keyword = statement.lstrip(" \n\t(").split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in SQL_OPERATIONS else "OTHER"
+
+
+@functools.lru_cache(maxsize=2048)
+def _query_histogram(statement: str) -> Histogram:
+    # Statements repeat, so the labelled child is looked up once per distinct SQL string
+    return DB_QUERY_DURATION.labels(sql_operation(statement))
+
+
+def track_job(job_id: str):
+    """Record duration and outcome of each tick of the decorated scheduled job
+
+    Ticks are also named in the slow-query log and, in debug mode, sampled by
+    the profiler (skipped ticks are not kept).
+    """
+    def decorator(job: Callable[..., Awaitable]):
+        async def run(*args, **kwargs):
+            if not settings.METRICS_ENABLED:
+                return await job(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = await job(*args, **kwargs)
+            except Exception:
+                JOB_RUNS.labels(job_id, "error").inc()
+                JOB_DURATION.labels(job_id).observe(time.perf_counter() - started)
+                raise
+            if result is JOB_SKIPPED:
+                JOB_RUNS.labels(job_id, "skipped").inc()
+            else:
+                JOB_RUNS.labels(job_id, "success").inc()
+                JOB_DURATION.labels(job_id).observe(time.perf_counter() - started)
+            return result
+
+        @functools.wraps(job)
+        async def wrapper(*args, **kwargs):
+            token = current_origin.set(Origin(f"job {job_id}"))
+            window = profiler.start("job", job_id)
+            result = None
+            try:
+                result = await run(*args, **kwargs)
+                return result
+            finally:
+                current_origin.reset(token)
+                profiler.finish(window, discard=result is JOB_SKIPPED)
+        return wrapper
+    return decorator
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        if not settings.METRICS_ENABLED:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine, max_connections: int):
+    """Time every statement on `engine` and report its pool usage on every checkout and checkin"""
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+
+    def report_pool(checked_out: int):
+        DB_POOL_CHECKED_OUT.set(checked_out)
+        DB_POOL_SATURATION.set(checked_out / max_connections)
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        report_pool(pool.checkedout())
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        # Fired before the connection is back in the pool, so it is still counted
+        report_pool(pool.checkedout() - 1)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            _query_histogram(statement).observe(time.perf_counter() - started)
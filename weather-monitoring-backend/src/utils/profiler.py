@@ -0,0 +1,244 @@
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+from src.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_LIBRARY_ROOTS = sorted({os.path.dirname(os.__file__), *(p for p in sys.path if p.endswith("-packages"))}, key=len, reverse=True)
+
+
+def short_path(filename: str) -> str:
+    """Path relative to the project, site-packages or the stdlib, whichever contains it"""
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        return filename[len(PROJECT_ROOT) + 1:]
+    for root in _LIBRARY_ROOTS:
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+class ProfileWindow:
+    """Samples collected for one profiled request or job tick
+
+    `anchor` is the frame of the coroutine that started the window: samples are
+    attributed to the window when that frame is on the event loop thread's stack
+    (running) or in its task's await chain (suspended).
+    """
+
+    def __init__(self, kind: str, name: str, anchor, task: Optional[asyncio.Task]):
+        self.kind = kind
+        self.name = name
+        self.anchor = anchor
+        self.task = task
+        self.thread_id = threading.get_ident()
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+
+class Profiler:
+    """Wall-clock sampling profiler for sampled requests and job ticks, off unless debug mode is on
+
+    A daemon thread reads the event loop thread's stack every `interval` seconds
+    while any window is open. cProfile is not used: it traces whatever runs on
+    the thread, so concurrent requests would be mixed into each other's profiles,
+    and it slows every call down while active. Each sample of a window is either
+    the stack it is running (on CPU, or inside SQLAlchemy's greenlet) or the
+    await chain it is suspended in, ending in an `[await ...]` frame. Windows are
+    written as folded stacks (`frame;frame;frame count`), the input of
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, enabled: bool, sample_rate: float, interval: float, directory: str, max_files: int):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = directory
+        self.max_files = max_files
+        self.recent: Deque[dict] = deque(maxlen=max_files)
+        self.profiled = 0
+        self._windows: Dict[int, ProfileWindow] = {}  # id(anchor frame) -> window
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[object, str] = {}
+
+    def start(self, kind: str, name: str) -> Optional[ProfileWindow]:
+        """Open a window on the caller's frame if debug mode is on and this one is sampled"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        window = ProfileWindow(kind, name, sys._getframe(1), task)
+        with self._lock:
+            self._windows[id(window.anchor)] = window
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return window
+
+    def finish(self, window: Optional[ProfileWindow], discard: bool = False) -> Optional[str]:
+        """Close the window and write its profile, rooted at `window.name`; returns the file name"""
+        if window is None:
+            return None
+        with self._lock:
+            self._windows.pop(id(window.anchor), None)
+        window.anchor = window.task = None
+        if discard or not window.stacks:
+            return None
+        duration = time.perf_counter() - window.started
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", window.name).strip("_")[:80] or "root"
+        filename = f"{window.started_at:%Y%m%dT%H%M%S%f}-{window.kind}-{slug}-{os.getpid()}.folded"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            root = window.name.replace(";", ",")
+            with open(os.path.join(self.directory, filename), "w") as f:
+                for stack, count in window.stacks.most_common():
+                    f.write(f"{root};{stack} {count}\n" if stack else f"{root} {count}\n")
+            self._prune()
+        except OSError as e:
+            logger.warning(f"Could not write profile {filename}: {e}")
+            return None
+        self.profiled += 1
+        self.recent.append({
+            "file": filename,
+            "kind": window.kind,
+            "name": window.name,
+            "started_at": window.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 1),
+            "samples": window.samples,
+        })
+        return filename
+
+    def list_profiles(self) -> List[dict]:
+        """Profiles on disk, newest first (all workers sharing the directory)"""
+        known = {entry["file"]: entry for entry in self.recent}
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".folded")]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda e: e.name, reverse=True)
+        return [known.get(e.name, {"file": e.name}) | {"bytes": e.stat().st_size} for e in entries]
+
+    def path_of(self, filename: str) -> Optional[str]:
+        """Path of a profile file, or None for names outside the profile directory"""
+        if os.path.basename(filename) != filename or not filename.endswith(".folded"):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": round(self.interval * 1000, 2),
+            "directory": self.directory,
+            "open_windows": len(self._windows),
+            "profiled": self.profiled,
+        }
+
+    def _prune(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".folded"))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _run(self):
+        default_switch_interval = sys.getswitchinterval()
+        while True:
+            if not self._wakeup.is_set():
+                sys.setswitchinterval(default_switch_interval)
+            self._wakeup.wait()
+            sys.setswitchinterval(min(default_switch_interval, self.interval / 5))
+            with self._lock:
+                if not self._windows:
+                    self._wakeup.clear()
+                    continue
+                self._sample()
+            time.sleep(self.interval)
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for window in self._windows.values():
+            thread_frame = frames.get(window.thread_id)
+            if thread_frame is None:
+                continue
+            stack = self._running_stack(window, thread_frame)
+            if stack is None:
+                stack = self._awaiting_stack(window, thread_frame)
+            if stack is not None:
+                window.stacks[";".join(stack)] += 1
+
+    def _running_stack(self, window: ProfileWindow, frame) -> Optional[List[str]]:
+        # On CPU: the anchor is on the thread's stack, below the frames to report
+        frames = []
+        while frame is not None:
+            if frame is window.anchor:
+                return [self._label(f) for f in reversed(frames)]
+            frames.append(frame)
+            frame = frame.f_back
+        return None
+
+    def _awaiting_stack(self, window: ProfileWindow, thread_frame) -> Optional[List[str]]:
+        coro = window.task.get_coro() if window.task is not None else None
+        if coro is None:
+            return None
+        if getattr(coro, "cr_running", False):
+            # Running, but the anchor is not on the thread's stack: SQLAlchemy's sync
+            # code runs in a greenlet whose frames do not link back to the coroutines
+            frames = []
+            while thread_frame is not None:
+                frames.append(thread_frame)
+                thread_frame = thread_frame.f_back
+            return ["[greenlet]"] + [self._label(f) for f in reversed(frames)]
+        chain: List[str] = []
+        found = False
+        awaited = coro
+        while awaited is not None:
+            frame = getattr(awaited, "cr_frame", None) or getattr(awaited, "ag_frame", None) or getattr(awaited, "gi_frame", None)
+            if frame is None:
+                break
+            if found:
+                chain.append(self._label(frame))
+            found = found or frame is window.anchor
+            awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "ag_await", None) or getattr(awaited, "gi_yieldfrom", None)
+        if not found:
+            return None
+        return chain + [f"[await {type(awaited).__name__}]" if awaited is not None else "[await]"]
+
+    def _label(self, frame) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+
+profiler = Profiler(
+    enabled=settings.PROFILING_ENABLED,
+    sample_rate=settings.PROFILE_SAMPLE_RATE,
+    interval=settings.PROFILE_INTERVAL_MS / 1000,
+    directory=settings.PROFILE_DIR,
+    max_files=settings.PROFILE_MAX_FILES
+)
@@ -0,0 +1,162 @@
+import contextvars
+import os
+import reprlib
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from src.utils.profiler import PROJECT_ROOT, short_path
+from src.config.settings import settings
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # Only the async engine runs statements in greenlets
+    getcurrent = None
+
+SRC_ROOT = os.path.join(PROJECT_ROOT, "src") + os.sep
+# Instrumentation frames, never the call site of interest
+_SKIPPED_SITES = (os.path.dirname(__file__) + os.sep, os.path.join(SRC_ROOT, "api", "http_"))
+CALL_SITE_DEPTH = 5
+MAX_STATEMENT_CHARS = 2000
+
+_params_repr = reprlib.Repr()
+_params_repr.maxlevel = 3
+_params_repr.maxlist = _params_repr.maxtuple = _params_repr.maxdict = 20
+_params_repr.maxstring = 200
+_params_repr.maxother = 200
+
+
+class Origin:
+    """The request or job tick a statement runs for, and its database time so far"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+current_origin: contextvars.ContextVar[Optional[Origin]] = contextvars.ContextVar("current_origin", default=None)
+
+
+def call_site(frame=None, depth: int = CALL_SITE_DEPTH) -> List[str]:
+    """Innermost application frames (under src/) of the caller, as "path:line in function"
+
+    Inside SQLAlchemy's greenlet the stack ends at the ORM; the application's
+    frames are found through the parent greenlet that awaits it.
+    """
+    if frame is None:
+        frame = sys._getframe(1)
+        if getcurrent is not None and getcurrent().parent is not None:
+            frame = getcurrent().parent.gr_frame
+    sites = []
+    while frame is not None and len(sites) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(SRC_ROOT) and not filename.startswith(_SKIPPED_SITES):
+            sites.append(f"{short_path(filename)}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return sites
+
+
+def describe_parameters(parameters, executemany: bool) -> str:
+    if executemany and parameters:
+        return f"{len(parameters)} rows, first: {_params_repr.repr(parameters[0])}"
+    return _params_repr.repr(parameters)
+
+
+class SlowLog:
+    """Bounded ring buffers of the latest statements and requests slower than a threshold
+
+    Thresholds are in seconds; 0 disables that buffer. Once full, the oldest
+    entry is dropped for each new one.
+    """
+
+    def __init__(self, size: int, query_threshold: float, request_threshold: float):
+        self.query_threshold = query_threshold
+        self.request_threshold = request_threshold
+        self.queries: Deque[dict] = deque(maxlen=size)
+        self.requests: Deque[dict] = deque(maxlen=size)
+        self.queries_recorded = 0
+        self.requests_recorded = 0
+
+    def record_query(
+        self, duration: float, statement: str, parameters, executemany: bool,
+        origin: Optional[Origin], error: Optional[BaseException] = None
+    ):
+        self.queries_recorded += 1
+        self.queries.append({
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 1),
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "parameters": describe_parameters(parameters, executemany),
+            "origin": origin.label if origin else None,
+            "call_site": call_site(),
+            "error": f"{type(error).__name__}: {error}"[:500] if error is not None else None,
+        })
+
+    def record_request(self, entry: dict):
+        self.requests_recorded += 1
+        self.requests.append(entry)
+
+    def clear(self):
+        self.queries.clear()
+        self.requests.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "size": self.queries.maxlen,
+            "slow_query_ms": round(self.query_threshold * 1000, 1),
+            "slow_request_ms": round(self.request_threshold * 1000, 1),
+            "queries_recorded": self.queries_recorded,
+            "queries_kept": len(self.queries),
+            "requests_recorded": self.requests_recorded,
+            "requests_kept": len(self.requests),
+        }
+
+
+slow_log = SlowLog(
+    size=settings.SLOW_LOG_SIZE,
+    query_threshold=settings.SLOW_QUERY_MS / 1000,
+    request_threshold=settings.SLOW_REQUEST_MS / 1000
+)
+
+
+def instrument_slow_queries(engine: AsyncEngine):
+    """Time every statement on `engine`: add it to its origin's totals, and to the slow log if slow
+
+    Failed statements count too: a query cancelled by statement_timeout is
+    usually the slowest one there is.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._slow_log_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_log_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        origin = current_origin.get()
+        if origin is not None:
+            origin.queries += 1
+            origin.query_seconds += duration
+        if 0 < slow_log.query_threshold <= duration:
+            slow_log.record_query(duration, statement, parameters, executemany, origin)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        context = exception_context.execution_context
+        started = getattr(context, "_slow_log_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        if 0 < slow_log.query_threshold <= duration:
+            slow_log.record_query(
+                duration, exception_context.statement or "", exception_context.parameters,
+                context.executemany, current_origin.get(), exception_context.original_exception
+            )
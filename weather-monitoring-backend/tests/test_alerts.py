@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from src.models.weather import WeatherAlert, WeatherData
+from src.services.alert_service import AlertService, alert_rule_cache
+from src.services.alert_state import AlertStateIndex
+
+
+def observe(run, db, temperature: float) -> dict:
+    async def insert():
+        row = WeatherData(city="Pune", temperature=temperature, humidity=50, pressure=1010,
+                          weather_main="Clear", weather_description="clear sky", is_deleted=False)
+        db.add(row)
+        await db.commit()
+        return row
+
+    row = run(insert())
+    return {"id": row.id, "city": "Pune", "recorded_at": row.recorded_at, "temperature": temperature,
+            "humidity": 50, "pressure": 1010, "weather_main": "Clear", "weather_description": "clear sky"}
+
+
+def alert_count(run, db) -> int:
+    return run(db.scalar(select(func.count()).select_from(WeatherAlert)))
+
+
+def check(run, db) -> list:
+    return run(AlertService.check_weather_alerts(db, cities=["Pune"]))
+
+
+def other_worker(run, db) -> AlertStateIndex:
+    """A second worker's index, holding its snapshot from now on"""
+    index = AlertStateIndex()
+    index.load(run(alert_rule_cache.get(db)))
+    run(index.refresh(db, ["Pune"]))
+    return index
+
+
+def stale_attempt(run, db, index: AlertStateIndex, observation: dict) -> list:
+    async def attempt():
+        now = datetime.now(timezone.utc)
+        changes = await index.save(db, index.evaluate([observation], now, timedelta(hours=3)), now)
+        await db.commit()
+        return changes
+
+    return run(attempt())
+
+
+def test_condition_that_persists_alerts_once(run, db):
+    observe(run, db, 40.0)
+    assert len(check(run, db)) == 1
+    observe(run, db, 41.0)
+    assert check(run, db) == []
+    assert alert_count(run, db) == 1
+
+
+def test_stale_worker_does_not_alert_twice(run, db):
+    hot = observe(run, db, 40.0)
+    stale = other_worker(run, db)
+
+    assert len(check(run, db)) == 1
+    changes = stale_attempt(run, db, stale, hot)
+
+    assert changes == []
+    assert alert_count(run, db) == 1
+
+
+def test_stale_worker_does_not_bypass_the_cooldown(run, db):
+    observe(run, db, 40.0)
+    stale = other_worker(run, db)  # Snapshot from before the first alert
+    assert len(check(run, db)) == 1
+    observe(run, db, 30.0)
+    assert check(run, db) == []  # Clears
+    hot_again = observe(run, db, 40.0)
+
+    assert stale_attempt(run, db, stale, hot_again) == []
+    assert check(run, db) == []  # Active again, but within the cooldown
+    assert alert_count(run, db) == 1
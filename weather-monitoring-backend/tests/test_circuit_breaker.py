@@ -0,0 +1,24 @@
+import time
+from prometheus_client import REGISTRY
+from src.config.settings import settings
+from src.services.ingestion_service import IngestionService
+from src.services.weather_service import openweather_breaker
+
+
+def test_hanging_upstream_opens_the_circuit(run, database, stub, monkeypatch):
+    # Shorter than the HTTP timeout times the attempts: the city timeout alone would
+    # cancel every call before httpx gave up, leaving the breaker without a verdict
+    monkeypatch.setattr(settings, "FETCH_CITY_TIMEOUT", 0.6)
+    stub.outage, stub.slow_latency = "hang", 2.0
+    cities = [f"Hung{i}" for i in range(settings.OPENWEATHER_BREAKER_FAILURES)]
+
+    result = run(IngestionService.fetch_cities(cities, city_timeout=settings.FETCH_CITY_TIMEOUT))
+
+    assert set(result.failed) == set(cities)
+    assert openweather_breaker.is_open
+    assert REGISTRY.get_sample_value("weather_upstream_circuit_state") == 2
+
+    started = time.perf_counter()
+    result = run(IngestionService.fetch_cities(["Pune"], city_timeout=settings.FETCH_CITY_TIMEOUT))
+    assert result.rejected == ["Pune"]
+    assert time.perf_counter() - started < 0.5
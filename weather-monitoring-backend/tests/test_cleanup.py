@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import func, select, text
+from src.models.weather import WeatherData
+from src.services.partition_service import PartitionService
+from src.services.weather_service import WeatherService
+
+
+@pytest.fixture
+def expired_partition(run, db):
+    """A partition ten days old holding 5 rows, plus 3 rows from today"""
+    lower = PartitionService.partition_start(datetime.now(timezone.utc) - timedelta(days=10), "day")
+    name = f"weather_data_p{lower:%Y%m%d}"
+
+    async def create():
+        await db.execute(text(
+            f'CREATE TABLE "{name}" PARTITION OF weather_data '
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{(lower + timedelta(days=1)).isoformat()}')"
+        ))
+        old = [{"city": "Pune", "temperature": 20.0, "recorded_at": lower + timedelta(hours=i)} for i in range(5)]
+        new = [{"city": "Pune", "temperature": 20.0} for _ in range(3)]
+        await db.execute(WeatherData.__table__.insert(), old)
+        await db.execute(WeatherData.__table__.insert(), new)
+        await db.commit()
+
+    run(create())
+    yield name
+    run(db.execute(text(f'DROP TABLE IF EXISTS "{name}"')))
+    run(db.commit())
+
+
+def counts(run, db):
+    live = run(db.scalar(select(func.count()).select_from(WeatherData).where(WeatherData.is_deleted == False)))
+    total = run(db.scalar(select(func.count()).select_from(WeatherData)))
+    return live, total
+
+
+def attached(run, db, name) -> bool:
+    return name in [p.name for p in run(PartitionService.list_partitions(db))]
+
+
+def test_soft_delete_hides_rows_but_keeps_them(run, db, expired_partition):
+    assert run(WeatherService.cleanup_old_data(db, days=2)) == 5
+    assert counts(run, db) == (3, 8)
+    assert attached(run, db, expired_partition)
+
+
+def test_hard_delete_drops_partition_with_estimated_count(run, db, expired_partition):
+    assert run(WeatherService.cleanup_old_data(db, days=2, hard_delete=True)) == 5
+    assert counts(run, db) == (3, 3)
+    assert run(db.scalar(text("SELECT to_regclass(:name)"), {"name": expired_partition})) is None
+
+
+def test_archive_detaches_partition_only_when_asked(run, db, expired_partition):
+    assert run(WeatherService.cleanup_old_data(db, days=2, archive=True)) == 5
+    assert counts(run, db) == (3, 3)
+    assert not attached(run, db, expired_partition)
+    assert run(db.scalar(text(f'SELECT count(*) FROM "{expired_partition}"'))) == 5
+
+
+def test_busy_partition_is_left_for_the_next_run(run, db, expired_partition, monkeypatch):
+    from src.config.settings import settings
+    from src.database.connection import engine
+
+    monkeypatch.setattr(settings, "WEATHER_DATA_PARTITION_LOCK_TIMEOUT", 0.1)
+
+    async def cleanup_while_read():
+        async with engine.connect() as reader:
+            await reader.execute(text("SELECT count(*) FROM weather_data"))  # Holds a lock until rollback
+            deleted = await WeatherService.cleanup_old_data(db, days=2, hard_delete=True)
+            await reader.rollback()
+        return deleted
+
+    # The partition could not be locked, its rows went through the row-level DELETE instead
+    assert run(cleanup_while_read()) == 5
+    assert attached(run, db, expired_partition)
+    assert counts(run, db) == (3, 3)
+    # Statistics still describe the rows deleted above, so only the drop itself is checked
+    run(WeatherService.cleanup_old_data(db, days=2, hard_delete=True))
+    assert not attached(run, db, expired_partition)
+    assert counts(run, db) == (3, 3)
+
+
+@pytest.mark.parametrize("days", [0, 1])
+def test_cleanup_inside_the_summary_window_is_refused(run, db, expired_partition, days):
+    # The rollups behind the dashboard summary would still count the deleted rows
+    with pytest.raises(ValueError):
+        run(WeatherService.cleanup_old_data(db, days=days))
+    assert counts(run, db) == (8, 8)
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from src.services.alert_service import AlertRuleCache
+from src.services.cache import ResponseCache
+from src.services.cluster_events import ClusterEvents
+from src.services.event_bus import EventBus
+
+
+class Worker:
+    """One worker process's caches, bus and relay"""
+
+    def __init__(self):
+        self.bus = EventBus()
+        self.cache = ResponseCache(max_entries=10, ttl=60)
+        self.rules = AlertRuleCache(refresh_seconds=60)
+        self.relay = ClusterEvents(self.bus, self.cache, self.rules, channel="weather_events_test")
+
+
+@pytest.fixture
+def workers(run, database):
+    pair = Worker(), Worker()
+
+    async def start():
+        for worker in pair:
+            worker.relay.start()
+            await worker.relay.wait_ready(timeout=5)
+
+    run(start())
+    yield pair
+
+    async def stop():
+        for worker in pair:
+            await worker.relay.stop()
+
+    run(stop())
+
+
+async def eventually(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "not relayed in time"
+        await asyncio.sleep(0.01)
+
+
+def test_invalidation_reaches_the_other_worker(run, workers):
+    leader, follower = workers
+
+    async def scenario():
+        async def load():
+            return "cached"
+
+        await follower.cache.get_or_load("current", "Pune", load)
+        await leader.cache.get_or_load("current", "Pune", load)
+        leader.cache.invalidate("current", "Pune")
+        await eventually(lambda: follower.cache.stats.invalidations == 1)
+        assert follower.cache.get_stats()["size"] == 0
+
+    run(scenario())
+
+
+def test_events_reach_stream_clients_but_not_the_other_dispatcher(run, workers):
+    leader, follower = workers
+    stream = follower.bus.subscribe()
+    dispatcher = follower.bus.subscribe(types={"observation"}, include_remote=False)
+
+    async def scenario():
+        leader.bus.publish("observation", "Pune", {"temperature": 21.5})
+        event = await stream.get(timeout=5)
+        assert (event.type, event.city, event.data, event.remote) == ("observation", "Pune", {"temperature": 21.5}, True)
+        assert await dispatcher.get(timeout=0.2) is None
+        assert leader.relay.stats.received == 0  # Its own notifications are ignored
+
+    run(scenario())
+
+
+def test_rule_edit_reaches_the_other_worker(run, workers):
+    leader, follower = workers
+    follower.rules._rules = object()
+    leader.rules.invalidate()
+    run(eventually(lambda: follower.rules._rules is None))
+
+
+def test_reconnect_drops_caches_that_may_have_missed_invalidations(run, workers, monkeypatch):
+    _, follower = workers
+    monkeypatch.setattr(asyncio, "sleep", _no_backoff(asyncio.sleep))
+
+    async def scenario():
+        async def load():
+            return "cached"
+
+        await follower.cache.get_or_load("current", "Pune", load)
+        await follower.relay._connection.close()
+        await eventually(lambda: follower.relay.stats.connects == 2)
+        assert follower.cache.get_stats()["size"] == 0
+
+    run(scenario())
+
+
+def _no_backoff(sleep):
+    return lambda delay, *args: sleep(min(delay, 0.01), *args)
@@ -0,0 +1,21 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.routes import debug
+from src.config.settings import settings
+
+app = FastAPI()
+app.include_router(debug.router)
+client = TestClient(app)
+
+
+def test_debug_api_is_closed_without_a_token(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_ADMIN_TOKEN", None)
+    assert client.get("/api/debug").status_code == 403
+    assert client.put("/api/debug", params={"enabled": True}).status_code == 403
+    assert client.get("/api/debug", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_debug_api_requires_the_configured_token(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/debug", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/debug", headers={"X-Admin-Token": "s3cret"}).status_code == 200
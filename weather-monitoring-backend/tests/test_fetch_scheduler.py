@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+from src.config.settings import settings
+from src.services.fetch_scheduler import FetchScheduler, next_poll
+
+NOW = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+MAX_WAIT = timedelta(seconds=settings.FETCH_MAX_INTERVAL_SECONDS)
+
+
+def payload(dt: datetime, temp: float = 20.0) -> dict:
+    return {"dt": int(dt.timestamp()), "main": {"temp": temp, "humidity": 60, "pressure": 1012},
+            "weather": [{"main": "Clear"}]}
+
+
+def test_poll_is_due_before_the_stored_reading_exceeds_the_freshness_target():
+    # Half-hourly station: the update after the target would make the stored reading 61 minutes old
+    observed = NOW - timedelta(minutes=1)
+    due = next_poll(NOW, settings.FETCH_MAX_INTERVAL_SECONDS, observed, period=1800)
+    assert due - observed <= MAX_WAIT
+
+
+def test_poll_never_waits_longer_than_the_freshness_target():
+    # A learnt period far longer than the target (e.g. after an upstream gap)
+    due = next_poll(NOW, settings.FETCH_MAX_INTERVAL_SECONDS, NOW - timedelta(minutes=1), period=6 * 3600)
+    assert due - NOW <= MAX_WAIT
+    due = next_poll(NOW, 10 * settings.FETCH_MAX_INTERVAL_SECONDS, None, None)
+    assert due - NOW == MAX_WAIT
+
+
+def test_unchanged_reading_is_retried_at_the_next_expected_update():
+    schedule = FetchScheduler.new_schedule("Pune", NOW)
+    FetchScheduler.record(schedule, payload(NOW - timedelta(minutes=2)), NOW)
+    schedule.upstream_period_seconds = 4 * 3600
+
+    later = NOW + timedelta(minutes=30)
+    FetchScheduler.record(schedule, payload(NOW - timedelta(minutes=2)), later)
+    assert schedule.unchanged_polls == 1
+    assert schedule.next_fetch_at - later <= MAX_WAIT
+
+
+def test_failed_polls_count_as_polls():
+    schedule = FetchScheduler.new_schedule("Pune", NOW)
+    FetchScheduler.record(schedule, None, NOW)
+    FetchScheduler.record(schedule, payload(NOW), NOW + timedelta(minutes=10))
+    assert (schedule.polls, schedule.failed_polls, schedule.unchanged_polls) == (2, 1, 0)
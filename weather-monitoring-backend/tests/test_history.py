@@ -0,0 +1,62 @@
+import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from src.models.weather import WeatherData
+from src.services.history_service import HistoryService
+
+
+def seed(run, db, rows: int) -> list:
+    start = datetime.now(timezone.utc) - timedelta(hours=6)
+    values = [{"city": "Pune", "temperature": float(i), "recorded_at": start + timedelta(minutes=i)} for i in range(rows)]
+
+    async def insert():
+        result = await db.execute(WeatherData.__table__.insert().returning(WeatherData.id), values)
+        await db.commit()
+        return [row_id for row_id, in result]
+
+    return sorted(run(insert()))
+
+
+def read_page(run, **kwargs) -> dict:
+    async def collect():
+        return b"".join([chunk async for chunk in HistoryService.stream_history("Pune", ["temperature"], **kwargs)])
+
+    return json.loads(run(collect()))
+
+
+def test_history_page(run, db):
+    seed(run, db, 5)
+
+    page = read_page(run, limit=3)
+
+    assert [row["temperature"] for row in page["data"]] == [0.0, 1.0, 2.0]
+    assert "error" not in page
+    assert [row["temperature"] for row in read_page(run, after=HistoryService.decode_cursor(page["next_cursor"]))["data"]] == [3.0, 4.0]
+
+
+def test_history_error_mid_stream_is_reported_in_the_document(run, db, monkeypatch):
+    from src.config.settings import settings
+
+    seed(run, db, 200)  # More than the driver's 50 row read-ahead
+    monkeypatch.setattr(settings, "HISTORY_FETCH_BATCH", 2)
+
+    async def collect_while_connection_dies():
+        chunks = []
+        stream = HistoryService.stream_history("Pune", ["temperature"])
+        chunks.append(await stream.__anext__())  # Header
+        chunks.append(await stream.__anext__())  # First batch of rows
+        await db.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE pid <> pg_backend_pid() AND query LIKE 'SELECT weather_data.temperature%'"
+        ))
+        await db.commit()
+        chunks.extend([chunk async for chunk in stream])
+        return b"".join(chunks)
+
+    page = json.loads(run(collect_while_connection_dies()))
+
+    assert page["error"].startswith("Failed to read history")
+    assert 2 <= page["count"] == len(page["data"]) < 200
+    resumed = read_page(run, after=HistoryService.decode_cursor(page["next_cursor"]))
+    temperatures = [row["temperature"] for row in page["data"] + resumed["data"]]
+    assert temperatures == [float(i) for i in range(200)]
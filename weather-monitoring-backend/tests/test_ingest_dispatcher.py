@@ -0,0 +1,64 @@
+import asyncio
+from sqlalchemy import select
+from src.config.settings import settings
+from src.models.weather import WeatherAlert
+from src.services import ingest_dispatcher as dispatcher_module
+from src.services.alert_delivery import AlertDeliveryWorker, AlertSink
+from src.services.cache import response_cache
+from src.services.ingest_dispatcher import IngestDispatcher
+from tests.test_alerts import observe
+
+
+class GatedSink(AlertSink):
+    """Holds every send until `gate` is set"""
+    name = "gated"
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent = []
+
+    async def send(self, alerts):
+        await self.gate.wait()
+        self.sent.extend(alerts)
+
+
+def test_dispatch_does_not_wait_for_delivery(run, db, monkeypatch):
+    sink = GatedSink()
+    monkeypatch.setattr(settings, "ALERT_SINKS", "gated")
+    monkeypatch.setattr(dispatcher_module, "build_sinks", lambda: [sink])
+    dispatcher = IngestDispatcher()
+    observe(run, db, 40.0)
+
+    run(asyncio.wait_for(dispatcher.dispatch(["Pune"]), timeout=2))
+    assert dispatcher.stats.alerts == 1
+    assert dispatcher.get_stats()["delivering"]
+
+    async def release():
+        sink.gate.set()
+        await dispatcher._delivery
+
+    run(release())
+    assert [alert["city"] for alert in sink.sent] == ["Pune"]
+    assert dispatcher.stats.delivered == 1
+    assert run(db.scalar(select(WeatherAlert.is_sent)))
+
+
+class ListSink(AlertSink):
+    name = "list"
+
+    async def send(self, alerts):
+        pass
+
+
+def test_delivery_invalidates_cached_alerts(run, db):
+    observe(run, db, 40.0)
+    run(IngestDispatcher().dispatch(["Pune"]))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return len(loads)
+
+    assert run(response_cache.get_or_load("alerts", "Pune", load)) == 1
+    assert run(AlertDeliveryWorker([ListSink()]).run()) == 1
+    assert run(response_cache.get_or_load("alerts", "Pune", load)) == 2
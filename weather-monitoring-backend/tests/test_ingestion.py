@@ -0,0 +1,81 @@
+from sqlalchemy import func, select
+from benchmarks.stubs import fake_weather_payload
+from src.models.weather import WeatherData
+from src.services.bulk_writer import BulkWeatherWriter
+from src.services.city_ids import city_id_cache
+from src.services.ingestion_service import IngestionService
+
+
+def count_rows(run, db) -> int:
+    return run(db.scalar(select(func.count()).select_from(WeatherData)))
+
+
+def test_malformed_payload_fails_only_its_city(run, db, stub):
+    stub.malformed_cities.add("Broken")
+    cities = ["Pune", "Mumbai", "Broken", "Delhi"]
+
+    result = run(IngestionService.ingest(db, cities))
+
+    assert list(result.failed) == ["Broken"]
+    assert result.failed["Broken"].startswith("malformed payload: KeyError")
+    assert result.saved == 3
+    assert count_rows(run, db) == 3
+
+
+def test_malformed_payload_fails_only_its_city_through_group(run, db, stub):
+    cities = [f"City{i}" for i in range(5)]
+    run(IngestionService.fetch_cities(cities))  # Learn the IDs, so the next run uses /group
+    stub.malformed_cities.add("City3")
+    group_requests = stub.group_requests
+
+    result = run(IngestionService.ingest(db, cities))
+
+    assert stub.group_requests == group_requests + 1
+    assert list(result.failed) == ["City3"]
+    assert result.saved == 4
+
+
+def test_rejected_row_is_dropped_and_the_rest_of_its_batch_kept(run, db):
+    payloads = [fake_weather_payload(f"City{i}") for i in range(7)]
+    payloads[4]["main"]["humidity"] = 10 ** 12  # Out of the integer column's range
+
+    async def write():
+        async with BulkWeatherWriter(db, flush_size=100, flush_interval=0) as writer:
+            for payload in payloads:
+                await writer.add(payload)
+        return writer
+
+    writer = run(write())
+
+    assert list(writer.failed) == ["City4"]
+    assert len(writer.saved) == 6
+    assert count_rows(run, db) == 6
+
+
+def test_known_cities_are_fetched_through_group_twenty_at_a_time(run, database, stub):
+    cities = [f"Town{i}" for i in range(45)]
+    run(IngestionService.fetch_cities(cities))  # Learn the IDs by name
+    requests, group_requests = stub.requests, stub.group_requests
+
+    result = run(IngestionService.fetch_cities(cities))
+
+    assert result.failed == {}
+    assert len(result.payloads) == 45
+    assert result.requests == 3
+    assert (stub.requests - requests, stub.group_requests - group_requests) == (3, 3)
+
+
+def test_city_missing_from_group_is_looked_up_by_name_again(run, database, stub):
+    cities = ["Pune", "Mumbai", "Delhi"]
+    run(IngestionService.fetch_cities(cities))
+    stub.names.pop(city_id_cache.get("Mumbai"))  # OpenWeather stops answering for that ID
+
+    result = run(IngestionService.fetch_cities(cities))
+    assert result.failed == {"Mumbai": "missing from /group response"}
+    assert city_id_cache.get("Mumbai") is None
+
+    group_requests = stub.group_requests
+    result = run(IngestionService.fetch_cities(cities))
+    assert result.failed == {}
+    assert stub.group_requests == group_requests + 1  # Pune and Delhi; Mumbai went by name
+    assert city_id_cache.get("Mumbai") is not None
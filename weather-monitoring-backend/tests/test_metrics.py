@@ -0,0 +1,20 @@
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from src.database.connection import AsyncSessionLocal
+
+
+def checked_out() -> float:
+    return REGISTRY.get_sample_value("weather_db_pool_checked_out")
+
+
+def test_pool_gauges_follow_checkouts(run, database):
+    async def scenario():
+        before = checked_out()
+        async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            assert checked_out() == before + 2
+            assert REGISTRY.get_sample_value("weather_db_pool_saturation") > 0
+        assert checked_out() == before
+
+    run(scenario())
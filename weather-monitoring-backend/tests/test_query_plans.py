@@ -0,0 +1,16 @@
+from benchmarks.explain_hot_queries import capture_hot_queries, explain_seq_scans
+
+
+def test_hot_queries_use_indexes(run, database):
+    plans = run(explain_seq_scans(run(capture_hot_queries())))
+
+    assert len(plans) >= 10
+    assert [(" ".join(statement.split())[:140], scans) for statement, scans in plans if scans] == []
+
+
+def test_seq_scan_on_a_weather_data_partition_is_caught(run, database):
+    # No index on clouds: the planner has to scan the partitions
+    plans = run(explain_seq_scans([("SELECT id FROM weather_data WHERE clouds = $1", (5,))]))
+
+    [(_, scans)] = plans
+    assert scans and all(name.startswith("weather_data_") for name in scans)
@@ -0,0 +1,35 @@
+import asyncio
+import time
+from src.services import weather_service
+from src.services.ingestion_service import IngestionService
+from src.services.shared_rate_limit import SharedRateLimit
+
+# The stub allows 3 calls per half second; slots 1 / 4 s apart stay within it
+STUB_CALLS, STUB_WINDOW = 3, 0.5
+RATE = (STUB_CALLS - 1) / STUB_WINDOW
+
+
+def test_openweather_calls_are_paced_within_the_plan(run, db, stub, monkeypatch):
+    stub.calls_per_minute, stub.quota_window = STUB_CALLS, STUB_WINDOW
+    monkeypatch.setattr(weather_service, "openweather_quota", SharedRateLimit("openweather", RATE))
+    cities = [f"Paced{i}" for i in range(8)]
+
+    started = time.perf_counter()
+    result = run(IngestionService.fetch_cities(cities, concurrency=8, city_timeout=0.5))
+
+    assert result.failed == {}
+    assert stub.throttled == 0
+    # Waiting for the quota does not count against the city timeout
+    assert time.perf_counter() - started >= (len(cities) - 1) / RATE
+
+
+def test_workers_share_one_quota(run, db):
+    # Two processes' limiters for the same quota
+    workers = [SharedRateLimit("openweather", RATE), SharedRateLimit("openweather", RATE)]
+
+    async def acquire_all():
+        started = time.perf_counter()
+        await asyncio.gather(*(workers[i % 2].acquire() for i in range(6)))
+        return time.perf_counter() - started
+
+    assert run(acquire_all()) >= 5 / RATE - 0.01
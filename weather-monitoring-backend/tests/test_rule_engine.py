@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+from src.services.rule_engine import CompiledRule
+
+NOW = datetime(2026, 7, 1, 12, tzinfo=timezone.utc)
+
+
+def observation(**values) -> dict:
+    base = {
+        "id": 1, "city": "Pune", "recorded_at": NOW, "temperature": 25.0, "humidity": 50,
+        "pressure": 1010, "weather_main": "Clear", "weather_description": "clear sky",
+    }
+    return {**base, **values}
+
+
+def test_any_reports_the_branch_that_matched():
+    rule = CompiledRule.compile("muggy", {"any": [
+        {"metric": "temperature", "op": ">", "value": 35},
+        {"metric": "humidity", "op": ">", "value": 80},
+    ]})
+
+    alert = rule.evaluate(observation(temperature=30.0, humidity=92))
+
+    assert (alert["actual_value"], alert["threshold_value"]) == (92.0, 80.0)
+    assert rule.evaluate(observation(temperature=30.0, humidity=60)) is None
+
+
+def test_all_reports_its_first_numeric_comparison():
+    rule = CompiledRule.compile("hot_storm", {"all": [
+        {"metric": "weather_main", "op": "in", "value": ["Thunderstorm"]},
+        {"metric": "temperature", "op": ">=", "value": 30},
+    ]})
+
+    alert = rule.evaluate(observation(weather_main="Thunderstorm", temperature=33.456))
+
+    assert (alert["actual_value"], alert["threshold_value"]) == (33.46, 30.0)
+
+
+def test_no_numeric_reading_stays_none():
+    storm = CompiledRule.compile("storm", {"metric": "weather_main", "op": "in", "value": ["Thunderstorm"]})
+    not_hot = CompiledRule.compile("not_hot", {"not": {"metric": "temperature", "op": ">", "value": 35}})
+
+    for rule, reading in ((storm, observation(weather_main="Thunderstorm")), (not_hot, observation())):
+        alert = rule.evaluate(reading)
+        assert (alert["actual_value"], alert["threshold_value"]) == (None, None)
+
+
+def test_rate_without_a_previous_reading_does_not_fire():
+    rule = CompiledRule.compile("pressure_drop", {"rate": "pressure", "op": "<", "value": -3})
+
+    assert rule.evaluate(observation()) is None
+    alert = rule.evaluate(observation(
+        pressure=1000, prev_pressure=1010, prev_recorded_at=NOW - timedelta(hours=2)
+    ))
+    assert (alert["actual_value"], alert["threshold_value"]) == (-5.0, -3.0)